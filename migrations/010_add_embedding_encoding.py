@@ -0,0 +1,18 @@
+"""Peewee migrations -- 010_add_embedding_encoding.py."""
+
+import peewee as pw
+from peewee_migrate import Migrator
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    # Existing embeddings were all stored as raw float32 arrays
+    for model_name in ("logo_embedding", "image_embedding"):
+        migrator.add_fields(
+            model_name,
+            encoding=pw.CharField(max_length=10, default="float32"),
+        )
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    for model_name in ("logo_embedding", "image_embedding"):
+        migrator.remove_fields(model_name, "encoding")
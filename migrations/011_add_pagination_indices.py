@@ -0,0 +1,84 @@
+"""Peewee migrations -- 011_add_pagination_indices.py."""
+
+import peewee as pw
+from peewee_migrate import Migrator
+
+# (index name, table, columns)
+INDICES = [
+    ("product_insight_server_type_id", "product_insight", "server_type, id"),
+    (
+        "product_insight_server_type_unique_scans_n_id",
+        "product_insight",
+        "server_type, unique_scans_n, id",
+    ),
+    ("prediction_server_type_id", "prediction", "server_type, id"),
+    ("image_server_type_id", "image", "server_type, id"),
+]
+
+
+def execute_outside_transaction(database: pw.Database, queries: list[str]):
+    """Execute queries that can't run in a transaction block (such as
+    `CREATE INDEX CONCURRENTLY`).
+
+    peewee_migrate runs each migration in a transaction: this transaction
+    (still empty, as migrator operations are only run after `migrate`) is
+    committed, the queries are executed in autocommit mode (the default mode
+    of peewee connections), and a new transaction is started for the update
+    of the migration history.
+    """
+    database.commit()
+    try:
+        for query in queries:
+            database.execute_sql(query)
+    finally:
+        database.begin()
+
+
+def get_invalid_indices(database: pw.Database, index_names: list[str]) -> set[str]:
+    """Return the indices of `index_names` that exist but are marked as
+    invalid, such as indices whose concurrent build failed."""
+    cursor = database.execute_sql(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname IN %s AND NOT i.indisvalid",
+        (tuple(index_names),),
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Add composite indices used for cursor-based (keyset) pagination.
+
+    The indices are built concurrently, so that writes to these large tables
+    are not blocked during the build. A failed concurrent build leaves an
+    invalid index that `IF NOT EXISTS` would keep: such indices are dropped
+    and built again.
+    """
+    if fake:
+        return
+    invalid_indices = get_invalid_indices(
+        database, [index_name for index_name, _, _ in INDICES]
+    )
+    execute_outside_transaction(
+        database,
+        [
+            f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"
+            for index_name in sorted(invalid_indices)
+        ]
+        + [
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+            f"ON {table_name} ({columns})"
+            for index_name, table_name, columns in INDICES
+        ],
+    )
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    if fake:
+        return
+    execute_outside_transaction(
+        database,
+        [
+            f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"
+            for index_name, _, _ in INDICES
+        ],
+    )
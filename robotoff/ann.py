@@ -0,0 +1,505 @@
+"""Embedded approximate nearest neighbor (ANN) index for logo embeddings.
+
+This is an alternative to the Elasticsearch logo index, used when
+`settings.ANN_BACKEND` is `local`: kNN queries are then served in-process,
+without any network round-trip.
+
+Each server type has its own IVF-Flat index (inverted file): embeddings are
+clustered around `nlist` centroids, and only the `nprobe` clusters closest to
+the query are scanned at search time. An index is stored in a directory
+with the following layout:
+
+- `manifest.json`: name of the current snapshot
+- `<snapshot>/centroids.npy`, `<snapshot>/offsets.npy`, `<snapshot>/ids.npy`
+  and `<snapshot>/vectors.npy`: the snapshot, embeddings are sorted by
+  cluster and stored as normalized float32 vectors (float16 would halve the
+  size, but the conversion at search time is slower than the search itself).
+  `ids.npy` and `vectors.npy` are memory-mapped.
+- `<snapshot>/added.bin` and `<snapshot>/deleted.bin`: append-only logs of
+  the logos added to/deleted from the index since the snapshot was built.
+  They are shared by all processes, each process replays the new entries
+  before every query.
+
+A new snapshot is built with `build_snapshot` (see `rebuild-logo-ann-index`
+CLI command). The scheduler rebuilds the snapshot when the `added.bin` log
+has more than `settings.ANN_REBUILD_THRESHOLD` entries, as logged embeddings
+are kept in memory by each process and scanned exhaustively.
+"""
+
+import fcntl
+import functools
+import logging
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+from robotoff import settings
+from robotoff.types import ServerType
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 512
+# Record of the `added.bin` log: logo ID followed by the normalized embedding
+ADDED_RECORD_DTYPE = np.dtype([("id", "<i8"), ("embedding", "<f4", (EMBEDDING_DIM,))])
+DELETED_RECORD_DTYPE = np.dtype("<i8")
+MANIFEST_NAME = "manifest.json"
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize a 1D or 2D array of embeddings, as float32."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norm = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.where(norm == 0, 1.0, norm)
+
+
+def score_to_distance(scores: np.ndarray) -> np.ndarray:
+    """Convert cosine similarities to distances.
+
+    We use the same definition as for the Elasticsearch backend (where the
+    `dot_product` similarity score is `(1 + dot) / 2`), so that distances
+    don't depend on the ANN backend.
+    """
+    return (1.0 - scores) / 2.0
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive inter-process lock, used to serialize writes to the index."""
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_manifest(index_dir: Path) -> dict | None:
+    manifest_path = index_dir / MANIFEST_NAME
+    if not manifest_path.is_file():
+        return None
+    return orjson.loads(manifest_path.read_bytes())
+
+
+def _write_manifest(index_dir: Path, manifest: dict) -> None:
+    tmp_path = index_dir / f"{MANIFEST_NAME}.tmp"
+    tmp_path.write_bytes(orjson.dumps(manifest))
+    os.replace(tmp_path, index_dir / MANIFEST_NAME)
+
+
+def _get_log_length(path: Path, dtype: np.dtype) -> int:
+    """Return the number of complete records of an append-only log file."""
+    return path.stat().st_size // dtype.itemsize if path.is_file() else 0
+
+
+def _read_log(path: Path, dtype: np.dtype, offset: int) -> np.ndarray:
+    """Read all complete records of an append-only log file, starting from
+    `offset` (number of records)."""
+    count = _get_log_length(path, dtype) - offset
+    if count <= 0:
+        return np.empty(0, dtype=dtype)
+    return np.fromfile(path, dtype=dtype, count=count, offset=offset * dtype.itemsize)
+
+
+def get_added_log_length(index_dir: Path) -> int:
+    """Return the number of entries of the `added.bin` log of the current
+    snapshot (0 if the index doesn't exist)."""
+    manifest = _read_manifest(index_dir)
+    if manifest is None:
+        return 0
+    return _get_log_length(
+        index_dir / manifest["snapshot"] / "added.bin", ADDED_RECORD_DTYPE
+    )
+
+
+def train_kmeans(
+    embeddings: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 10,
+    chunk_size: int = 10_000,
+    seed: int = 42,
+) -> np.ndarray:
+    """Train spherical k-means centroids on normalized `embeddings`.
+
+    :param embeddings: a 2D array of normalized embeddings
+    :param n_clusters: the number of clusters
+    :param n_iter: number of k-means iterations
+    :param chunk_size: number of embeddings assigned at once, to bound memory
+        usage
+    :param seed: random seed
+    :return: the normalized centroids, as a (n_clusters, dim) float32 array
+    """
+    rng = np.random.default_rng(seed)
+    centroids = embeddings[
+        rng.choice(len(embeddings), size=n_clusters, replace=False)
+    ].astype(np.float32)
+
+    for _ in range(n_iter):
+        assignments = assign_clusters(embeddings, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, embeddings.astype(np.float32))
+        counts = np.bincount(assignments, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            # Re-initialize empty clusters with random embeddings
+            sums[empty] = embeddings[rng.choice(len(embeddings), size=int(empty.sum()))]
+        centroids = normalize(sums)
+
+    return centroids
+
+
+def assign_clusters(
+    embeddings: np.ndarray, centroids: np.ndarray, chunk_size: int = 10_000
+) -> np.ndarray:
+    """Return the index of the closest centroid of each embedding."""
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), chunk_size):
+        chunk = embeddings[start : start + chunk_size].astype(np.float32)
+        assignments[start : start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def get_default_nlist(count: int) -> int:
+    """Return the default number of IVF clusters for an index of `count`
+    embeddings."""
+    if count < 1_000:
+        # exhaustive search is fast enough
+        return 1
+    return min(int(4 * np.sqrt(count)), count // 40)
+
+
+def _write_snapshot(
+    index_dir: Path,
+    centroids: np.ndarray,
+    offsets: np.ndarray,
+    ids: np.ndarray,
+    vectors: np.ndarray,
+) -> str:
+    """Write snapshot files in a new directory of `index_dir` and return the
+    snapshot name."""
+    snapshot_name = f"snapshot-{time.time_ns()}"
+    snapshot_dir = index_dir / snapshot_name
+    snapshot_dir.mkdir()
+    np.save(snapshot_dir / "centroids.npy", centroids)
+    np.save(snapshot_dir / "offsets.npy", offsets)
+    np.save(snapshot_dir / "ids.npy", ids)
+    np.save(snapshot_dir / "vectors.npy", vectors)
+    return snapshot_name
+
+
+def build_snapshot(
+    index_dir: Path,
+    items: Iterable[tuple[int, np.ndarray]],
+    nlist: int | None = None,
+    train_size: int = 200_000,
+) -> int:
+    """Build a new snapshot of the index from scratch and make it the
+    current snapshot.
+
+    Logos added to or deleted from the previous snapshot while the new
+    snapshot was being built are carried over to the new snapshot.
+
+    :param index_dir: the index directory, created if it doesn't exist
+    :param items: an iterable of (logo ID, embedding) tuples
+    :param nlist: number of IVF clusters, see `get_default_nlist` for the
+        default value
+    :param train_size: maximum number of embeddings used to train the
+        centroids
+    :return: the number of embeddings in the snapshot
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    lock_path = index_dir / ".lock"
+
+    with _file_lock(lock_path):
+        previous_manifest = _read_manifest(index_dir)
+        previous_dir = (
+            index_dir / previous_manifest["snapshot"] if previous_manifest else None
+        )
+        # Log entries written after this point are replayed in the new
+        # snapshot
+        previous_log_offsets = (
+            (
+                _get_log_length(previous_dir / "added.bin", ADDED_RECORD_DTYPE),
+                _get_log_length(previous_dir / "deleted.bin", DELETED_RECORD_DTYPE),
+            )
+            if previous_dir
+            else (0, 0)
+        )
+
+    ids_list = []
+    embeddings_list = []
+    for logo_id, embedding in items:
+        ids_list.append(logo_id)
+        embeddings_list.append(normalize(embedding))
+
+    ids = np.array(ids_list, dtype=np.int64)
+    embeddings = (
+        np.stack(embeddings_list)
+        if embeddings_list
+        else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    )
+    count = len(ids)
+    nlist = max(1, min(nlist or get_default_nlist(count), max(count, 1)))
+    logger.info("Building ANN snapshot: %d embeddings, %d clusters", count, nlist)
+
+    if nlist == 1 or count == 0:
+        centroids = np.zeros((1, EMBEDDING_DIM), dtype=np.float32)
+        assignments = np.zeros(count, dtype=np.int64)
+    else:
+        rng = np.random.default_rng(42)
+        train_indices = rng.choice(count, size=min(count, train_size), replace=False)
+        centroids = train_kmeans(embeddings[train_indices], nlist)
+        assignments = assign_clusters(embeddings, centroids)
+
+    order = np.argsort(assignments, kind="stable")
+    offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(assignments, minlength=len(centroids)))
+
+    snapshot_name = _write_snapshot(
+        index_dir, centroids, offsets, ids[order], embeddings[order]
+    )
+    snapshot_dir = index_dir / snapshot_name
+
+    with _file_lock(lock_path):
+        if previous_dir is not None:
+            # Carry over log entries written during the build
+            added = _read_log(
+                previous_dir / "added.bin", ADDED_RECORD_DTYPE, previous_log_offsets[0]
+            )
+            deleted = _read_log(
+                previous_dir / "deleted.bin",
+                DELETED_RECORD_DTYPE,
+                previous_log_offsets[1],
+            )
+            added.tofile(snapshot_dir / "added.bin")
+            deleted.tofile(snapshot_dir / "deleted.bin")
+        _write_manifest(index_dir, {"snapshot": snapshot_name, "count": count})
+
+    if previous_dir is not None:
+        # Processes that still use the previous snapshot keep their memory
+        # maps valid after the deletion (on POSIX systems)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+
+    return count
+
+
+class LocalANNIndex:
+    """IVF-Flat ANN index stored in `index_dir`, see module documentation.
+
+    :param index_dir: the index directory
+    :param nprobe: number of clusters scanned at search time
+    """
+
+    def __init__(self, index_dir: Path, nprobe: int = settings.ANN_NPROBE):
+        self.index_dir = index_dir
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._snapshot_name: str | None = None
+        self._manifest_mtime_ns: int | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._centroids = np.zeros((1, EMBEDDING_DIM), dtype=np.float32)
+        self._offsets = np.zeros(2, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        # Buffers of the embeddings of the `added.bin` log, only the first
+        # `self._added_offset` rows are used. The capacity is doubled when
+        # full, so that replaying the log doesn't copy all entries every time
+        self._added_ids_buffer = np.empty(0, dtype=np.int64)
+        self._added_vectors_buffer = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        self._added_offset = 0
+        self._deleted_ids: set[int] = set()
+        self._deleted_offset = 0
+
+    @property
+    def _added_ids(self) -> np.ndarray:
+        return self._added_ids_buffer[: self._added_offset]
+
+    @property
+    def _added_vectors(self) -> np.ndarray:
+        return self._added_vectors_buffer[: self._added_offset]
+
+    def _extend_added(self, added: np.ndarray) -> None:
+        """Append `added.bin` records to the added buffers."""
+        end = self._added_offset + len(added)
+        if end > len(self._added_ids_buffer):
+            capacity = max(end, 2 * len(self._added_ids_buffer), 1024)
+            ids_buffer = np.empty(capacity, dtype=np.int64)
+            vectors_buffer = np.empty((capacity, EMBEDDING_DIM), dtype=np.float32)
+            ids_buffer[: self._added_offset] = self._added_ids
+            vectors_buffer[: self._added_offset] = self._added_vectors
+            # Previous buffers may still be used by a concurrent search, so we
+            # don't reuse them
+            self._added_ids_buffer = ids_buffer
+            self._added_vectors_buffer = vectors_buffer
+        self._added_ids_buffer[self._added_offset : end] = added["id"]
+        self._added_vectors_buffer[self._added_offset : end] = added["embedding"]
+        self._added_offset = end
+
+    @property
+    def _snapshot_dir(self) -> Path | None:
+        if self._snapshot_name is None:
+            return None
+        return self.index_dir / self._snapshot_name
+
+    def _refresh(self) -> None:
+        """Load the current snapshot if it changed, and replay the new entries
+        of the append-only logs. Must be called with `self._lock` held."""
+        manifest_path = self.index_dir / MANIFEST_NAME
+        try:
+            mtime_ns = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+
+        if mtime_ns != self._manifest_mtime_ns:
+            manifest = _read_manifest(self.index_dir)
+            self._reset()
+            self._snapshot_name = manifest["snapshot"] if manifest else None
+            self._manifest_mtime_ns = mtime_ns
+            if (snapshot_dir := self._snapshot_dir) is not None:
+                logger.info("Loading ANN snapshot %s", snapshot_dir)
+                self._centroids = np.load(snapshot_dir / "centroids.npy")
+                self._offsets = np.load(snapshot_dir / "offsets.npy")
+                self._ids = np.load(snapshot_dir / "ids.npy", mmap_mode="r")
+                self._vectors = np.load(snapshot_dir / "vectors.npy", mmap_mode="r")
+
+        if (snapshot_dir := self._snapshot_dir) is None:
+            return
+
+        added = _read_log(
+            snapshot_dir / "added.bin", ADDED_RECORD_DTYPE, self._added_offset
+        )
+        if len(added):
+            self._extend_added(added)
+            # A logo deleted and then re-added is no longer deleted
+            self._deleted_ids.difference_update(added["id"].tolist())
+
+        deleted = _read_log(
+            snapshot_dir / "deleted.bin", DELETED_RECORD_DTYPE, self._deleted_offset
+        )
+        if len(deleted):
+            self._deleted_ids.update(deleted.tolist())
+            self._deleted_offset += len(deleted)
+
+    def _append(self, filename: str, records: np.ndarray) -> None:
+        """Append records to a log of the current snapshot, creating an empty
+        snapshot first if the index doesn't exist yet."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.index_dir / ".lock"):
+            manifest = _read_manifest(self.index_dir)
+            if manifest is None:
+                snapshot_name = _write_snapshot(
+                    self.index_dir,
+                    np.zeros((1, EMBEDDING_DIM), dtype=np.float32),
+                    np.zeros(2, dtype=np.int64),
+                    np.empty(0, dtype=np.int64),
+                    np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+                )
+                manifest = {"snapshot": snapshot_name, "count": 0}
+                _write_manifest(self.index_dir, manifest)
+            with (self.index_dir / manifest["snapshot"] / filename).open("ab") as f:
+                records.tofile(f)
+
+    def add(self, logo_ids: list[int], embeddings: np.ndarray) -> None:
+        """Add logo embeddings to the index.
+
+        :param logo_ids: the IDs of the logos
+        :param embeddings: a 2D array of embeddings (not necessarily
+            normalized), one row per logo
+        """
+        if not logo_ids:
+            return
+        records = np.empty(len(logo_ids), dtype=ADDED_RECORD_DTYPE)
+        records["id"] = logo_ids
+        records["embedding"] = normalize(embeddings)
+        self._append("added.bin", records)
+
+    def delete(self, logo_ids: list[int]) -> int:
+        """Delete logos from the index.
+
+        :param logo_ids: the IDs of the logos to delete
+        :return: the number of logos deleted
+        """
+        if logo_ids:
+            self._append("deleted.bin", np.array(logo_ids, dtype=DELETED_RECORD_DTYPE))
+        return len(logo_ids)
+
+    def get_ids(self) -> set[int]:
+        """Return the IDs of all logos stored in the index."""
+        with self._lock:
+            self._refresh()
+            ids = set(self._ids.tolist()) | set(self._added_ids.tolist())
+            return ids - self._deleted_ids
+
+    def search(self, embedding: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Search for the `k` approximate nearest neighbors of `embedding`.
+
+        :param embedding: the 1D query embedding (not necessarily normalized)
+        :param k: the number of neighbors to return
+        :return: a list of (logo ID, distance) tuples, sorted by increasing
+            distance
+        """
+        query = normalize(embedding)
+        with self._lock:
+            self._refresh()
+            centroids = self._centroids
+            offsets = self._offsets
+            ids = self._ids
+            vectors = self._vectors
+            added_ids = self._added_ids
+            added_vectors = self._added_vectors
+            deleted_ids = self._deleted_ids.copy()
+
+        nprobe = min(self.nprobe, len(centroids))
+        if nprobe < len(centroids):
+            probed = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(len(centroids))
+
+        candidate_ids: list[np.ndarray] = [added_ids]
+        candidate_scores: list[np.ndarray] = [added_vectors @ query]
+        for cluster in probed:
+            start, end = offsets[cluster], offsets[cluster + 1]
+            if start == end:
+                continue
+            candidate_ids.append(np.asarray(ids[start:end]))
+            candidate_scores.append(vectors[start:end] @ query)
+
+        all_ids = np.concatenate(candidate_ids)
+        all_scores = np.concatenate(candidate_scores)
+
+        if deleted_ids:
+            mask = ~np.isin(all_ids, np.fromiter(deleted_ids, dtype=np.int64))
+            all_ids, all_scores = all_ids[mask], all_scores[mask]
+
+        order = np.argsort(-all_scores, kind="stable")
+        all_ids, all_scores = all_ids[order], all_scores[order]
+        if len(added_ids):
+            # The same logo may have been re-added after the snapshot: keep
+            # the best score for each ID
+            _, first_indices = np.unique(all_ids, return_index=True)
+            top = np.sort(first_indices)[:k]
+        else:
+            top = np.arange(min(k, len(all_ids)))
+        distances = score_to_distance(all_scores[top])
+        return [
+            (int(logo_id), float(distance))
+            for logo_id, distance in zip(all_ids[top], distances, strict=True)
+        ]
+
+
+def get_index_dir(server_type: ServerType) -> Path:
+    return settings.ANN_INDEX_DIR / server_type.name
+
+
+@functools.cache
+def get_local_ann_index(server_type: ServerType) -> LocalANNIndex:
+    """Return the local ANN index of `server_type`."""
+    return LocalANNIndex(get_index_dir(server_type))
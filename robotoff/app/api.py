@@ -1,15 +1,15 @@
-import csv
 import dataclasses
 import datetime
 import functools
 import hashlib
 import io
 import re
-import tempfile
+import time
 import typing
 import urllib
 import uuid
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Literal, cast
 
@@ -17,6 +17,7 @@ import falcon
 import numpy as np
 import orjson
 import peewee
+import PIL
 import requests
 from falcon.media.validators import jsonschema
 from openfoodfacts import OCRResult
@@ -31,26 +32,38 @@ from robotoff import settings
 from robotoff.app import schema
 from robotoff.app.auth import BasicAuthDecodeError, basic_decode, validate_token
 from robotoff.app.core import (
+    INSIGHT_CURSOR_FIELDS,
+    BatchAnnotation,
     SkipVotedOn,
     SkipVotedType,
+    encode_cursor,
     filter_question_insight_types,
     get_image_predictions,
     get_images,
     get_insights,
     get_logo_annotation,
     get_predictions,
+    get_random_questions_from_pool,
     save_annotation,
+    save_annotations,
     update_logo_annotations,
     validate_params,
 )
+from robotoff.app.count import get_count
+from robotoff.app.dump import DUMP_CONTENT_TYPES, DUMP_FORMATS, DUMP_MAX_ROWS, dump_rows
 from robotoff.app.middleware import CacheClearMiddleware, DBConnectionMiddleware
 from robotoff.batch import import_batch_predictions
 from robotoff.elasticsearch import get_es_client
+from robotoff.insights.annotate import AnnotationResult, AnnotationStatus
 from robotoff.insights.extraction import (
     DEFAULT_OCR_PREDICTION_TYPES,
     extract_ocr_predictions,
 )
-from robotoff.insights.question import QuestionFormatter, QuestionFormatterFactory
+from robotoff.insights.question import (
+    ProductImageCache,
+    QuestionFormatter,
+    QuestionFormatterFactory,
+)
 from robotoff.logos import (
     generate_insights_from_annotated_logos,
     generate_insights_from_annotated_logos_job,
@@ -85,7 +98,11 @@ from robotoff.types import (
     ServerType,
 )
 from robotoff.utils import get_image_from_url, get_logger, http_session
+from robotoff.utils.cache import disk_cache
+from robotoff.utils.embedding import decode_embedding
 from robotoff.utils.i18n import TranslationStore
+from robotoff.utils.image import crop_image
+from robotoff.utils.ocr import get_ocr_result
 from robotoff.utils.text import get_tag
 from robotoff.workers.queues import enqueue_job, get_high_queue, low_queue
 from robotoff.workers.tasks import download_product_dataset_job
@@ -220,12 +237,18 @@ class InsightCollection:
         order_by: str | None = req.get_param("order_by")
         campaigns: list[str] | None = req.get_param_as_list("campaigns") or None
         lc: list[str] | None = req.get_param_as_list("lc") or None
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
+        cursor: str | None = req.get_param("cursor")
 
-        if order_by not in ("random", "popularity", None):
+        if order_by not in ("random", "popularity", "id", None):
             raise falcon.HTTPBadRequest(
                 description=f"invalid `order_by` value: {order_by}"
             )
 
+        if cursor is not None and order_by is None:
+            # Cursors of the default order are cursors of the ID order
+            order_by = "id"
+
         if keep_types:
             # Limit the number of types to prevent slow SQL queries
             keep_types = keep_types[:10]
@@ -258,9 +281,21 @@ class InsightCollection:
             lc=lc,
         )
 
-        offset: int = (page - 1) * count
-        insights = [i.to_dict() for i in get_insights_(limit=count, offset=offset)]
-        response["count"] = get_insights_(count=True)
+        offset: int | None = None if cursor else (page - 1) * count
+        insight_models = list(get_insights_(limit=count, offset=offset, cursor=cursor))
+        insights = [i.to_dict() for i in insight_models]
+        # Results are not sorted by default (sorting by ID is slower with
+        # some filters), cursor-based pagination requires an order
+        if len(insight_models) == count and order_by in INSIGHT_CURSOR_FIELDS:
+            response["next_cursor"] = encode_cursor(
+                insight_models[-1], INSIGHT_CURSOR_FIELDS[order_by]
+            )
+        response["count"], response["count_exact"] = get_count(
+            "insights",
+            get_insights_.keywords,
+            lambda: get_insights_(count=True),
+            exact=exact_count,
+        )
 
         if not insights:
             response["insights"] = []
@@ -370,6 +405,16 @@ def device_id_from_request(req: falcon.Request) -> str:
     )
 
 
+def parse_annotator_auth(req: falcon.Request) -> OFFAuthentication | None:
+    """Return the authentication data of an insight annotation request, or
+    None for anonymous annotators."""
+    auth = parse_auth(req)
+    if auth is not None and auth.get_username() == "null":
+        # Smoothie currently sends 'null' as username for anonymous voters
+        auth = None
+    return auth
+
+
 class AnnotateInsightResource:
     def on_post(self, req: falcon.Request, resp: falcon.Response):
         insight_id = req.get_param_as_uuid("insight_id", required=True)
@@ -396,11 +441,7 @@ class AnnotateInsightResource:
                 description="`annotation` must be 2 when `data` is provided"
             )
 
-        auth = parse_auth(req)
-        if auth is not None and auth.get_username() == "null":
-            # Smoothie currently sends 'null' as username for anonymous voters
-            auth = None
-
+        auth = parse_annotator_auth(req)
         trusted_annotator = auth is not None
 
         if not trusted_annotator and annotation == 2:
@@ -433,6 +474,89 @@ class AnnotateInsightResource:
         }
 
 
+def get_batch_annotation_error(
+    annotation: BatchAnnotation, update: bool, trusted_annotator: bool
+) -> str | None:
+    """Return an error message if the annotation of a batch is invalid (same
+    checks as in `AnnotateInsightResource`), or None."""
+    try:
+        uuid.UUID(annotation.insight_id)
+    except ValueError:
+        return f"invalid insight ID: {annotation.insight_id}"
+
+    if annotation.annotation == 2:
+        if annotation.data is None:
+            return "`data` must be provided when annotation == 2"
+        if not update:
+            return "`update` must be true when annotation == 2"
+        if not trusted_annotator:
+            return "`data` cannot be provided when the user is not authenticated"
+    elif annotation.data is not None:
+        return "`annotation` must be 2 when `data` is provided"
+    return None
+
+
+class AnnotateInsightBatchResource:
+    @jsonschema.validate(schema.ANNOTATE_INSIGHT_BATCH_SCHEMA)
+    def on_post(self, req: falcon.Request, resp: falcon.Response):
+        media = req.get_media()
+        update: bool = media.get("update", True)
+        auth = parse_annotator_auth(req)
+        trusted_annotator = auth is not None
+        device_id = device_id_from_request(req)
+
+        results: list[AnnotationResult | None] = []
+        annotations: list[BatchAnnotation] = []
+        for item in media["annotations"]:
+            annotation = BatchAnnotation(
+                item["insight_id"], item["annotation"], item.get("data")
+            )
+            # Invalid annotations don't prevent the other annotations from
+            # being saved
+            error = get_batch_annotation_error(annotation, update, trusted_annotator)
+            if error is None:
+                annotations.append(annotation)
+                results.append(None)
+            else:
+                results.append(
+                    AnnotationResult(
+                        status_code=AnnotationStatus.error_invalid_data.value,
+                        status=AnnotationStatus.error_invalid_data.name,
+                        description=error,
+                    )
+                )
+
+        logger.info(
+            "New annotation batch received from %s (%d annotations)",
+            auth.get_username() if auth else "unknown annotator",
+            len(results),
+        )
+        saved_results = iter(
+            save_annotations(
+                annotations,
+                device_id=device_id,
+                update=update,
+                auth=auth,
+                trusted_annotator=trusted_annotator,
+            )
+        )
+        resp.media = {
+            "annotations": [
+                {
+                    "insight_id": item["insight_id"],
+                    "status_code": result.status_code,
+                    "status": result.status,
+                    "description": result.description,
+                }
+                for item, result in zip(
+                    media["annotations"],
+                    (result or next(saved_results) for result in results),
+                    strict=True,
+                )
+            ]
+        }
+
+
 class NutritionPredictorResource:
     def on_get(self, req: falcon.Request, resp: falcon.Response):
         image_url = req.get_param("image_url", required=True)
@@ -453,7 +577,7 @@ class NutritionPredictorResource:
             }
             return
 
-        ocr_result = OCRResult.from_url(ocr_url, http_session, error_raise=False)
+        ocr_result = get_ocr_result(ocr_url, http_session, error_raise=False)
 
         if ocr_result is None:
             logger.info("Error while downloading OCR JSON %s", ocr_url)
@@ -592,7 +716,7 @@ class IngredientListPredictorResource:
 
         ocr_url = req.get_param("ocr_url", required=True)
         try:
-            ocr_result = OCRResult.from_url(ocr_url, http_session, error_raise=True)
+            ocr_result = get_ocr_result(ocr_url, http_session, error_raise=True)
         except OCRResultGenerationException as e:
             error_message, _ = e.args
             resp.media = {
@@ -711,31 +835,58 @@ class ImageCropResource:
         x_min = req.get_param_as_float("x_min", required=True)
         y_max = req.get_param_as_float("y_max", required=True)
         x_max = req.get_param_as_float("x_max", required=True)
+        max_size: int | None = req.get_param_as_int(
+            "max_size", min_value=1, max_value=4096
+        )
 
         parsed_img_url = urllib.parse.urlparse(image_url)
         if parsed_img_url.hostname not in settings.CROP_ALLOWED_DOMAINS:
             raise falcon.HTTPBadRequest("Domain not allowed!")
 
-        # Get image from cache, as Hunger Games can requests many crops
-        # from the same image
-        image = typing.cast(
-            Image.Image | None,
-            get_image_from_url(
-                image_url, session=http_session, error_raise=False, use_cache=True
-            ),
-        )
+        # The crop only depends on the request parameters, so that the ETag
+        # can be computed before fetching the image
+        etag = hashlib.sha256(
+            orjson.dumps([image_url, y_min, x_min, y_max, x_max, max_size])
+        ).hexdigest()
+        resp.etag = etag
+        resp.cache_control = ["public", f"max-age={settings.CROP_CACHE_EXPIRE}"]
+        if etag in (req.if_none_match or []):
+            resp.status = falcon.HTTP_304
+            return
 
-        if image is None:
-            raise falcon.HTTPBadRequest(f"Could not fetch image: {image_url}")
+        # Hunger Games requests many crops of the same images, both the
+        # source image and the crops are cached
+        cache_key = f"crop:{etag}"
+        content = disk_cache.get(cache_key)
+        if content is None:
+            image_bytes = typing.cast(
+                bytes | None,
+                get_image_from_url(
+                    image_url,
+                    session=http_session,
+                    error_raise=False,
+                    use_cache=True,
+                    return_type="bytes",
+                ),
+            )
+            if image_bytes is None:
+                raise falcon.HTTPBadRequest(f"Could not fetch image: {image_url}")
 
-        left, right, top, bottom = (
-            x_min * image.width,
-            x_max * image.width,
-            y_min * image.height,
-            y_max * image.height,
-        )
-        cropped_image = image.crop((left, top, right, bottom))
-        image_response(cropped_image, resp)
+            try:
+                image = Image.open(io.BytesIO(image_bytes))
+            except (PIL.UnidentifiedImageError, Image.DecompressionBombError) as e:
+                raise falcon.HTTPBadRequest(
+                    f"Could not fetch image: {image_url}"
+                ) from e
+
+            cropped_image = crop_image(image, (y_min, x_min, y_max, x_max), max_size)
+            content = get_jpeg_bytes(cropped_image)
+            disk_cache.set(
+                cache_key, content, expire=settings.CROP_CACHE_EXPIRE, tag="crop"
+            )
+
+        resp.content_type = "image/jpeg"
+        resp.data = content
 
 
 class ImagePredictionImporterResource:
@@ -773,6 +924,8 @@ class ImagePredictionResource:
         image_id: str | None = req.get_param("image_id")
         min_confidence: float | None = req.get_param_as_float("min_confidence")
         server_type = get_server_type_from_req(req)
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
+        cursor: str | None = req.get_param("cursor")
 
         get_image_predictions_ = functools.partial(
             get_image_predictions,
@@ -786,11 +939,22 @@ class ImagePredictionResource:
             min_confidence=min_confidence,
         )
 
-        offset: int = (page - 1) * count
-        image_predictions = [
-            i.to_dict() for i in get_image_predictions_(limit=count, offset=offset)
-        ]
-        response: JSONType = {"count": get_image_predictions_(count=True)}
+        offset: int | None = None if cursor else (page - 1) * count
+        image_prediction_models = list(
+            get_image_predictions_(limit=count, offset=offset, cursor=cursor)
+        )
+        image_predictions = [i.to_dict() for i in image_prediction_models]
+        response: JSONType = {}
+        if len(image_prediction_models) == count:
+            response["next_cursor"] = encode_cursor(
+                image_prediction_models[-1], (ImagePrediction.id,)
+            )
+        response["count"], response["count_exact"] = get_count(
+            "image_predictions",
+            get_image_predictions_.keywords,
+            lambda: get_image_predictions_(count=True),
+            exact=exact_count,
+        )
 
         if not image_predictions:
             response["image_predictions"] = []
@@ -802,6 +966,14 @@ class ImagePredictionResource:
         resp.media = response
 
 
+# Threads are only started on the first submitted task, so that the executor
+# can be created before the API workers are forked
+image_predictor_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PREDICTOR_MAX_WORKERS,
+    thread_name_prefix="image_predictor",
+)
+
+
 class ImagePredictorResource:
     def on_get(self, req: falcon.Request, resp: falcon.Response):
         image_url = req.get_param("image_url", required=True)
@@ -812,6 +984,7 @@ class ImagePredictorResource:
         )
         nms_eta: float | None = req.get_param_as_float("nms_eta", default=None)
         nms: bool = req.get_param_as_bool("nms", default=True)
+        debug: bool = req.get_param_as_bool("debug", default=False)
         available_object_detection_models = list(
             ObjectDetectionModel.__members__.keys()
         )
@@ -857,52 +1030,80 @@ class ImagePredictorResource:
         if image_array is None:
             raise falcon.HTTPBadRequest(f"Could not fetch image: {image_url}")
 
-        predictions = {}
+        if output_image:
+            result = ObjectDetectionModelRegistry.get(
+                ObjectDetectionModel[models[0]]
+            ).detect_from_image(
+                image_array,
+                output_image=True,
+                threshold=threshold,
+                nms_threshold=nms_threshold,
+                nms_eta=nms_eta,
+                nms=nms,
+            )
+            image_response(cast(Image.Image, result.boxed_image), resp)
+            return
 
-        for model_name in models:
+        image_pillow = (
+            Image.fromarray(image_array)
+            if any(model_name in available_clf_models for model_name in models)
+            else None
+        )
+
+        def predict(model_name: str) -> tuple[list[JSONType], float]:
+            start_time = time.monotonic()
             if model_name in available_object_detection_models:
-                model = ObjectDetectionModelRegistry.get(
+                result = ObjectDetectionModelRegistry.get(
                     ObjectDetectionModel[model_name]
-                )
-                result = model.detect_from_image(
+                ).detect_from_image(
                     image_array,
-                    output_image=output_image,
                     threshold=threshold,
                     nms_threshold=nms_threshold,
                     nms_eta=nms_eta,
                     nms=nms,
                 )
-
-                if output_image:
-                    boxed_image = cast(Image.Image, result.boxed_image)
-                    image_response(boxed_image, resp)
-                    return
-                else:
-                    predictions[model_name] = result.to_list()
+                prediction = result.to_list()
             else:
-                model_enum = ImageClassificationModel[model_name]
-                classifier = image_classifier.ImageClassifier(
-                    image_classifier.MODELS_CONFIG[model_enum]
+                classifier = image_classifier.ImageClassifierRegistry.get(
+                    ImageClassificationModel[model_name]
                 )
-                image_pillow = Image.fromarray(image_array)
-                predictions[model_name] = [
+                prediction = [
                     {"label": label, "score": score}
-                    for label, score in classifier.predict(image_pillow)
+                    for label, score in classifier.predict(
+                        cast(Image.Image, image_pillow)
+                    )
                 ]
+            return prediction, time.monotonic() - start_time
 
-        resp.media = {"predictions": predictions}
+        # Models are run concurrently, so that the latency is the one of the
+        # slowest model instead of the sum of all model latencies
+        futures = {
+            model_name: image_predictor_executor.submit(predict, model_name)
+            for model_name in models
+        }
+        predictions = {}
+        timings = {}
+        for model_name, future in futures.items():
+            predictions[model_name], timings[model_name] = future.result()
 
+        response: JSONType = {"predictions": predictions}
+        if debug:
+            response["debug"] = {"timings": timings}
+        resp.media = response
 
-def image_response(image: Image.Image, resp: falcon.Response) -> None:
-    resp.content_type = "image/jpeg"
+
+def get_jpeg_bytes(image: Image.Image) -> bytes:
     fp = io.BytesIO()
     # JPEG doesn't support RGBA, so we convert to RGB if needed
     if image.mode != "RGB":
         image = image.convert("RGB")
     image.save(fp, "JPEG")
-    stream_len = fp.tell()
-    fp.seek(0)
-    resp.set_stream(fp, stream_len)
+    return fp.getvalue()
+
+
+def image_response(image: Image.Image, resp: falcon.Response) -> None:
+    resp.content_type = "image/jpeg"
+    resp.data = get_jpeg_bytes(image)
 
 
 class ImageLogoResource:
@@ -950,6 +1151,7 @@ class ImageLogoSearchResource:
         min_confidence: float | None = req.get_param_as_float("min_confidence")
         random: bool = req.get_param_as_bool("random", default=False)
         annotated: bool | None = req.get_param_as_bool("annotated")
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
 
         if type_ is None and (value is not None or taxonomy_value is not None):
             raise falcon.HTTPBadRequest(
@@ -997,7 +1199,21 @@ class ImageLogoSearchResource:
         if where_clauses:
             query = query.where(*where_clauses)
 
-        query_count = query.count()
+        query_count, count_exact = get_count(
+            "logos",
+            {
+                "server_type": server_type,
+                "type": type_,
+                "barcode": barcode,
+                "value": value,
+                "taxonomy_value": taxonomy_value,
+                "min_confidence": min_confidence,
+                "annotated": annotated,
+            },
+            query.count,
+            exact=exact_count,
+            estimate_query=query,
+        )
 
         if random:
             query = query.order_by(peewee.fn.Random())
@@ -1009,7 +1225,7 @@ class ImageLogoSearchResource:
             image_prediction = item.pop("image_prediction")
             item["image"] = image_prediction["image"]
 
-        resp.media = {"logos": items, "count": query_count}
+        resp.media = {"logos": items, "count": query_count, "count_exact": count_exact}
 
 
 def check_logo_annotation(type_: str, value: str | None = None) -> None:
@@ -1248,7 +1464,7 @@ class ANNResource:
             # for more information.
             result = db.execute_sql(
                 """
-                SELECT logo_id, embedding
+                SELECT logo_id, embedding, encoding
                 FROM embedding.logo_embedding as t1 TABLESAMPLE SYSTEM (20)
                 JOIN logo_annotation AS t2 ON t1.logo_id = t2.id
                 WHERE t2.server_type = %s
@@ -1261,14 +1477,15 @@ class ANNResource:
                 resp.media = {"results": [], "count": 0, "query_logo_id": None}
                 return
 
-            logo_id, embedding = result
+            logo_id, embedding_bytes, encoding = result
+            embedding = decode_embedding(embedding_bytes, encoding)
         else:
             logo_embedding = LogoEmbedding.get_or_none(logo_id=logo_id)
 
             if logo_embedding is None:
                 resp.status = falcon.HTTP_404
                 return
-            embedding = logo_embedding.embedding
+            embedding = logo_embedding.get_embedding()
 
         raw_results = [
             item
@@ -1364,10 +1581,15 @@ class ProductQuestionsResource:
             response["status"] = "no_questions"
         else:
             questions: list[JSONType] = []
+            product_images = ProductImageCache(
+                insight.get_product_id() for insight in insights
+            )
 
             for insight in insights:
                 formatter_cls = QuestionFormatterFactory.get(insight.type)
-                formatter: QuestionFormatter = formatter_cls(TRANSLATION_STORE)
+                formatter: QuestionFormatter = formatter_cls(
+                    TRANSLATION_STORE, product_images
+                )
                 question = formatter.format_question(insight, lang)
                 questions.append(question.serialize())
 
@@ -1421,6 +1643,7 @@ def get_questions_resource_on_get(
     # filter by annotation campaigns
     campaigns: list[str] | None = req.get_param_as_list("campaigns") or None
     with_image: bool | None = req.get_param_as_bool("with_image", default=None)
+    exact_count: bool = req.get_param_as_bool("exact_count", default=False)
 
     if campaigns is None:
         # `campaign` is a deprecated field, use campaigns now instead
@@ -1464,15 +1687,51 @@ def get_questions_resource_on_get(
         with_image=with_image,
     )
 
-    offset: int = (page - 1) * count
-    insights = list(get_insights_(limit=count, offset=offset))
-    response["count"] = get_insights_(count=True)
+    pool_results = None
+    if (
+        order_by == "random"
+        and reserved_barcode is False
+        and value_tag is None
+        and brands is None
+        and predictor is None
+        and with_image is None
+    ):
+        # Sample from the precomputed question pool instead of running an
+        # `ORDER BY random()` query over all matching insights
+        pool_results = get_random_questions_from_pool(
+            server_type=server_type,
+            keep_types=keep_types,
+            countries=countries,
+            campaigns=campaigns,
+            limit=count,
+            max_count=max_count,
+            avoid_voted_on=avoid_voted_on,
+        )
+
+    if pool_results is not None:
+        insights, response["count"] = pool_results
+        # The pool may contain insights annotated or deleted since its last
+        # rebuild
+        response["count_exact"] = False
+    else:
+        offset: int = (page - 1) * count
+        insights = list(get_insights_(limit=count, offset=offset))
+        response["count"], response["count_exact"] = get_count(
+            "questions",
+            get_insights_.keywords,
+            lambda: get_insights_(count=True),
+            exact=exact_count,
+        )
     # This code should be merged with the one in ProductQuestionsResource.get
     if not insights:
         response["questions"] = []
         response["status"] = "no_questions"
     else:
         questions: list[JSONType] = []
+        # The images of all products are fetched at once
+        product_images = ProductImageCache(
+            insight.get_product_id() for insight in insights
+        )
 
         for insight in insights:
             formatter_cls = QuestionFormatterFactory.get(insight.type)
@@ -1480,7 +1739,9 @@ def get_questions_resource_on_get(
             if formatter_cls is None:
                 continue
 
-            formatter: QuestionFormatter = formatter_cls(TRANSLATION_STORE)
+            formatter: QuestionFormatter = formatter_cls(
+                TRANSLATION_STORE, product_images
+            )
             question = formatter.format_question(insight, lang)
             questions.append(question.serialize())
 
@@ -1518,9 +1779,16 @@ class DumpResource:
         barcode = normalize_req_barcode(req.get_param("barcode"))
         annotated = req.get_param_as_bool("annotated", blank_as_true=False)
         value_tag = req.get_param("value_tag")
-        count = req.get_param_as_int("count", min_value=0, max_value=10_000)
+        count = req.get_param_as_int("count", min_value=0, max_value=DUMP_MAX_ROWS)
+        format: str = req.get_param("format", default="csv")
+        compress: bool = req.get_param_as_bool("compress", default=False)
         server_type = get_server_type_from_req(req)
 
+        if format not in DUMP_FORMATS:
+            raise falcon.HTTPBadRequest(
+                description=f"invalid format: {format}, expected one of {DUMP_FORMATS}"
+            )
+
         get_insights_ = functools.partial(
             get_insights,
             server_type=server_type,
@@ -1529,34 +1797,32 @@ class DumpResource:
             annotated=annotated,
             value_tag=value_tag,
         )
-        insight_count: int = get_insights_(count=True)  # type: ignore
-        if insight_count > 10_000 and count is None:
+        # Stop counting after DUMP_MAX_ROWS + 1 rows, we only need to know if
+        # the limit is exceeded
+        insight_count: int = get_insights_(count=True, max_count=DUMP_MAX_ROWS + 1)  # type: ignore
+        if insight_count > DUMP_MAX_ROWS and count is None:
             raise falcon.HTTPBadRequest(
-                description=f"more than 10 000 insights matching criteria (here: {insight_count}), "
+                description=f"more than {DUMP_MAX_ROWS} insights matching criteria, "
                 "use more specific criteria or use count parameter"
             )
 
-        insights_iter = get_insights_(limit=count, as_dict=True)
-        writer = None
-
-        with tempfile.TemporaryFile("w+", newline="") as temp_f:
-            for insight_dict in insights_iter:
-                serial = orjson.loads(orjson.dumps(insight_dict))
-
-                if writer is None:
-                    writer = csv.DictWriter(temp_f, fieldnames=serial.keys())
-                    writer.writeheader()
-
-                writer.writerow(serial)
-
-            temp_f.seek(0)
-            content = temp_f.read()
-
-        if content:
-            resp.content_type = "text/csv"
-            resp.body = content
-        else:
+        if insight_count == 0 or count == 0:
             resp.status = falcon.HTTP_204
+            return
+
+        resp.content_type = DUMP_CONTENT_TYPES[format]
+        filename = f"insights.{format}"
+        if compress:
+            resp.content_type = "application/gzip"
+            filename += ".gz"
+        resp.downloadable_as = filename
+        resp.stream = dump_rows(
+            functools.partial(
+                get_insights_, limit=count, as_dict=True, server_side=True
+            ),
+            format=format,
+            compress=compress,
+        )
 
 
 class UserStatisticsResource:
@@ -1577,6 +1843,8 @@ class ImageCollection:
         )
         barcode: str | None = normalize_req_barcode(req.get_param("barcode"))
         server_type = get_server_type_from_req(req)
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
+        cursor: str | None = req.get_param("cursor")
 
         get_images_ = functools.partial(
             get_images,
@@ -1585,9 +1853,17 @@ class ImageCollection:
             server_type=server_type,
         )
 
-        offset: int = (page - 1) * count
-        images = [i.to_dict() for i in get_images_(limit=count, offset=offset)]
-        response["count"] = get_images_(count=True)
+        offset: int | None = None if cursor else (page - 1) * count
+        image_models = list(get_images_(limit=count, offset=offset, cursor=cursor))
+        images = [i.to_dict() for i in image_models]
+        if len(image_models) == count:
+            response["next_cursor"] = encode_cursor(image_models[-1], (ImageModel.id,))
+        response["count"], response["count_exact"] = get_count(
+            "images",
+            get_images_.keywords,
+            lambda: get_images_(count=True),
+            exact=exact_count,
+        )
 
         if not images:
             response["images"] = []
@@ -1607,6 +1883,8 @@ class PredictionCollection:
         value_tag: str = req.get_param("value_tag")
         keep_types: list[str] | None = req.get_param_as_list("types", required=False)
         server_type = get_server_type_from_req(req)
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
+        cursor: str | None = req.get_param("cursor")
 
         if keep_types:
             # Limit the number of types to prevent slow SQL queries
@@ -1620,12 +1898,26 @@ class PredictionCollection:
             server_type=server_type,
         )
 
-        offset: int = (page - 1) * count
-        predictions = [
-            i.to_dict() for i in get_predictions_(limit=count, offset=offset)
-        ]
+        offset: int | None = None if cursor else (page - 1) * count
+        prediction_models = list(
+            get_predictions_(limit=count, offset=offset, cursor=cursor)
+        )
+        predictions = [i.to_dict() for i in prediction_models]
 
-        response: JSONType = {"count": get_predictions_(count=True)}
+        response: JSONType = {}
+        if len(prediction_models) == count:
+            response["next_cursor"] = encode_cursor(
+                prediction_models[-1], (Prediction.id,)
+            )
+        response["count"], response["count_exact"] = get_count(
+            "predictions",
+            get_predictions_.keywords,
+            lambda: get_predictions_(count=True),
+            exact=exact_count,
+            estimate_query=Prediction.select().where(
+                Prediction.server_type == server_type.name
+            ),
+        )
 
         if not predictions:
             response["predictions"] = []
@@ -1656,6 +1948,7 @@ class UnansweredQuestionCollection:
             campaigns = [campaign] if campaign is not None else None
 
         predictor = req.get_param("predictor")
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
 
         get_insights_ = functools.partial(
             get_insights,
@@ -1673,7 +1966,12 @@ class UnansweredQuestionCollection:
         offset: int = (page - 1) * count
         insights = list(get_insights_(offset=offset))
 
-        response["count"] = get_insights_(count=True)
+        response["count"], response["count_exact"] = get_count(
+            "unanswered_questions",
+            get_insights_.keywords,
+            lambda: get_insights_(count=True),
+            exact=exact_count,
+        )
 
         if not insights:
             response["questions"] = []
@@ -1694,6 +1992,8 @@ class ImagePredictionCollection:
         barcode: str | None = normalize_req_barcode(req.get_param("barcode"))
         type: str | None = req.get_param("type")
         server_type = get_server_type_from_req(req)
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
+        cursor: str | None = req.get_param("cursor")
 
         query_parameters = {
             "with_logo": with_logo,
@@ -1706,11 +2006,21 @@ class ImagePredictionCollection:
             get_image_predictions, **query_parameters
         )
 
-        offset: int = (page - 1) * count
-        image_predictions = [
-            i.to_dict() for i in get_image_predictions_(limit=count, offset=offset)
-        ]
-        response["count"] = get_image_predictions_(count=True)
+        offset: int | None = None if cursor else (page - 1) * count
+        image_prediction_models = list(
+            get_image_predictions_(limit=count, offset=offset, cursor=cursor)
+        )
+        image_predictions = [i.to_dict() for i in image_prediction_models]
+        if len(image_prediction_models) == count:
+            response["next_cursor"] = encode_cursor(
+                image_prediction_models[-1], (ImagePrediction.id,)
+            )
+        response["count"], response["count_exact"] = get_count(
+            "image_predictions",
+            query_parameters,
+            lambda: get_image_predictions_(count=True),
+            exact=exact_count,
+        )
 
         if not image_predictions:
             response["image_predictions"] = []
@@ -1731,6 +2041,7 @@ class LogoAnnotationCollection:
         value_tag: str = req.get_param("value_tag")
         page: int = req.get_param_as_int("page", min_value=1, default=1)
         count: int = req.get_param_as_int("count", min_value=1, default=25)
+        exact_count: bool = req.get_param_as_bool("exact_count", default=False)
 
         if keep_types:
             # Limit the number of types to prevent slow SQL queries
@@ -1747,7 +2058,12 @@ class LogoAnnotationCollection:
 
         offset: int = (page - 1) * count
         annotation = [i.to_dict() for i in get_annotation_(limit=count, offset=offset)]
-        response["count"] = get_annotation_(count=True)
+        response["count"], response["count_exact"] = get_count(
+            "logo_annotations",
+            query_parameters,
+            lambda: get_annotation_(count=True),
+            exact=exact_count,
+        )
 
         if not annotation:
             response["annotation"] = []
@@ -1829,6 +2145,7 @@ api.add_route("/api/v1/insights/detail/{insight_id:uuid}", ProductInsightDetail(
 api.add_route("/api/v1/insights", InsightCollection())
 api.add_route("/api/v1/insights/random", RandomInsightResource())
 api.add_route("/api/v1/insights/annotate", AnnotateInsightResource())
+api.add_route("/api/v1/insights/annotate/batch", AnnotateInsightBatchResource())
 api.add_route("/api/v1/insights/dump", DumpResource())
 api.add_route("/api/v1/predict/nutrition", NutritionPredictorResource())
 api.add_route("/api/v1/predict/ocr_prediction", OCRPredictionPredictorResource())
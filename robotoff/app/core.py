@@ -1,23 +1,32 @@
+import base64
+import binascii
 import datetime
 import functools
 import logging
+from collections import defaultdict
 from collections.abc import Iterable
 from enum import Enum
 from typing import Literal, NamedTuple
 
 import falcon
+import orjson
 import peewee
 from openfoodfacts.types import COUNTRY_CODE_TO_NAME, Country
 from peewee import JOIN, SQL, fn
+from playhouse.postgres_ext import ServerSide
 from pydantic import BaseModel, ValidationError
+from redis.exceptions import RedisError
 
+from robotoff.insights import question_pool, voted_insights
 from robotoff.insights.annotate import (
     ALREADY_ANNOTATED_RESULT,
+    FAILED_ANNOTATION_RESULT,
     SAVED_ANNOTATION_VOTE_RESULT,
     UNKNOWN_INSIGHT_RESULT,
     AnnotationResult,
     annotate,
 )
+from robotoff.insights.importer import refresh_insights
 from robotoff.insights.question import QuestionFormatterFactory
 from robotoff.models import (
     AnnotationVote,
@@ -30,7 +39,7 @@ from robotoff.models import (
 )
 from robotoff.off import OFFAuthentication
 from robotoff.taxonomy import match_taxonomized_value
-from robotoff.types import InsightAnnotation, JSONType, ServerType
+from robotoff.types import InsightAnnotation, JSONType, ProductIdentifier, ServerType
 from robotoff.utils.text import get_tag
 
 logger = logging.getLogger(__name__)
@@ -49,21 +58,141 @@ class SkipVotedOn(NamedTuple):
     id: str
 
 
-def _add_vote_exclusion_clause(exclusion: SkipVotedOn) -> peewee.Expression:
-    """Return a peewee expression to exclude insights that have been voted on
-    by the user."""
+def _get_vote_criteria(exclusion: SkipVotedOn) -> peewee.Expression:
+    """Return a peewee expression to select the votes of the user."""
     if exclusion.by == SkipVotedType.DEVICE_ID:
-        criteria = AnnotationVote.device_id == exclusion.id
+        return AnnotationVote.device_id == exclusion.id
     elif exclusion.by == SkipVotedType.USERNAME:
-        criteria = AnnotationVote.username == exclusion.id
+        return AnnotationVote.username == exclusion.id
     else:
         raise ValueError(f"Unknown SkipVoteType: {exclusion.by}")
 
+
+def _add_vote_exclusion_clause(exclusion: SkipVotedOn) -> peewee.Expression:
+    """Return a peewee expression to exclude insights that have been voted on
+    by the user."""
     return ProductInsight.id.not_in(
-        AnnotationVote.select(AnnotationVote.insight_id).where(criteria)
+        AnnotationVote.select(AnnotationVote.insight_id).where(
+            _get_vote_criteria(exclusion)
+        )
     )
 
 
+def _get_voted_set_key(exclusion: SkipVotedOn) -> str:
+    """Return the key of the Redis set of the insights voted on by the user,
+    see `robotoff.insights.voted_insights`."""
+    return voted_insights.get_voted_set_key(exclusion.by.name.lower(), exclusion.id)
+
+
+def _load_voted_set(exclusion: SkipVotedOn) -> str:
+    """Load the Redis set of the insights voted on by the user from the DB if
+    needed, and return its key.
+
+    :raises RedisError: if Redis is unavailable
+    """
+    key = _get_voted_set_key(exclusion)
+    voted_insights.load_voted_set(
+        key,
+        lambda: (
+            str(insight_id)
+            for (insight_id,) in AnnotationVote.select(AnnotationVote.insight_id)
+            .where(_get_vote_criteria(exclusion))
+            .tuples()
+            .iterator()
+        ),
+    )
+    return key
+
+
+# Number of insights fetched in addition to `limit` when voted insights are
+# removed after the query, see `get_insights`
+VOTE_EXCLUSION_OVERFETCH = 10
+
+
+def _filter_voted_insights(
+    query: peewee.SelectQuery, voted_set_key: str, limit: int
+) -> list[ProductInsight] | None:
+    """Run `query`, fetching more than `limit` insights, and remove the
+    insights voted on by the user.
+
+    :return: at most `limit` insights, or None if there are not enough
+        insights left after the exclusion to know whether the page is
+        complete: the exact anti-join query must be used in this case
+    """
+    fetch_limit = limit * 2 + VOTE_EXCLUSION_OVERFETCH
+    candidates = list(query.limit(fetch_limit))
+    voted = voted_insights.is_voted(
+        voted_set_key, [str(insight.id) for insight in candidates]
+    )
+    insights = [
+        insight
+        for insight, is_voted in zip(candidates, voted, strict=True)
+        if not is_voted
+    ]
+    if len(insights) >= limit or len(candidates) < fetch_limit:
+        return insights[:limit]
+    return None
+
+
+# Number of rows fetched at once from server-side cursors
+SERVER_SIDE_CURSOR_ARRAY_SIZE = 2000
+
+# Fields used to sort insights for each `order_by` value of `get_insights`
+# that supports cursor-based pagination. All orders are descending, except
+# `id`.
+INSIGHT_CURSOR_FIELDS: dict[str, tuple[peewee.Field, ...]] = {
+    "id": (ProductInsight.id,),
+    "popularity": (ProductInsight.unique_scans_n, ProductInsight.id),
+    "n_votes": (ProductInsight.n_votes, ProductInsight.id),
+}
+
+
+def encode_cursor(item: peewee.Model, fields: tuple[peewee.Field, ...]) -> str:
+    """Return an opaque pagination cursor pointing after `item`.
+
+    The cursor encodes the value of the sort `fields` (the last one being
+    always the ID) of the last item of a page, so that the next page can be
+    fetched with a keyset condition instead of an OFFSET.
+
+    :param item: the last item of the current page
+    :param fields: the sort fields
+    :return: the cursor, as an URL-safe string
+    """
+    values = [getattr(item, field.name) for field in fields]
+    return base64.urlsafe_b64encode(orjson.dumps(values, default=str)).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a pagination cursor generated by `encode_cursor`.
+
+    :param cursor: the cursor
+    :param size: the expected number of sort fields
+    :raises falcon.HTTPBadRequest: if the cursor is invalid
+    :return: the values of the sort fields
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise falcon.HTTPBadRequest(description=f"invalid cursor: {cursor}")
+    return values
+
+
+def _get_keyset_clause(
+    cursor: str, fields: tuple[peewee.Field, ...], descending: bool = False
+) -> peewee.Expression:
+    """Return a peewee expression selecting the items that come after the
+    cursor, with results sorted by `fields`."""
+    values = decode_cursor(cursor, len(fields))
+    if len(fields) == 1:
+        lhs, rhs = fields[0], values[0]
+    else:
+        lhs, rhs = peewee.Tuple(*fields), peewee.Tuple(*values)
+    return lhs < rhs if descending else lhs > rhs
+
+
 def get_insights(
     barcode: str | None = None,
     server_type: ServerType = ServerType.off,
@@ -72,12 +201,15 @@ def get_insights(
     brands: list[str] | None = None,
     annotated: bool | None = False,
     annotation: int | None = None,
-    order_by: Literal["random", "popularity", "n_votes", "confidence"] | None = None,
+    order_by: (
+        Literal["random", "popularity", "n_votes", "confidence", "id"] | None
+    ) = None,
     value_tag: str | None = None,
     reserved_barcode: bool | None = None,
     as_dict: bool = False,
     limit: int | None = 25,
     offset: int | None = None,
+    cursor: str | None = None,
     count: bool = False,
     max_count: int | None = None,
     avoid_voted_on: SkipVotedOn | None = None,
@@ -87,6 +219,7 @@ def get_insights(
     predictor: str | None = None,
     lc: list[str] | None = None,
     with_image: bool | None = None,
+    server_side: bool = False,
 ) -> Iterable[ProductInsight]:
     """Fetch insights that meet the criteria passed as parameters.
 
@@ -108,8 +241,8 @@ def get_insights(
         defaults to None
     :param order_by: order results either randomly (random), by popularity
         (popularity), by number of votes on this insight (n_votes), by
-        decreasing confidence score (confidence) or don't order results
-        (None), defaults to None
+        decreasing confidence score (confidence), by ID (id) or don't order
+        results (None), defaults to None
     :param value_tag: only keep insights with this value_tag, defaults to None
     :param reserved_barcode: only keep insights with reserved barcodes (True)
         or without reserved barcode (False), defaults to None
@@ -117,6 +250,9 @@ def get_insights(
         peewee objects, defaults to False
     :param limit: limit on the number of returned results, defaults to 25
     :param offset: query offset (used for pagination), defaults to None
+    :param cursor: pagination cursor returned by `encode_cursor` for the
+        last insight of the previous page, only supported if `order_by` is
+        one of `INSIGHT_CURSOR_FIELDS`, defaults to None
     :param count: if True, return the number of results instead of the
         results, defaults to False
     :param count_max: an upper bound on the number of insights to count,
@@ -140,6 +276,9 @@ def get_insights(
         It is used to filter lang of ingredient_spellcheck
     :param with_image: only keep insights that have an associated image (True)
         or not (False), defaults to None
+    :param server_side: if True, fetch results in batches using a server-side
+        cursor, so that large result sets are never fully loaded in memory.
+        Results must be consumed within a transaction, defaults to False
     :return: the return value is either:
         - an iterable of ProductInsight objects or dict (if `as_dict=True`)
         - the number of products (if `count=True`)
@@ -193,8 +332,38 @@ def get_insights(
     if with_image is not None:
         where_clauses.append(ProductInsight.with_image == with_image)
 
+    voted_set_key = None
     if avoid_voted_on:
-        where_clauses.append(_add_vote_exclusion_clause(avoid_voted_on))
+        if (
+            not count
+            and not as_dict
+            and not group_by_value_tag
+            and not server_side
+            and limit is not None
+            # Excluding insights after the query shifts OFFSET-based pages
+            and (not offset or order_by == "random")
+        ):
+            # Voted insights are excluded after the query, using the Redis
+            # set of voted insights: the anti-join cost grows with the number
+            # of votes of the user
+            try:
+                voted_set_key = _load_voted_set(avoid_voted_on)
+            except RedisError:
+                logger.warning("Voted insight set unavailable", exc_info=True)
+
+        if voted_set_key is None:
+            where_clauses.append(_add_vote_exclusion_clause(avoid_voted_on))
+
+    if cursor is not None and not count:
+        if order_by not in INSIGHT_CURSOR_FIELDS:
+            raise falcon.HTTPBadRequest(
+                description=f"cursor pagination is not supported with order_by={order_by}"
+            )
+        where_clauses.append(
+            _get_keyset_clause(
+                cursor, INSIGHT_CURSOR_FIELDS[order_by], descending=order_by != "id"
+            )
+        )
 
     query = ProductInsight.select()
     if where_clauses:
@@ -227,20 +396,132 @@ def get_insights(
             )
 
         elif order_by == "popularity":
-            query = query.order_by(ProductInsight.unique_scans_n.desc())
+            query = query.order_by(
+                ProductInsight.unique_scans_n.desc(), ProductInsight.id.desc()
+            )
 
         elif order_by == "confidence":
             query = query.order_by(SQL("confidence DESC NULLS LAST"))
 
         elif order_by == "n_votes":
-            query = query.order_by(ProductInsight.n_votes.desc())
+            query = query.order_by(
+                ProductInsight.n_votes.desc(), ProductInsight.id.desc()
+            )
+
+        elif order_by == "id":
+            query = query.order_by(ProductInsight.id)
 
     if as_dict:
         query = query.dicts()
 
+    if server_side:
+        return ServerSide(query, array_size=SERVER_SIDE_CURSOR_ARRAY_SIZE)
+
+    if voted_set_key is not None and avoid_voted_on is not None and limit is not None:
+        try:
+            insights = _filter_voted_insights(query, voted_set_key, limit)
+        except RedisError:
+            logger.warning("Voted insight set unavailable", exc_info=True)
+            insights = None
+        if insights is not None:
+            return insights
+        # Most fetched insights were voted on by the user, fall back to the
+        # exact anti-join
+        query = query.where(_add_vote_exclusion_clause(avoid_voted_on))
+
     return query.iterator()
 
 
+# Number of times the question pool is sampled to replace stale insights
+# before falling back to the DB
+MAX_POOL_SAMPLE_ROUNDS = 3
+
+
+def get_random_questions_from_pool(
+    server_type: ServerType,
+    keep_types: list[str],
+    countries: list[Country] | None = None,
+    campaigns: list[str] | None = None,
+    limit: int = 25,
+    max_count: int | None = None,
+    avoid_voted_on: SkipVotedOn | None = None,
+) -> tuple[list[ProductInsight], int] | None:
+    """Return random non-annotated insights from the question pool (see
+    `robotoff.insights.question_pool`), along with the total number of
+    matching insights.
+
+    The selection and ordering follow the same weighting as
+    `get_insights(order_by="random")`, with `reserved_barcode=False` and
+    `automatically_processable=False`.
+
+    :param server_type: the server type of the insights
+    :param keep_types: only keep insights that have any of the these types
+    :param countries: only keep insights with `country` in this list of
+        countries. At most one country is supported.
+    :param campaigns: only keep insights that have *all* of these campaigns.
+        At most one campaign is supported.
+    :param limit: the maximum number of insights to return
+    :param max_count: an upper bound on the returned count
+    :param avoid_voted_on: a SkipVotedOn used to remove insights the user
+        previously voted on
+    :return: a (insights, count) tuple, or None if the filters are not
+        supported by the pool, if the pool is not ready yet or if too many
+        sampled insights were stale. The count is approximate, as the pool may
+        contain stale insights.
+    """
+    if (countries is not None and len(countries) > 1) or (
+        campaigns is not None and len(campaigns) > 1
+    ):
+        return None
+
+    country = COUNTRY_CODE_TO_NAME[countries[0]] if countries else None
+    campaign = campaigns[0] if campaigns else None
+    pool_keys = [
+        question_pool.get_pool_key(server_type, insight_type, country, campaign)
+        for insight_type in keep_types
+    ]
+    insights: list[ProductInsight] = []
+    try:
+        if not question_pool.is_pool_ready(server_type):
+            return None
+        voted_set_key = _load_voted_set(avoid_voted_on) if avoid_voted_on else None
+        for _ in range(MAX_POOL_SAMPLE_ROUNDS):
+            insight_ids = question_pool.sample_question_ids(
+                pool_keys,
+                limit - len(insights),
+                voted_set_key,
+                exclude={str(insight.id) for insight in insights},
+            )
+            insights_by_id = {}
+            if insight_ids:
+                insights_by_id = {
+                    str(insight.id): insight
+                    for insight in ProductInsight.select().where(
+                        ProductInsight.id.in_(insight_ids),
+                        ProductInsight.annotation.is_null(),
+                    )
+                }
+            insights += [
+                insights_by_id[id_] for id_ in insight_ids if id_ in insights_by_id
+            ]
+            # The pool may contain insights that were annotated or deleted
+            # since the last rebuild: they are removed from the pool, and
+            # replaced by new samples
+            stale_ids = [id_ for id_ in insight_ids if id_ not in insights_by_id]
+            question_pool.discard_from_pools(pool_keys, stale_ids)
+            if not stale_ids or len(insights) >= limit:
+                break
+        else:
+            # Too many stale insights in the pool, it needs to be rebuilt
+            logger.info("Too many stale insights in the question pool, using the DB")
+            return None
+        count = question_pool.count_questions(pool_keys, voted_set_key, max_count)
+    except RedisError:
+        logger.warning("Question pool unavailable, using the DB", exc_info=True)
+        return None
+    return insights, count
+
+
 def get_images(
     server_type: ServerType,
     with_predictions: bool | None = False,
@@ -248,12 +529,21 @@ def get_images(
     offset: int | None = None,
     count: bool = False,
     limit: int | None = None,
+    cursor: str | None = None,
 ) -> Iterable[ImageModel]:
+    """Return images that fit the criteria passed as parameters.
+
+    Images are sorted by ID, `cursor` can be used for cursor-based
+    pagination (see `encode_cursor`).
+    """
     where_clauses = [ImageModel.server_type == server_type.name]
 
     if barcode:
         where_clauses.append(ImageModel.barcode == barcode)
 
+    if cursor is not None and not count:
+        where_clauses.append(_get_keyset_clause(cursor, (ImageModel.id,)))
+
     query = ImageModel.select()
 
     if not with_predictions:
@@ -274,7 +564,7 @@ def get_images(
     if count:
         return query.count()
     else:
-        return query.iterator()
+        return query.order_by(ImageModel.id).iterator()
 
 
 def get_predictions(
@@ -285,7 +575,13 @@ def get_predictions(
     limit: int | None = None,
     offset: int | None = None,
     count: bool = False,
+    cursor: str | None = None,
 ) -> Iterable[Prediction]:
+    """Return predictions that fit the criteria passed as parameters.
+
+    Predictions are sorted by ID, `cursor` can be used for cursor-based
+    pagination (see `encode_cursor`).
+    """
     where_clauses = [Prediction.server_type == server_type.name]
 
     if barcode:
@@ -297,6 +593,9 @@ def get_predictions(
     if keep_types:
         where_clauses.append(Prediction.type.in_(keep_types))
 
+    if cursor is not None and not count:
+        where_clauses.append(_get_keyset_clause(cursor, (Prediction.id,)))
+
     query = Prediction.select()
 
     if where_clauses:
@@ -311,7 +610,7 @@ def get_predictions(
     if count:
         return query.count()
     else:
-        return query.iterator()
+        return query.order_by(Prediction.id).iterator()
 
 
 def get_image_predictions(
@@ -326,7 +625,13 @@ def get_image_predictions(
     offset: int | None = None,
     count: bool = False,
     limit: int | None = None,
+    cursor: str | None = None,
 ) -> Iterable[ImagePrediction]:
+    """Return image predictions that fit the criteria passed as parameters.
+
+    Image predictions are sorted by ID, `cursor` can be used for cursor-based
+    pagination (see `encode_cursor`).
+    """
     query = ImagePrediction.select()
 
     query = query.switch(ImagePrediction).join(ImageModel)
@@ -350,6 +655,9 @@ def get_image_predictions(
     if min_confidence is not None:
         where_clauses.append(ImagePrediction.max_confidence >= min_confidence)
 
+    if cursor is not None and not count:
+        where_clauses.append(_get_keyset_clause(cursor, (ImagePrediction.id,)))
+
     if not with_logo:
         # return only images without logo
         query = (
@@ -372,7 +680,7 @@ def get_image_predictions(
     if count:
         return query.count()
     else:
-        return query.iterator()
+        return query.order_by(ImagePrediction.id).iterator()
 
 
 def save_annotation(
@@ -383,6 +691,7 @@ def save_annotation(
     data: dict | None = None,
     auth: OFFAuthentication | None = None,
     trusted_annotator: bool = False,
+    refresh: bool = True,
 ) -> AnnotationResult:
     """Saves annotation either by using a single response as ground truth or
     by using several responses.
@@ -409,6 +718,8 @@ def save_annotation(
     :param trusted_annotator: Defines whether the given annotation comes from
     an authoritative source (e.g. a trusted user), ot whether the annotation
     should be subject to the voting system.
+    :param refresh: If True, refresh the insights of the product after the
+      annotation (default: True)
     """
     try:
         insight: ProductInsight | None = ProductInsight.get_by_id(insight_id)
@@ -426,12 +737,18 @@ def save_annotation(
     if not trusted_annotator or annotation == -1:
         verified = False
 
-        AnnotationVote.create(
+        vote = AnnotationVote.create(
             insight_id=insight_id,
             username=auth.get_username() if auth else None,
             value=annotation,
             device_id=device_id,
         )
+        voters = [SkipVotedOn(SkipVotedType.DEVICE_ID, device_id)]
+        if vote.username:
+            voters.append(SkipVotedOn(SkipVotedType.USERNAME, vote.username))
+        voted_insights.add_voted_insight(
+            [_get_voted_set_key(voter) for voter in voters], str(insight_id)
+        )
 
         with db.atomic() as tx:
             try:
@@ -481,14 +798,118 @@ def save_annotation(
                 verified = True
 
         if not verified:
+            # Update the vote bucket of the insight
+            question_pool.update_question_pool([insight])
             return SAVED_ANNOTATION_VOTE_RESULT
 
     result = annotate(
-        insight, annotation, update, data=data, auth=auth, is_vote=not trusted_annotator
+        insight,
+        annotation,
+        update,
+        data=data,
+        auth=auth,
+        is_vote=not trusted_annotator,
+        refresh=refresh,
     )
+    question_pool.update_question_pool([insight])
     return result
 
 
+class BatchAnnotation(NamedTuple):
+    """An annotation of a batch, see `save_annotations`."""
+
+    insight_id: str
+    annotation: InsightAnnotation
+    data: dict | None = None
+
+
+# Results of `save_annotation` for which the insight was not annotated, and
+# the product insights don't need to be refreshed
+NOT_ANNOTATED_STATUSES = {
+    UNKNOWN_INSIGHT_RESULT.status,
+    ALREADY_ANNOTATED_RESULT.status,
+    SAVED_ANNOTATION_VOTE_RESULT.status,
+}
+
+
+def save_annotations(
+    annotations: list[BatchAnnotation],
+    device_id: str,
+    update: bool = True,
+    auth: OFFAuthentication | None = None,
+    trusted_annotator: bool = False,
+) -> list[AnnotationResult]:
+    """Save a batch of annotations, see `save_annotation`.
+
+    Annotations are grouped by product: the annotations of a product are
+    saved (and sent to Product Opener) one after the other, and the insights
+    of the product are then refreshed once, instead of after each
+    annotation. An annotation that fails with an unexpected error gets a
+    `FAILED_ANNOTATION_RESULT` result, and doesn't prevent the other
+    annotations from being saved.
+
+    :param annotations: the annotations to save
+    :param device_id: Unique identifier of the device, see
+      `device_id_from_request`
+    :param update: If True, perform the update on Product Opener if
+      annotation=1, otherwise only save the annotation (default: True)
+    :param auth: User authentication data, it is expected to be None if
+        `trusted_annotator=False` (=anonymous vote)
+    :param trusted_annotator: Defines whether the given annotations come from
+    an authoritative source (e.g. a trusted user), ot whether the annotations
+    should be subject to the voting system.
+    :return: the annotation result of each annotation, in the same order as
+        `annotations`
+    """
+    product_ids = {
+        str(insight_id): ProductIdentifier(barcode, ServerType[server_type])
+        for insight_id, barcode, server_type in ProductInsight.select(
+            ProductInsight.id, ProductInsight.barcode, ProductInsight.server_type
+        )
+        .where(
+            ProductInsight.id.in_([annotation.insight_id for annotation in annotations])
+        )
+        .tuples()
+    }
+    results: list[AnnotationResult] = [UNKNOWN_INSIGHT_RESULT] * len(annotations)
+    indices_by_product: dict[ProductIdentifier, list[int]] = defaultdict(list)
+    for i, annotation in enumerate(annotations):
+        product_id = product_ids.get(str(annotation.insight_id))
+        if product_id is not None:
+            indices_by_product[product_id].append(i)
+
+    for product_id, indices in indices_by_product.items():
+        for i in indices:
+            try:
+                results[i] = save_annotation(
+                    annotations[i].insight_id,
+                    annotations[i].annotation,
+                    device_id=device_id,
+                    update=update,
+                    data=annotations[i].data,
+                    auth=auth,
+                    trusted_annotator=trusted_annotator,
+                    refresh=False,
+                )
+            except Exception:
+                logger.exception(
+                    "Error while saving annotation of insight %s",
+                    annotations[i].insight_id,
+                )
+                results[i] = FAILED_ANNOTATION_RESULT
+
+        if any(results[i].status not in NOT_ANNOTATED_STATUSES for i in indices):
+            try:
+                for import_result in refresh_insights(product_id):
+                    logger.info(import_result)
+            except Exception:
+                # The annotations were saved, the insights will be refreshed
+                # during the next product update
+                logger.exception("Error while refreshing insights of %s", product_id)
+
+    return results
+
+
 def get_logo_annotation(
     server_type: ServerType,
     barcode: str | None = None,
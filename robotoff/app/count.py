@@ -0,0 +1,113 @@
+"""Count service for paginated API endpoints.
+
+Counting the number of results matching the filters of a paginated endpoint
+is often slower than fetching the page itself. Counts are therefore cached
+in the disk cache (shared between API workers) for `settings.COUNT_CACHE_TTL`
+seconds, keyed by the normalized filter parameters. For unfiltered queries,
+the estimate of the PostgreSQL query planner is used instead.
+
+Clients can request an exact count with the `exact_count` query parameter.
+"""
+
+import enum
+import hashlib
+from collections.abc import Callable
+from typing import Any
+
+import orjson
+import peewee
+
+from robotoff import settings
+from robotoff.models import db
+from robotoff.utils.cache import disk_cache
+
+COUNT_CACHE_TAG = "count"
+
+
+def _normalize_filter_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, tuple) and hasattr(value, "_asdict"):
+        # NamedTuple
+        return {k: _normalize_filter_value(v) for k, v in value._asdict().items()}
+    if isinstance(value, list | tuple | set):
+        # The order of multi-valued filters doesn't change the count
+        return sorted(str(_normalize_filter_value(item)) for item in value)
+    return value
+
+
+def get_count_cache_key(name: str, filters: dict[str, Any]) -> str:
+    """Return the cache key of the count of an endpoint.
+
+    :param name: the name of the counted collection (ex: `predictions`)
+    :param filters: the filter parameters of the query
+    """
+    normalized = {
+        key: _normalize_filter_value(value)
+        for key, value in filters.items()
+        if value is not None
+    }
+    digest = hashlib.sha256(
+        orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS, default=str)
+    ).hexdigest()
+    return f"count:{name}:{digest}"
+
+
+def is_unfiltered(filters: dict[str, Any]) -> bool:
+    """Return True if no filter other than `server_type` is provided."""
+    return all(
+        value is None or value == []
+        for key, value in filters.items()
+        if key != "server_type"
+    )
+
+
+def estimate_count(query: peewee.SelectQuery) -> int:
+    """Return the number of rows returned by `query` as estimated by the
+    PostgreSQL query planner."""
+    sql, params = query.sql()
+    cursor = db.execute_sql(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    (plan,) = cursor.fetchone()
+    if isinstance(plan, str | bytes):
+        plan = orjson.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def get_count(
+    name: str,
+    filters: dict[str, Any],
+    count_func: Callable[[], Any],
+    exact: bool = False,
+    estimate_query: peewee.SelectQuery | None = None,
+) -> tuple[int, bool]:
+    """Return the number of results of a paginated endpoint.
+
+    If `exact` is False, the count is either:
+
+    - the planner estimate of `estimate_query`, if provided and if the query
+      is unfiltered (see `is_unfiltered`)
+    - the cached count, if a count was computed for the same filters during
+      the last `settings.COUNT_CACHE_TTL` seconds
+
+    Otherwise, `count_func` is called and the result is cached.
+
+    :param name: the name of the counted collection (ex: `predictions`)
+    :param filters: the filter parameters of the query, used as cache key
+    :param count_func: the function returning the exact count
+    :param exact: if True, always return an exact count, defaults to False
+    :param estimate_query: the query used to get a planner estimate for
+        unfiltered queries, defaults to None (no estimate)
+    :return: a (count, is_exact) tuple
+    """
+    key = get_count_cache_key(name, filters)
+    if not exact:
+        if estimate_query is not None and is_unfiltered(filters):
+            return estimate_count(estimate_query), False
+
+        cached_count = disk_cache.get(key)
+        if cached_count is not None:
+            return cached_count, False
+
+    count = count_func()
+    disk_cache.set(key, count, expire=settings.COUNT_CACHE_TTL, tag=COUNT_CACHE_TAG)
+    return count, True
@@ -0,0 +1,137 @@
+"""Streaming exporters used by the `/insights/dump` endpoint.
+
+Rows are serialized chunk by chunk, so that the memory usage doesn't depend
+on the number of exported rows. Exporters are generators of `bytes`, meant
+to be used as falcon response stream.
+"""
+
+import csv
+import datetime
+import io
+import uuid
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+import orjson
+
+from robotoff.models import db
+
+# Maximum number of rows of a dump, memory usage doesn't depend on the number
+# of rows, but the dump must be generated before the request timeout
+DUMP_MAX_ROWS = 1_000_000
+
+# Approximate size (in bytes) of the chunks sent to the client
+DUMP_CHUNK_SIZE = 64 * 1024
+
+DUMP_FORMATS = ("csv", "jsonl")
+
+DUMP_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/jsonl",
+}
+
+
+def _to_csv_value(value: Any) -> Any:
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def iter_csv_chunks(
+    rows: Iterable[dict[str, Any]], chunk_size: int = DUMP_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Serialize rows as CSV, the header is generated from the keys of the
+    first row.
+
+    :param rows: the rows to serialize, all rows must have the same keys
+    :param chunk_size: the approximate size of the yielded chunks
+    :yield: UTF-8 encoded CSV chunks
+    """
+    buffer = io.StringIO(newline="")
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=row.keys())
+            writer.writeheader()
+        writer.writerow({key: _to_csv_value(value) for key, value in row.items()})
+
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_jsonl_chunks(
+    rows: Iterable[dict[str, Any]], chunk_size: int = DUMP_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Serialize rows as JSONL (one JSON object per line).
+
+    :param rows: the rows to serialize
+    :param chunk_size: the approximate size of the yielded chunks
+    :yield: JSONL chunks
+    """
+    lines: list[bytes] = []
+    size = 0
+    for row in rows:
+        line = orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+        lines.append(line)
+        size += len(line)
+
+        if size >= chunk_size:
+            yield b"".join(lines)
+            lines = []
+            size = 0
+
+    if lines:
+        yield b"".join(lines)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks using gzip.
+
+    Empty compressed chunks are not yielded, so that the response is only
+    flushed when there is data to send.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_rows(get_rows: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+    """Yield the rows returned by `get_rows`, in a dedicated DB connection and
+    transaction.
+
+    The response stream is consumed after the end of the request processing
+    (and after the DB connection was closed by `DBConnectionMiddleware`), we
+    therefore open a new connection. The transaction is required by
+    server-side cursors.
+    """
+    with db.connection_context(), db.atomic():
+        yield from get_rows()
+
+
+def dump_rows(
+    get_rows: Callable[[], Iterable[dict[str, Any]]],
+    format: str = "csv",
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Return the response stream of a dump.
+
+    :param get_rows: a function returning the rows to dump, called when the
+        response stream is consumed
+    :param format: the output format, one of `DUMP_FORMATS`, defaults to "csv"
+    :param compress: if True, compress the output using gzip, defaults to
+        False
+    """
+    rows = stream_rows(get_rows)
+    chunks = iter_csv_chunks(rows) if format == "csv" else iter_jsonl_chunks(rows)
+    return gzip_chunks(chunks) if compress else chunks
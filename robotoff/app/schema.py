@@ -178,6 +178,31 @@ ANNOTATE_LOGO_SCHEMA: JSONType = {
 }
 
 
+ANNOTATE_INSIGHT_BATCH_SCHEMA: JSONType = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "Annotate Insight Batch",
+    "type": "object",
+    "properties": {
+        "annotations": {
+            "type": "array",
+            "minItems": 1,
+            "maxItems": 500,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "insight_id": {"type": "string", "format": "uuid"},
+                    "annotation": {"type": "integer", "minimum": -1, "maximum": 2},
+                    "data": {"type": "object"},
+                },
+                "required": ["insight_id", "annotation"],
+            },
+        },
+        "update": {"type": "boolean", "default": True},
+    },
+    "required": ["annotations"],
+}
+
+
 class LanguagePredictorResourceParams(BaseModel):
     text: Annotated[
         str, Field(..., description="the text to predict language of", min_length=1)
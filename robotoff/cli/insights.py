@@ -1,47 +1,248 @@
 import _io
+import collections
 import contextlib
 import gzip
 import logging
+import os
 import sys
-from collections.abc import Iterable
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from pathlib import Path
 
 import dacite
 import orjson
 import tqdm
+from more_itertools import chunked, consume
 from openfoodfacts.images import extract_barcode_from_path
 from openfoodfacts.ocr import OCRResult
 
 from robotoff.insights.extraction import DEFAULT_OCR_PREDICTION_TYPES
 from robotoff.prediction.ocr import extract_predictions
-from robotoff.prediction.ocr.core import ocr_content_iter
+from robotoff.prediction.ocr.core import ocr_content_iter, preload_extractors
 from robotoff.types import Prediction, PredictionType, ProductIdentifier, ServerType
-from robotoff.utils import jsonl_iter
+from robotoff.utils import get_open_fn, jsonl_iter
 
 logger = logging.getLogger(__name__)
 
 
+class _InProcessExecutor(Executor):
+    """Executor running tasks in the current process, when a single worker is
+    requested."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
 def run_from_ocr_archive(
     input_path: Path,
     prediction_types: list[PredictionType] | None,
     server_type: ServerType,
     output: Path | None = None,
+    workers: int = 1,
+    chunk_size: int = 1000,
+    sharded: bool = False,
+    resume: bool = False,
 ):
     """Generate predictions from an OCR archive file and save these
     predictions on-disk or send them to stdout.
 
+    The archive is split into chunks of `chunk_size` OCRs, and predictions
+    are extracted from each chunk in a pool of `workers` processes. The
+    throughput (in OCRs per second) is reported during extraction.
+
     :param input_path: path of the archive file (gzipped JSONL)
     :param prediction_types: list of prediction types to extract, if None
         default OCR predictions types will be extracted (see
         robotoff.insights.extraction.DEFAULT_OCR_PREDICTION_TYPES).
     :param server_type: server type associated with the OCR archive.
     :param output: the file path where to save the predictions, or None if
-        the JSON should be sent to stdout, defaults to None.
+        the JSON should be sent to stdout, defaults to None. If `sharded` is
+        True, the directory where to save the prediction shards.
+    :param workers: the number of worker processes, defaults to 1 (the
+        predictions are extracted in the current process)
+    :param chunk_size: the number of OCRs per chunk, defaults to 1000
+    :param sharded: if True, the predictions of each chunk are saved in a
+        separate gzipped JSONL file (`{chunk index}.jsonl.gz`) in the
+        `output` directory. Otherwise, all predictions are saved in order in
+        `output`. Defaults to False.
+    :param resume: if True, chunks whose shard already exists are skipped,
+        to resume an interrupted extraction. Only supported if `sharded` is
+        True, defaults to False. The input file, chunk size and prediction
+        types must be the same as in the interrupted extraction (they are
+        saved in a manifest file in the `output` directory).
+    """
+    if sharded and output is None:
+        raise ValueError("an output directory is required for sharded output")
+    if resume and not sharded:
+        raise ValueError("resume is only supported for sharded output")
+    if prediction_types is None:
+        prediction_types = DEFAULT_OCR_PREDICTION_TYPES
+
+    if sharded:
+        assert output is not None
+        output.mkdir(parents=True, exist_ok=True)
+        manifest = _get_shard_manifest(input_path, prediction_types, chunk_size)
+        manifest_path = output / SHARD_MANIFEST_NAME
+        if resume:
+            if not manifest_path.is_file():
+                raise ValueError(f"cannot resume: {manifest_path} not found")
+            if orjson.loads(manifest_path.read_bytes()) != manifest:
+                raise ValueError(
+                    "cannot resume: the input file, chunk size or prediction types "
+                    f"changed since the previous run (see {manifest_path})"
+                )
+        else:
+            manifest_path.write_bytes(orjson.dumps(manifest))
+        # Predictions are written in the shards by the workers
+        consume(
+            _run_extraction(
+                input_path,
+                prediction_types,
+                server_type,
+                workers,
+                chunk_size,
+                output_dir=output,
+                resume=resume,
+            )
+        )
+    else:
+        _write_predictions(
+            _run_extraction(
+                input_path, prediction_types, server_type, workers, chunk_size
+            ),
+            output,
+        )
+
+
+# Name of the file describing the extraction of the shards of an output
+# directory, used to check that an extraction is resumed with the same
+# parameters
+SHARD_MANIFEST_NAME = "manifest.json"
+
+
+def _get_shard_manifest(
+    input_path: Path, prediction_types: list[PredictionType], chunk_size: int
+) -> dict:
+    return {
+        "input_path": str(input_path.resolve()),
+        "input_size": input_path.stat().st_size,
+        "chunk_size": chunk_size,
+        "prediction_types": [
+            prediction_type.name for prediction_type in prediction_types
+        ],
+    }
+
+
+def _run_extraction(
+    input_path: Path,
+    prediction_types: list[PredictionType],
+    server_type: ServerType,
+    workers: int,
+    chunk_size: int,
+    output_dir: Path | None = None,
+    resume: bool = False,
+) -> Iterator[tuple[bytes, int]]:
+    """Extract predictions from the archive by chunks, in a process pool.
+
+    See `run_from_ocr_archive` for a description of the parameters.
+
+    :yield: for each chunk (in order), the extracted predictions (as JSONL)
+        and the number of OCRs of the chunk. If `output_dir` is not None,
+        predictions are saved in the shard of the chunk, and no prediction is
+        returned.
+    """
+    executor: Executor
+    if workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=preload_extractors,
+            initargs=(prediction_types,),
+        )
+    else:
+        preload_extractors(prediction_types)
+        executor = _InProcessExecutor()
+
+    # The number of chunks being processed is bounded, so that the archive is
+    # not loaded in memory if it's read faster than it's processed
+    pending: collections.deque[Future] = collections.deque()
+    ocr_count = 0
+    start_time = time.monotonic()
+    progress_bar = tqdm.tqdm(desc="OCR", unit="OCR")
+    open_fn = get_open_fn(input_path)
+    with executor, open_fn(str(input_path), "rb") as input_f:
+        for chunk_index, lines in enumerate(chunked(input_f, chunk_size)):
+            shard_path = None
+            if output_dir is not None:
+                shard_path = output_dir / f"{chunk_index:06d}.jsonl.gz"
+                if resume and shard_path.exists():
+                    continue
+            pending.append(
+                executor.submit(
+                    extract_from_ocr_lines,
+                    lines,
+                    prediction_types,
+                    server_type,
+                    shard_path,
+                )
+            )
+            while len(pending) > 2 * workers or (pending and pending[0].done()):
+                result = pending.popleft().result()
+                ocr_count += result[1]
+                progress_bar.update(result[1])
+                yield result
+
+        while pending:
+            result = pending.popleft().result()
+            ocr_count += result[1]
+            progress_bar.update(result[1])
+            yield result
+
+    progress_bar.close()
+    elapsed = time.monotonic() - start_time
+    logger.info(
+        "%d OCRs processed in %.1fs (%.1f OCRs/s)",
+        ocr_count,
+        elapsed,
+        ocr_count / elapsed if elapsed else 0.0,
+    )
+
+
+def extract_from_ocr_lines(
+    lines: list[bytes],
+    prediction_types: list[PredictionType],
+    server_type: ServerType,
+    shard_path: Path | None = None,
+) -> tuple[bytes, int]:
+    """Extract predictions from a chunk of lines of an OCR archive.
+
+    :param lines: the JSONL lines of the chunk
+    :param prediction_types: list of prediction types to extract
+    :param server_type: server type associated with the OCR archive.
+    :param shard_path: if not None, the predictions are saved in this gzipped
+        JSONL file (written atomically) instead of being returned
+    :return: the predictions (as JSONL) and the number of OCRs of the chunk
     """
-    predictions = tqdm.tqdm(
-        generate_from_ocr_archive(input_path, prediction_types, server_type),
-        desc="prediction",
+    items = [orjson.loads(line) for line in lines if line.strip()]
+    predictions = b"".join(
+        orjson.dumps(prediction.to_dict()) + b"\n"
+        for prediction in generate_from_ocr_items(items, prediction_types, server_type)
     )
+    if shard_path is None:
+        return predictions, len(items)
+
+    tmp_path = shard_path.with_name(f"{shard_path.name}.{os.getpid()}.tmp")
+    with gzip.open(tmp_path, "wb") as f:
+        f.write(predictions)
+    os.replace(tmp_path, shard_path)
+    return b"", len(items)
+
+
+def _write_predictions(
+    results: Iterable[tuple[bytes, int]], output: Path | None
+) -> None:
     output_f: _io._TextIOBase
     need_decoding = False
 
@@ -55,8 +256,7 @@ def run_from_ocr_archive(
         need_decoding = True
 
     with contextlib.closing(output_f):
-        for prediction in predictions:
-            raw_data = orjson.dumps(prediction.to_dict()) + b"\n"
+        for raw_data, _ in results:
             data = raw_data.decode("utf-8") if need_decoding else raw_data
             output_f.write(data)
 
@@ -78,9 +278,24 @@ def generate_from_ocr_archive(
     if prediction_types is None:
         prediction_types = DEFAULT_OCR_PREDICTION_TYPES
 
-    for source_image, ocr_json in ocr_content_iter(
-        tqdm.tqdm(jsonl_iter(input_path), desc="OCR")
-    ):
+    yield from generate_from_ocr_items(
+        tqdm.tqdm(jsonl_iter(input_path), desc="OCR"), prediction_types, server_type
+    )
+
+
+def generate_from_ocr_items(
+    items: Iterable[dict],
+    prediction_types: list[PredictionType],
+    server_type: ServerType,
+) -> Iterable[Prediction]:
+    """Generate predictions from the items of an OCR archive file.
+
+    :param items: the items of the archive file
+    :param prediction_types: list of prediction types to extract
+    :param server_type: server type associated with the OCR archive.
+    :yield: the extracted `Prediction`s
+    """
+    for source_image, ocr_json in ocr_content_iter(items):
         if source_image is None:
             continue
 
@@ -6,6 +6,7 @@ from openfoodfacts.types import Environment, Flavor
 
 from robotoff.products import fetch_parquet_datasets
 from robotoff.types import (
+    EmbeddingEncoding,
     ImportImageFlag,
     ObjectDetectionModel,
     PredictionType,
@@ -45,6 +46,58 @@ def download_taxonomies(
     logger.info("All taxonomies downloaded successfully.")
 
 
+@app.command()
+def build_keyword_processor_snapshots() -> None:
+    """Build the snapshots of the keyword processors used for OCR and
+    category predictions, so that workers don't have to build them on first
+    use.
+
+    Only missing or stale snapshots are rebuilt.
+    """
+    import time
+    from collections.abc import Callable
+
+    from robotoff.prediction.category.neural.keras_category_classifier_3_0.preprocessing import (
+        get_ingredient_processor,
+    )
+    from robotoff.prediction.ocr.brand import (
+        get_brand_processor,
+        get_taxonomy_brand_processor,
+    )
+    from robotoff.prediction.ocr.packager_code import (
+        generate_fishing_code_keyword_processor,
+        generate_USDA_code_keyword_processor,
+    )
+    from robotoff.utils import get_logger
+
+    logger = get_logger()
+    processor_getters: dict[str, Callable[[], object]] = {
+        "brand": get_brand_processor,
+        "taxonomy_brand": get_taxonomy_brand_processor,
+        "fishing_code": generate_fishing_code_keyword_processor,
+        "USDA_code": generate_USDA_code_keyword_processor,
+        "ingredient_v3": get_ingredient_processor,
+    }
+    for name, get_processor in processor_getters.items():
+        start_time = time.monotonic()
+        get_processor()
+        logger.info(
+            "Keyword processor %s loaded in %.3fs", name, time.monotonic() - start_time
+        )
+
+
+@app.command()
+def build_grammar_snapshots() -> None:
+    """Build the snapshots of the Lark parsers used for packaging
+    predictions, so that workers don't have to build them on first use.
+
+    Only missing or stale snapshots are rebuilt.
+    """
+    from robotoff.prediction.ocr.packaging import load_grammar
+
+    load_grammar("fr")
+
+
 @app.command()
 def run_worker(
     queues: list[str] = typer.Argument(..., help="Names of the queues to listen to"),
@@ -249,10 +302,27 @@ def generate_ocr_predictions(
     ),
     output: Path | None = typer.Option(
         None,
-        help="File to write output to, stdout if not specified. Gzipped output are supported.",
-        dir_okay=False,
+        help="File to write output to, stdout if not specified. Gzipped output are "
+        "supported. With --sharded, directory to write the output shards to.",
         writable=True,
     ),
+    workers: int = typer.Option(
+        1, help="Number of worker processes used to extract predictions", min=1
+    ),
+    chunk_size: int = typer.Option(
+        1000, help="Number of OCRs sent at once to a worker process", min=1
+    ),
+    sharded: bool = typer.Option(
+        False,
+        help="Write the predictions of each chunk to a separate gzipped JSONL "
+        "file in the --output directory, instead of a single file",
+    ),
+    resume: bool = typer.Option(
+        False,
+        help="Skip the chunks whose output shard already exists, to resume an "
+        "interrupted run with the same input, chunk size and prediction types "
+        "(requires --sharded)",
+    ),
 ) -> None:
     """Generate OCR predictions of the requested type."""
     from robotoff.cli import insights
@@ -260,7 +330,14 @@ def generate_ocr_predictions(
 
     get_logger()
     insights.run_from_ocr_archive(
-        input_path, prediction_type or None, server_type, output
+        input_path,
+        prediction_type or None,
+        server_type,
+        output,
+        workers=workers,
+        chunk_size=chunk_size,
+        sharded=sharded,
+        resume=resume,
     )
 
 
@@ -821,9 +898,10 @@ def run_nutrition_extraction(
 
     from robotoff.images import get_image_from_url
     from robotoff.prediction.nutrition_extraction import predict
+    from robotoff.utils.ocr import get_ocr_result
 
     image = cast(Image.Image, get_image_from_url(image_url))
-    ocr_result = cast(OCRResult, OCRResult.from_url(image_url.replace(".jpg", ".json")))
+    ocr_result = cast(OCRResult, get_ocr_result(image_url.replace(".jpg", ".json")))
     prediction = predict(
         image, ocr_result, model_version=model_version, triton_uri=triton_uri
     )
@@ -912,14 +990,73 @@ def add_logo_to_ann(
     logger.info("%s embeddings indexed", added)
 
 
+@app.command()
+def rebuild_logo_ann_index(
+    server_type: ServerType = typer.Option(ServerType.off, help="Server type"),
+    nlist: int | None = typer.Option(
+        None,
+        help="Number of IVF clusters of the index. By default, it depends on the "
+        "number of logos.",
+    ),
+) -> None:
+    """Rebuild the local logo ANN index (used when `ANN_BACKEND=local`) from
+    the logo embeddings stored in DB, and save a new snapshot on disk."""
+    import time
+
+    from robotoff.logos import rebuild_local_ann_index
+    from robotoff.models import db
+    from robotoff.utils import get_logger
+
+    logger = get_logger()
+    start_time = time.monotonic()
+    with db.connection_context():
+        count = rebuild_local_ann_index(server_type, nlist=nlist)
+    logger.info(
+        "Local ANN index rebuilt with %d logos in %.1fs",
+        count,
+        time.monotonic() - start_time,
+    )
+
+
+@app.command()
+def rebuild_question_pool(
+    server_type: ServerType = typer.Option(ServerType.off, help="Server type"),
+) -> None:
+    """Rebuild the pool of question candidates used to serve random questions
+    (`/questions/random`)."""
+    from robotoff.insights.question_pool import (
+        rebuild_question_pool as _rebuild_question_pool,
+    )
+    from robotoff.models import db
+    from robotoff.utils import get_logger
+
+    get_logger()
+    with db.connection_context():
+        _rebuild_question_pool(server_type)
+
+
 @app.command()
 def refresh_logo_nearest_neighbors(
     day_offset: int = typer.Option(7, help="Number of days since last refresh", min=1),
     batch_size: int = typer.Option(500, help="Number of logos to process at once"),
     server_type: ServerType = typer.Option(ServerType.off, help="Server type"),
+    incremental: bool = typer.Option(
+        False,
+        help="Only refresh logos whose neighborhood is impacted by logos indexed "
+        "or annotated since the last run",
+    ),
+    full_refresh_day_offset: int = typer.Option(
+        30,
+        help="In incremental mode, number of days between two full refreshes",
+        min=1,
+    ),
 ):
     """Refresh each logo nearest neighbors if the last refresh is more than
-    `day_offset` days old."""
+    `day_offset` days old.
+
+    With `--incremental`, only logos whose neighborhood is impacted by logos
+    indexed or annotated since the last run are refreshed, and a full refresh
+    is performed every `full_refresh_day_offset` days."""
     import logging
 
     from robotoff.logos import refresh_nearest_neighbors
@@ -932,7 +1069,13 @@ def refresh_logo_nearest_neighbors(
     logger.info("Starting refresh of logo nearest neighbors")
 
     with db.connection_context():
-        refresh_nearest_neighbors(server_type, day_offset, batch_size)
+        refresh_nearest_neighbors(
+            server_type,
+            day_offset,
+            batch_size,
+            incremental=incremental,
+            full_refresh_day_offset=full_refresh_day_offset,
+        )
 
 
 @app.command()
@@ -964,8 +1107,10 @@ def import_logo_embeddings(
     import tqdm
     from more_itertools import chunked
 
+    from robotoff import settings
     from robotoff.models import LogoAnnotation, LogoEmbedding, db
     from robotoff.utils import get_logger
+    from robotoff.utils.embedding import encode_embedding
 
     logger = get_logger()
     logger.info("Importing logo embeddings from %s", input_path)
@@ -1006,17 +1151,25 @@ def import_logo_embeddings(
                         assert embedding.dtype == np.float32
                         assert not np.all(embedding == 0.0)
                         logo_id = int(logo_ids[i])
+                        encoded_embedding = encode_embedding(
+                            embedding, settings.EMBEDDING_ENCODING
+                        )
                         if logo_id in existing_logo_ids:
                             if logo_id not in existing_embedding_logo_ids:
                                 LogoEmbedding.create(
-                                    logo_id=logo_id, embedding=embedding.tobytes()
+                                    logo_id=logo_id,
+                                    embedding=encoded_embedding,
+                                    encoding=settings.EMBEDDING_ENCODING.value,
                                 )
                                 existing_embedding_logo_ids.add(logo_id)
                                 imported += 1
                             elif update_if_exists:
                                 updated += (
                                     LogoEmbedding.update(
-                                        {"embedding": embedding.tobytes()}
+                                        {
+                                            "embedding": encoded_embedding,
+                                            "encoding": settings.EMBEDDING_ENCODING.value,
+                                        }
                                     )
                                     .where(LogoEmbedding.logo_id == logo_id)
                                     .execute()
@@ -1034,6 +1187,67 @@ def import_logo_embeddings(
     )
 
 
+@app.command()
+def reencode_embeddings(
+    encoding: EmbeddingEncoding = typer.Option(
+        EmbeddingEncoding.float16, help="Target encoding of the embeddings"
+    ),
+    table: str = typer.Option(
+        "logo", help="Embedding table to re-encode, either 'logo' or 'image'"
+    ),
+    batch_size: int = typer.Option(1000, help="Number of embeddings to update at once"),
+) -> None:
+    """Re-encode the logo or image embeddings stored in DB with another
+    encoding.
+
+    Embeddings that already use the target encoding are left untouched. Run
+    `VACUUM FULL` on the table afterwards to reclaim disk space.
+    """
+    import tqdm
+
+    from robotoff.models import ImageEmbedding, LogoEmbedding, db
+    from robotoff.utils import get_logger
+    from robotoff.utils.embedding import encode_embedding
+
+    logger = get_logger()
+
+    if table == "logo":
+        model = LogoEmbedding
+        id_field = LogoEmbedding.logo_id
+    elif table == "image":
+        model = ImageEmbedding
+        id_field = ImageEmbedding.image_id
+    else:
+        raise typer.BadParameter(f"invalid table: {table}")
+
+    updated = 0
+    last_id = 0
+    with db.connection_context():
+        pbar = tqdm.tqdm(desc="embedding")
+        while True:
+            batch = list(
+                model.select()
+                .where(id_field > last_id, model.encoding != encoding.value)
+                .order_by(id_field)
+                .limit(batch_size)
+            )
+            if not batch:
+                break
+
+            with db.atomic():
+                for item in batch:
+                    item.embedding = encode_embedding(item.get_embedding(), encoding)
+                    item.encoding = encoding.value
+                model.bulk_update(batch, fields=["embedding", "encoding"])
+
+            last_id = batch[-1].get_id()
+            updated += len(batch)
+            pbar.update(len(batch))
+        pbar.close()
+
+    logger.info("%d embeddings re-encoded to %s", updated, encoding.value)
+
+
 @app.command()
 def import_logos(
     data_path: Path = typer.Argument(
@@ -1125,6 +1339,7 @@ def pprint_ocr_result(
     from openfoodfacts.ocr import OCRResult
 
     from robotoff.utils import get_logger, http_session
+    from robotoff.utils.ocr import get_ocr_result
 
     logger = get_logger()
 
@@ -1134,7 +1349,7 @@ def pprint_ocr_result(
     logger.info("displaying OCR result %s", uri)
 
     if uri.startswith("http"):
-        ocr_result = OCRResult.from_url(uri, http_session)
+        ocr_result = get_ocr_result(uri, http_session)
     else:
         with open(uri, "rb") as f:
             data = orjson.loads(f.read())
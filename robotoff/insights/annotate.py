@@ -64,6 +64,7 @@ class AnnotationStatus(Enum):
     error_invalid_data = 11
     user_input_updated = 12
     cannot_vote = 13
+    error_failed_annotation = 14
 
 
 SAVED_ANNOTATION_RESULT = AnnotationResult(
@@ -112,6 +113,11 @@ FAILED_UPDATE_RESULT = AnnotationResult(
     status=AnnotationStatus.error_failed_update.name,
     description="Open Food Facts update failed",
 )
+FAILED_ANNOTATION_RESULT = AnnotationResult(
+    status_code=AnnotationStatus.error_failed_annotation.value,
+    status=AnnotationStatus.error_failed_annotation.name,
+    description="an unexpected error occurred while saving the annotation",
+)
 CANNOT_VOTE_RESULT = AnnotationResult(
     status_code=AnnotationStatus.cannot_vote.value,
     status=AnnotationStatus.cannot_vote.name,
@@ -1231,12 +1237,14 @@ def annotate(
     data: JSONType | None = None,
     auth: OFFAuthentication | None = None,
     is_vote: bool = False,
+    refresh: bool = True,
 ) -> AnnotationResult:
     """Annotate an insight: save the annotation in DB and send the update
     to Product Opener if `update=True`.
 
-    We also refresh the insights after the annotation is saved, to ensure
-    that the insights are up to date with the latest changes.
+    We also refresh the insights after the annotation is saved (if
+    `refresh=True`), to ensure that the insights are up to date with the
+    latest changes.
 
     :param insight: the insight to annotate
     :param annotation: the annotation as an integer, either -1, 0, 1 or 2
@@ -1248,6 +1256,10 @@ def annotate(
         `is_vote=True`) or if the insight is applied automatically.
     :param is_vote: True if the annotation was triggered by an anonymous
         vote, defaults to False
+    :param refresh: if True, refresh the insights of the product after the
+        annotation, defaults to True. The caller is responsible for the
+        refresh otherwise, this is used to refresh the insights only once
+        when annotating several insights of the same product.
     :return: the result of the annotation process
     """
     result = ANNOTATOR_MAPPING[insight.type].annotate(
@@ -1259,10 +1271,11 @@ def annotate(
         is_vote=is_vote,
     )
 
-    # We refresh insights after the annotation is saved, to ensure that the
-    # insights are up to date with the latest changes.
-    import_results = refresh_insights(insight.get_product_id())
-    for import_result in import_results:
-        logger.info(import_result)
+    if refresh:
+        # We refresh insights after the annotation is saved, to ensure that the
+        # insights are up to date with the latest changes.
+        import_results = refresh_insights(insight.get_product_id())
+        for import_result in import_results:
+            logger.info(import_result)
 
     return result
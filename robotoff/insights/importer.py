@@ -17,6 +17,7 @@ from playhouse.shortcuts import model_to_dict
 
 from robotoff import settings
 from robotoff.brands import get_brand_blacklist, get_brand_prefix, in_barcode_range
+from robotoff.insights import question_pool
 from robotoff.insights.normalize import normalize_emb_code
 from robotoff.models import ImageModel, ImagePrediction, ProductInsight, batch_insert
 from robotoff.models import Prediction as PredictionModel
@@ -279,6 +280,18 @@ class InsightImporter(metaclass=abc.ABCMeta):
                     ProductInsight.id == reference_insight.id
                 ).execute()
 
+        question_pool.update_question_pool(
+            itertools.chain(to_delete, (ref for _, ref in to_update)), deleted=True
+        )
+        question_pool.update_question_pool(
+            itertools.chain(
+                to_create,
+                ProductInsight.select().where(ProductInsight.id.in_(updated_ids))
+                if updated_ids
+                else [],
+            )
+        )
+
         return ProductInsightImportResult(
             insight_created_ids=created_ids,
             insight_deleted_ids=to_delete_ids,
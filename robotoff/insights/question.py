@@ -1,14 +1,16 @@
 import abc
 import logging
 import pathlib
+from collections.abc import Iterable
 
 from robotoff import settings
 from robotoff.models import ProductInsight
 from robotoff.off import generate_image_path, generate_image_url
-from robotoff.products import get_product
+from robotoff.products import get_product, get_products
 from robotoff.taxonomy import Taxonomy, TaxonomyType, get_taxonomy
 from robotoff.types import InsightType, JSONType, ProductIdentifier
 from robotoff.utils import load_json
+from robotoff.utils.cache import disk_cache
 from robotoff.utils.i18n import TranslationStore
 
 logger = logging.getLogger(__name__)
@@ -67,8 +69,83 @@ def generate_selected_images(
     return selected_images
 
 
+class ProductImageCache:
+    """Images of the products of the questions of a request.
+
+    The `images` field of all products is fetched with a single query (see
+    `prefetch`) instead of one query per question. Images are also cached in
+    the disk cache for `settings.QUESTION_PRODUCT_IMAGES_CACHE_TTL` seconds,
+    to be reused by the next requests, as the same products are often
+    returned by successive requests.
+
+    :param product_ids: identifiers of the products of the request, their
+        images are prefetched the first time the images of a product are
+        requested (so that no query is sent if no formatter needs images)
+    """
+
+    def __init__(self, product_ids: Iterable[ProductIdentifier] = ()) -> None:
+        self._pending_product_ids = set(product_ids)
+        self.images: dict[ProductIdentifier, JSONType] = {}
+        self._selected_images: dict[
+            ProductIdentifier, dict[str, dict[str, dict[str, str]]]
+        ] = {}
+
+    @staticmethod
+    def _get_cache_key(product_id: ProductIdentifier) -> str:
+        return f"product_images:{product_id.server_type.name}:{product_id.barcode}"
+
+    def prefetch(self, product_ids: Iterable[ProductIdentifier]) -> None:
+        """Fetch the images of the products, if they were not fetched yet.
+
+        :param product_ids: identifiers of the products
+        """
+        missing_product_ids = []
+        for product_id in set(product_ids) - self.images.keys():
+            images = disk_cache.get(self._get_cache_key(product_id))
+            if images is None:
+                missing_product_ids.append(product_id)
+            else:
+                self.images[product_id] = images
+
+        if not missing_product_ids:
+            return
+
+        products = get_products(missing_product_ids, ["images"])
+        for product_id in missing_product_ids:
+            # Missing products are cached as products without images
+            images = (products.get(product_id) or {}).get("images") or {}
+            self.images[product_id] = images
+            disk_cache.set(
+                self._get_cache_key(product_id),
+                images,
+                expire=settings.QUESTION_PRODUCT_IMAGES_CACHE_TTL,
+                tag="product_images",
+            )
+
+    def get_images(self, product_id: ProductIdentifier) -> JSONType:
+        """Return the `images` field of the product (empty if the product
+        doesn't exist)."""
+        if product_id not in self.images:
+            self.prefetch(self._pending_product_ids | {product_id})
+            self._pending_product_ids.clear()
+        return self.images[product_id]
+
+    def get_selected_images(
+        self, product_id: ProductIdentifier
+    ) -> dict[str, dict[str, dict[str, str]]]:
+        """Return the `selected_images` of the product, see
+        `generate_selected_images`."""
+        if product_id not in self._selected_images:
+            self._selected_images[product_id] = generate_selected_images(
+                self.get_images(product_id), product_id
+            )
+        return self._selected_images[product_id]
+
+
 def get_source_image_url(
-    product_id: ProductIdentifier, field_types: list[str] | None = None
+    product_id: ProductIdentifier,
+    field_types: list[str] | None = None,
+    product_images: ProductImageCache | None = None,
 ) -> str | None:
     """Generate the URL of a generic image to display for an insight.
 
@@ -79,24 +156,33 @@ def get_source_image_url(
     :param product_id: identifier of the product
     :param field_types: the image field types to check. If not provided,
       we use ["front", "ingredients", "nutrition"]
+    :param product_images: the cache of product images to use, if not
+      provided, the product is fetched from MongoDB
     :return: The image URL or None if no suitable image has been found
     """
     if field_types is None:
         field_types = ["front", "ingredients", "nutrition"]
 
-    product: JSONType | None = get_product(product_id, ["images"])
+    if product_images is not None:
+        images = product_images.get_images(product_id)
+        if not images:
+            return None
+        selected_images = product_images.get_selected_images(product_id)
+    else:
+        product: JSONType | None = get_product(product_id, ["images"])
 
-    if product is None or "images" not in product:
-        return None
+        if product is None or "images" not in product:
+            return None
 
-    selected_images = generate_selected_images(product["images"], product_id)
+        images = product["images"]
+        selected_images = generate_selected_images(images, product_id)
 
     for key in field_types:
         if key in selected_images:
-            images = selected_images[key]
+            type_images = selected_images[key]
 
-            if "display" in images:
-                display_images = list(images["display"].values())
+            if "display" in type_images:
+                display_images = list(type_images["display"].values())
 
                 if display_images:
                     return display_images[0]
@@ -104,7 +190,7 @@ def get_source_image_url(
     # No match image found, fallback to any raw image, starting from the
     # most recent one (highest id)
     for raw_image_id in sorted(
-        (image_key for image_key in product["images"].keys() if image_key.isdigit()),
+        (image_key for image_key in images.keys() if image_key.isdigit()),
         key=int,
         reverse=True,
     ):
@@ -182,8 +268,14 @@ class AddBinaryQuestion(Question):
 
 
 class QuestionFormatter(metaclass=abc.ABCMeta):
-    def __init__(self, translation_store: TranslationStore):
+    def __init__(
+        self,
+        translation_store: TranslationStore,
+        product_images: ProductImageCache | None = None,
+    ):
         self.translation_store: TranslationStore = translation_store
+        # Images of the products, shared between the formatters of a request
+        self.product_images = product_images
 
     @abc.abstractmethod
     def format_question(self, insight: ProductInsight, lang: str) -> Question:
@@ -197,7 +289,9 @@ class CategoryQuestionFormatter(QuestionFormatter):
         taxonomy: Taxonomy = get_taxonomy(TaxonomyType.category.name)
         localized_value: str = taxonomy.get_localized_name(insight.value_tag, lang)
         localized_question = self.translation_store.gettext(lang, self.question)
-        source_image_url = get_source_image_url(insight.get_product_id())
+        source_image_url = get_source_image_url(
+            insight.get_product_id(), product_images=self.product_images
+        )
         return AddBinaryQuestion(
             question=localized_question,
             value=localized_value,
@@ -354,7 +448,9 @@ class BrandQuestionFormatter(QuestionFormatter):
         if insight.predictor in ("curated-list", "taxonomy", "whitelisted-brands"):
             # Use front image as default for flashtext-brand insights
             source_image_url = get_source_image_url(
-                insight.get_product_id(), field_types=["front"]
+                insight.get_product_id(),
+                field_types=["front"],
+                product_images=self.product_images,
             )
 
         if source_image_url is None and insight.source_image:
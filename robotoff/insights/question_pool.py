@@ -0,0 +1,419 @@
+"""Pool of question candidates, used to serve random questions without
+running a costly `ORDER BY random()` query over all insights.
+
+The pool is stored in Redis. Each non-annotated insight that can be served as
+a question (not automatically processable, without reserved barcode) is
+stored in a Redis set per (server type, insight type, country, campaign,
+number of votes). The special `all` country and campaign pools contain all
+insights, whatever their country or campaign.
+
+The pool is updated incrementally when insights are imported or voted on
+(see `update_question_pool`), and fully rebuilt periodically by the scheduler
+(see `rebuild_question_pool`), as insights can also be deleted by other
+jobs. Insights sampled from the pool are checked against the DB before being
+served, so that a stale pool never returns annotated insights.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+
+from more_itertools import chunked
+from redis.exceptions import RedisError
+
+from robotoff.insights import voted_insights
+from robotoff.models import ProductInsight
+from robotoff.redis import redis_conn
+from robotoff.types import ServerType
+
+logger = logging.getLogger(__name__)
+
+QUESTION_POOL_PREFIX = "robotoff:question_pool"
+# Votes are grouped in buckets, insights with more votes than this are all
+# stored in the last bucket, and therefore get the same weight. This never
+# happens in practice: insights are annotated by `save_annotation` once 3 votes
+# agree or 2 annotations get 2 votes each, long before reaching this number of
+# votes.
+MAX_VOTE_BUCKET = 10
+# Pseudo-country/campaign of the pools that contain all insights
+ALL = "all"
+
+
+def _get_ready_key(server_type: ServerType) -> str:
+    return f"{QUESTION_POOL_PREFIX}_ready:{server_type.name}"
+
+
+def get_pool_key(
+    server_type: ServerType,
+    insight_type: str,
+    country: str | None = None,
+    campaign: str | None = None,
+) -> str:
+    """Return the key of a question pool.
+
+    :param server_type: the server type of the insights
+    :param insight_type: the insight type
+    :param country: the country tag (ex: `en:france`), or None to get the pool
+        of all countries
+    :param campaign: the annotation campaign, or None to get the pool of all
+        campaigns
+    """
+    return (
+        f"{QUESTION_POOL_PREFIX}:{server_type.name}:{insight_type}:"
+        f"{country or ALL}:{campaign or ALL}"
+    )
+
+
+def get_bucket_key(pool_key: str, n_votes: int) -> str:
+    """Return the key of the Redis set containing the insights with `n_votes`
+    votes of a pool."""
+    return f"{pool_key}:{min(n_votes, MAX_VOTE_BUCKET)}"
+
+
+def get_bucket_weight(bucket: int) -> int:
+    """Return the sampling weight of the insights of a bucket.
+
+    This is the `n_votes + 1` factor of the `random` order of `get_insights`
+    (`ORDER BY random() * (n_votes + 1) DESC`): insights with more votes are
+    more likely to be returned, so that they get annotated faster.
+    """
+    return bucket + 1
+
+
+def is_question_candidate(insight: ProductInsight) -> bool:
+    """Return True if the insight can be served as a question, and should
+    therefore be in the pool."""
+    return (
+        insight.annotation is None
+        and not insight.automatic_processing
+        and not insight.reserved_barcode
+    )
+
+
+def _get_insight_pool_keys(insight: ProductInsight) -> list[str]:
+    server_type = ServerType[insight.server_type]
+    return [
+        get_pool_key(server_type, insight.type, country, campaign)
+        for country in [None, *(insight.countries or [])]
+        for campaign in [None, *(insight.campaign or [])]
+    ]
+
+
+def update_question_pool(
+    insights: Iterable[ProductInsight], deleted: bool = False
+) -> None:
+    """Update the question pool after the creation, update or deletion of
+    insights.
+
+    Each insight is removed from all vote buckets, and added back to the
+    bucket matching its current number of votes if it's still a question
+    candidate. Redis errors are logged and ignored, the pool is fixed during
+    the next full rebuild.
+
+    :param insights: the created/updated/deleted insights
+    :param deleted: if True, the insights were deleted and are only removed
+        from the pool
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipeline:
+            for insight in insights:
+                insight_id = str(insight.id)
+                add = not deleted and is_question_candidate(insight)
+                for pool_key in _get_insight_pool_keys(insight):
+                    for bucket in range(MAX_VOTE_BUCKET + 1):
+                        pipeline.srem(get_bucket_key(pool_key, bucket), insight_id)
+                    if add:
+                        pipeline.sadd(
+                            get_bucket_key(pool_key, insight.n_votes), insight_id
+                        )
+            pipeline.execute()
+    except RedisError:
+        logger.warning("Error during question pool update", exc_info=True)
+
+
+def discard_from_pools(pool_keys: list[str], insight_ids: Iterable[str]) -> None:
+    """Remove insights from all vote buckets of `pool_keys`.
+
+    This is used to remove stale insights (deleted or annotated) found while
+    sampling.
+    """
+    insight_ids = list(insight_ids)
+    if not insight_ids:
+        return
+    with redis_conn.pipeline(transaction=False) as pipeline:
+        for pool_key in pool_keys:
+            for bucket in range(MAX_VOTE_BUCKET + 1):
+                pipeline.srem(get_bucket_key(pool_key, bucket), *insight_ids)
+        pipeline.execute()
+
+
+def is_pool_ready(server_type: ServerType) -> bool:
+    """Return True if the question pool was built for this server type."""
+    return bool(redis_conn.exists(_get_ready_key(server_type)))
+
+
+def _get_bucket_sizes(pool_keys: list[str]) -> list[tuple[str, int, int]]:
+    """Return a (bucket key, weight, size) tuple for each non-empty vote
+    bucket of `pool_keys`."""
+    buckets = [
+        (get_bucket_key(pool_key, bucket), get_bucket_weight(bucket))
+        for pool_key in pool_keys
+        for bucket in range(MAX_VOTE_BUCKET + 1)
+    ]
+    with redis_conn.pipeline(transaction=False) as pipeline:
+        for bucket_key, _ in buckets:
+            pipeline.scard(bucket_key)
+        sizes = pipeline.execute()
+    return [
+        (bucket_key, weight, size)
+        for (bucket_key, weight), size in zip(buckets, sizes, strict=True)
+        if size
+    ]
+
+
+def iter_scores(
+    sizes: list[int], weights: list[int], rng: random.Random
+) -> Iterator[tuple[float, int]]:
+    """Yield the `random() * weight` scores of all the elements of the
+    buckets in descending order, along with the index of their bucket.
+
+    The scores are not drawn for each element: the maximum of `m` uniform
+    variables is distributed as `random() ** (1 / m)`, and the other `m - 1`
+    variables are uniform below it, so the order statistics of each bucket
+    are generated lazily from the highest one, and the buckets are merged
+    with a heap. Getting the `k` highest scores costs O(k log(len(sizes))),
+    independently of the bucket sizes.
+
+    :param sizes: the number of elements in each bucket
+    :param weights: the weight of the elements of each bucket
+    :param rng: the random number generator
+    """
+    heap = []
+    for index, (size, weight) in enumerate(zip(sizes, weights, strict=True)):
+        if size:
+            value = rng.random() ** (1 / size)
+            heap.append((-value * weight, index, value, size - 1))
+    heapq.heapify(heap)
+    while heap:
+        score, index, value, remaining = heapq.heappop(heap)
+        yield -score, index
+        if remaining:
+            value *= rng.random() ** (1 / remaining)
+            heapq.heappush(heap, (-value * weights[index], index, value, remaining - 1))
+
+
+def sample_question_ids(
+    pool_keys: list[str],
+    limit: int,
+    voted_set_key: str | None = None,
+    rng: random.Random | None = None,
+    exclude: set[str] | None = None,
+) -> list[str]:
+    """Return at most `limit` insight IDs from the question pools
+    `pool_keys`, with the same distribution as the `random` order of
+    `get_insights`: the top `limit` insights by `random() * weight` (see
+    `get_bucket_weight`), in descending order.
+
+    The scores are generated per bucket (see `iter_scores`): the insights of
+    a bucket with the `k` highest scores are a uniformly random subset of
+    size `k` of the bucket, which is drawn with `SRANDMEMBER`. The cost is
+    O(limit), independently of the pool size and of the number of votes of
+    the user.
+
+    :param pool_keys: the pools to sample from, they must not overlap
+    :param limit: the maximum number of IDs to return
+    :param voted_set_key: the key of the loaded set of the insights voted on
+        by the user (see `robotoff.insights.voted_insights`), these insights
+        are not returned
+    :param rng: the random number generator, defaults to the `random` module
+        generator
+    :param exclude: insight IDs that must not be returned, handled like the
+        voted insights
+    :return: the sampled insight IDs
+    """
+    rng = rng or random.Random()
+    buckets = _get_bucket_sizes(pool_keys)
+    scores = iter_scores(
+        [size for _, _, size in buckets], [weight for _, weight, _ in buckets], rng
+    )
+    # IDs drawn from each bucket, including voted IDs
+    drawn_ids: list[set[str]] = [set() for _ in buckets]
+    selected: list[str] = []
+
+    # Voted (and excluded) insights are skipped: the next scores are generated until we get
+    # `limit` insights. They are only a small fraction of the pool in most
+    # cases, the number of drawn insights is doubled after each attempt
+    # otherwise.
+    for attempt in range(3):
+        needed = limit - len(selected)
+        if needed <= 0:
+            break
+        new_scores = list(itertools.islice(scores, needed * (2**attempt)))
+        if not new_scores:
+            break
+        counts = Counter(index for _, index in new_scores)
+        with redis_conn.pipeline(transaction=False) as pipeline:
+            for index, count in counts.items():
+                # Draw a new subset including the already drawn IDs, the new
+                # IDs are uniformly distributed among the remaining ones
+                pipeline.srandmember(buckets[index][0], len(drawn_ids[index]) + count)
+            results = pipeline.execute()
+
+        new_ids = {}
+        for (index, count), members in zip(counts.items(), results, strict=True):
+            bucket_ids = [
+                insight_id
+                for member in members
+                if (insight_id := member.decode()) not in drawn_ids[index]
+            ]
+            rng.shuffle(bucket_ids)
+            drawn_ids[index].update(bucket_ids[:count])
+            new_ids[index] = iter(bucket_ids[:count])
+
+        # The bucket may have shrunk since its size was fetched
+        candidates = [
+            insight_id
+            for _, index in new_scores
+            if (insight_id := next(new_ids[index], None)) is not None
+        ]
+        if voted_set_key is not None:
+            candidates = [
+                insight_id
+                for insight_id, voted in zip(
+                    candidates,
+                    voted_insights.is_voted(voted_set_key, candidates),
+                    strict=True,
+                )
+                if not voted
+            ]
+        if exclude:
+            candidates = [
+                insight_id for insight_id in candidates if insight_id not in exclude
+            ]
+        selected += candidates
+
+    return selected[:limit]
+
+
+def count_questions(
+    pool_keys: list[str],
+    voted_set_key: str | None = None,
+    max_count: int | None = None,
+) -> int:
+    """Return the number of insights in the question pools `pool_keys`.
+
+    :param pool_keys: the pools to count, they must not overlap
+    :param voted_set_key: the key of the loaded set of the insights voted on
+        by the user, these insights are not counted. The intersection of
+        each bucket with this set is counted with `SINTERCARD`.
+    :param max_count: an upper bound on the returned count
+    """
+    buckets = _get_bucket_sizes(pool_keys)
+    count = sum(size for _, _, size in buckets)
+    if voted_set_key is not None and buckets:
+        with redis_conn.pipeline(transaction=False) as pipeline:
+            for bucket_key, _, _ in buckets:
+                # Missing from the types-redis stubs
+                pipeline.sintercard(2, [bucket_key, voted_set_key])  # type: ignore
+            count -= sum(pipeline.execute())
+    return min(count, max_count) if max_count is not None else count
+
+
+def _select_question_candidates(server_type: ServerType):
+    """Return a query selecting the question candidates of a server type, with
+    the fields needed to get their pool keys."""
+    return ProductInsight.select(
+        ProductInsight.id,
+        ProductInsight.type,
+        ProductInsight.server_type,
+        ProductInsight.countries,
+        ProductInsight.campaign,
+        ProductInsight.n_votes,
+    ).where(
+        ProductInsight.server_type == server_type.name,
+        ProductInsight.annotation.is_null(),
+        ProductInsight.automatic_processing == False,  # noqa: E712
+        ProductInsight.reserved_barcode == False,  # noqa: E712
+    )
+
+
+def _get_insight_bucket_keys(insight: ProductInsight) -> list[str]:
+    return [
+        get_bucket_key(pool_key, insight.n_votes)
+        for pool_key in _get_insight_pool_keys(insight)
+    ]
+
+
+def rebuild_question_pool(server_type: ServerType) -> int:
+    """Rebuild the question pool of a server type from the DB.
+
+    Existing pools are updated in place (missing insights are added and stale
+    insights are removed), so that the pool can still be used during the
+    rebuild. Pools are also updated incrementally during the rebuild, so the
+    insights that differ between the pool and the DB snapshot are checked
+    again in the DB before being added or removed: an insight imported or
+    voted on after the snapshot is not removed from its new bucket.
+
+    :param server_type: the server type of the pool to rebuild
+    :return: the number of insights in the pool
+    """
+    logger.info("Rebuilding question pool for %s", server_type.name)
+    bucket_members: dict[str, set[str]] = defaultdict(set)
+    insight_count = 0
+    for insight in _select_question_candidates(server_type).iterator():
+        insight_count += 1
+        for bucket_key in _get_insight_bucket_keys(insight):
+            bucket_members[bucket_key].add(str(insight.id))
+
+    existing_keys = {
+        key.decode()
+        for key in redis_conn.scan_iter(
+            match=f"{QUESTION_POOL_PREFIX}:{server_type.name}:*", count=1000
+        )
+    }
+    added: dict[str, set[str]] = {}
+    removed: dict[str, set[str]] = {}
+    for key in existing_keys | bucket_members.keys():
+        current_members = (
+            {member.decode() for member in redis_conn.smembers(key)}
+            if key in existing_keys
+            else set()
+        )
+        members = bucket_members.get(key, set())
+        added[key] = members - current_members
+        removed[key] = current_members - members
+
+    # Current bucket keys of the insights to add or remove
+    changed_ids = set().union(*added.values(), *removed.values())
+    current_bucket_keys: dict[str, set[str]] = defaultdict(set)
+    for id_batch in chunked(changed_ids, 10_000):
+        for insight in _select_question_candidates(server_type).where(
+            ProductInsight.id.in_(id_batch)
+        ):
+            current_bucket_keys[str(insight.id)].update(
+                _get_insight_bucket_keys(insight)
+            )
+
+    with redis_conn.pipeline(transaction=False) as pipeline:
+        for key in added.keys():
+            to_add = [id_ for id_ in added[key] if key in current_bucket_keys[id_]]
+            to_remove = [
+                id_ for id_ in removed[key] if key not in current_bucket_keys[id_]
+            ]
+            for member_batch in chunked(to_add, 1000):
+                pipeline.sadd(key, *member_batch)
+            for member_batch in chunked(to_remove, 1000):
+                pipeline.srem(key, *member_batch)
+        pipeline.set(_get_ready_key(server_type), 1)
+        pipeline.execute()
+
+    logger.info(
+        "Question pool rebuilt for %s: %d insights, %d buckets",
+        server_type.name,
+        insight_count,
+        len(bucket_members),
+    )
+    return insight_count
@@ -0,0 +1,94 @@
+"""Sets of the insights voted on by each user, used to avoid returning
+questions the user already answered without running a costly
+`NOT IN (SELECT insight_id FROM annotation_vote ...)` anti-join.
+
+The IDs of the insights voted on by a user (identified by device ID or
+username) are stored in a Redis set. A set is loaded lazily from the DB the
+first time it's needed (see `load_voted_set`), and updated each time the user
+votes (see `add_voted_insight`). Sets expire after `settings.VOTED_INSIGHTS_TTL`
+seconds without use.
+
+A vote can be added before the set was loaded from the DB: a special member
+(`LOADED_MARKER`) is therefore added when the set is loaded, so that
+incomplete sets are never used.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+
+from more_itertools import chunked
+from redis.exceptions import RedisError
+
+from robotoff import settings
+from robotoff.redis import redis_conn
+
+logger = logging.getLogger(__name__)
+
+VOTED_INSIGHTS_PREFIX = "robotoff:voted_insights"
+# Member of the set added once the set was loaded from the DB
+LOADED_MARKER = "loaded"
+
+
+def get_voted_set_key(voter_type: str, voter_id: str) -> str:
+    """Return the key of the set of insights voted on by a user.
+
+    :param voter_type: the type of user identifier (`device_id` or
+        `username`)
+    :param voter_id: the user identifier
+    """
+    return f"{VOTED_INSIGHTS_PREFIX}:{voter_type}:{voter_id}"
+
+
+def add_voted_insight(keys: Iterable[str], insight_id: str) -> None:
+    """Add an insight to the voted sets `keys`, after a vote.
+
+    Redis errors are logged and ignored, as the sets expire and are reloaded
+    from the DB.
+    """
+    try:
+        with redis_conn.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.sadd(key, insight_id)
+                pipeline.expire(key, settings.VOTED_INSIGHTS_TTL)
+            pipeline.execute()
+    except RedisError:
+        logger.warning("Error during voted insight set update", exc_info=True)
+
+
+def load_voted_set(key: str, get_voted_ids: Callable[[], Iterable[str]]) -> None:
+    """Load the voted set `key` from the DB, if it's not already loaded.
+
+    The loading cost is proportional to the number of votes of the user, but
+    it's only paid again if the set was not used during the last
+    `settings.VOTED_INSIGHTS_TTL` seconds: its TTL is refreshed each time
+    it's used.
+
+    :param key: the key of the voted set
+    :param get_voted_ids: a function returning the IDs of the insights voted
+        on by the user, from the DB
+    """
+    with redis_conn.pipeline() as pipeline:
+        # The TTL is refreshed in the same transaction as the check, so that
+        # a loaded set can't expire before it's used
+        pipeline.sismember(key, LOADED_MARKER)
+        pipeline.expire(key, settings.VOTED_INSIGHTS_TTL)
+        loaded, _ = pipeline.execute()
+    if loaded:
+        return
+
+    with redis_conn.pipeline(transaction=False) as pipeline:
+        # Votes added concurrently are kept, as we only add members
+        for insight_ids in chunked(get_voted_ids(), 1000):
+            pipeline.sadd(key, *insight_ids)
+        pipeline.sadd(key, LOADED_MARKER)
+        pipeline.expire(key, settings.VOTED_INSIGHTS_TTL)
+        pipeline.execute()
+
+
+def is_voted(key: str, insight_ids: list[str]) -> list[bool]:
+    """Return, for each insight ID, whether it's in the loaded voted set
+    `key`. The cost is O(len(insight_ids)), independently of the number of
+    votes of the user."""
+    if not insight_ids:
+        return []
+    return [bool(flag) for flag in redis_conn.smismember(key, insight_ids)]
@@ -3,14 +3,25 @@ import functools
 import itertools
 import logging
 import operator
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import elasticsearch
 import numpy as np
+import orjson
 from elasticsearch.helpers import bulk as elasticsearch_bulk
 from elasticsearch.helpers import scan as elasticsearch_scan
 from more_itertools import chunked
+from peewee import ValuesList, fn
+from playhouse.postgres_ext import ServerSide
 
 from robotoff import settings
+from robotoff.ann import (
+    build_snapshot,
+    get_added_log_length,
+    get_index_dir,
+    get_local_ann_index,
+)
 from robotoff.elasticsearch import get_es_client
 from robotoff.insights.annotate import UPDATED_ANNOTATION_RESULT, annotate
 from robotoff.insights.importer import import_insights
@@ -24,7 +35,9 @@ from robotoff.models import (
 )
 from robotoff.models import Prediction as PredictionModel
 from robotoff.off import OFFAuthentication
+from robotoff.redis import redis_conn
 from robotoff.types import (
+    ANNBackend,
     ElasticSearchIndex,
     InsightImportResult,
     JSONType,
@@ -117,6 +130,15 @@ def get_logo_confidence_thresholds() -> dict[LogoLabelType, float]:
 
 
 def get_stored_logo_ids(es_client: elasticsearch.Elasticsearch) -> set[int]:
+    """Return the IDs of all logos stored in the ANN index.
+
+    With the `local` ANN backend, `es_client` is not used.
+    """
+    if settings.ANN_BACKEND == ANNBackend.local:
+        return set().union(
+            *(get_local_ann_index(server_type).get_ids() for server_type in ServerType)
+        )
+
     scan_iter = elasticsearch_scan(
         es_client,
         query={"query": {"match_all": {}}},
@@ -131,10 +153,18 @@ def delete_ann_logos(
 ) -> int:
     """Delete logos from the ANN index.
 
-    :param es_client: Elasticsearch client
+    :param es_client: Elasticsearch client, not used with the `local` ANN
+        backend
     :param logo_ids: a list of logo ids to delete
     :return: the number of logos deleted
     """
+    if settings.ANN_BACKEND == ANNBackend.local:
+        # We don't know the server type of the logos, delete them from all
+        # indices
+        for server_type in ServerType:
+            get_local_ann_index(server_type).delete(logo_ids)
+        return len(logo_ids)
+
     actions = (
         {
             "_op_type": "delete",
@@ -152,18 +182,26 @@ def add_logos_to_ann(
     logo_embeddings: list[LogoEmbedding],
     server_type: ServerType,
 ) -> None:
-    """Index logo embeddings in Elasticsearch ANN index.
+    """Index logo embeddings in the ANN index (Elasticsearch or local index,
+    depending on `settings.ANN_BACKEND`).
 
-    :param es_client: Elasticsearch client
+    :param es_client: Elasticsearch client, not used with the `local` ANN
+        backend
     :param logo_embeddings: a list of `LogoEmbedding`s model instances, the
-        fields `logo_id` and `embedding` should be available
+        fields `logo_id`, `embedding` and `encoding` should be available
     :param server_type: the server type (project) associated with the logo
         embeddings
     """
-    embeddings = [
-        np.frombuffer(logo_embedding.embedding, dtype=np.float32)
-        for logo_embedding in logo_embeddings
-    ]
+    embeddings = [logo_embedding.get_embedding() for logo_embedding in logo_embeddings]
+
+    if settings.ANN_BACKEND == ANNBackend.local:
+        if embeddings:
+            get_local_ann_index(server_type).add(
+                [logo_embedding.logo_id for logo_embedding in logo_embeddings],
+                np.stack(embeddings),
+            )
+        return
+
     actions = (
         {
             "_index": ElasticSearchIndex.logo.name,
@@ -176,20 +214,66 @@ def add_logos_to_ann(
     elasticsearch_bulk(es_client, actions)
 
 
+def rebuild_local_ann_index(
+    server_type: ServerType,
+    nlist: int | None = None,
+    min_added_count: int = 0,
+) -> int | None:
+    """Rebuild the snapshot of the local ANN index of `server_type` from the
+    logo embeddings stored in DB.
+
+    A DB connection must be open.
+
+    :param server_type: the server type of the index
+    :param nlist: number of IVF clusters of the index, see
+        `robotoff.ann.build_snapshot`
+    :param min_added_count: the index is only rebuilt if the number of logos
+        added since the last snapshot is at least `min_added_count`
+    :return: the number of logos in the new snapshot, or None if the index
+        was not rebuilt
+    """
+    index_dir = get_index_dir(server_type)
+    if min_added_count and get_added_log_length(index_dir) < min_added_count:
+        return None
+
+    logger.info("Rebuilding local ANN index in %s", index_dir)
+    query = (
+        LogoEmbedding.select(
+            LogoEmbedding.logo_id, LogoEmbedding.embedding, LogoEmbedding.encoding
+        )
+        .join(LogoAnnotation)
+        .where(LogoAnnotation.server_type == server_type.name)
+    )
+    return build_snapshot(
+        index_dir,
+        (
+            (logo_embedding.logo_id, logo_embedding.get_embedding())
+            for logo_embedding in ServerSide(query)
+        ),
+        nlist=nlist,
+    )
+
+
 def save_nearest_neighbors(
     es_client: elasticsearch.Elasticsearch,
     logo_embeddings: list[LogoEmbedding],
     server_type: ServerType,
 ) -> None:
-    """Save nearest neighbors of a batch of logo embedding."""
-    updated = []
-    for logo_embedding in logo_embeddings:
-        results = knn_search(
-            es_client,
-            logo_embedding.embedding,
-            settings.K_NEAREST_NEIGHBORS,
-            server_type,
-        )
+    """Save nearest neighbors of a batch of logo embedding.
+
+    kNN queries are sent in batches (see `knn_search_batch`), and the
+    `nearest_neighbors` field of all logos is updated with a single UPDATE
+    query. The `nearest_neighbors` attribute of the `LogoAnnotation`
+    instances (`logo_embedding.logo`) is also updated.
+    """
+    all_results = knn_search_batch(
+        es_client,
+        [logo_embedding.get_embedding() for logo_embedding in logo_embeddings],
+        settings.K_NEAREST_NEIGHBORS,
+        server_type,
+    )
+    updated = {}
+    for logo_embedding, results in zip(logo_embeddings, all_results, strict=True):
         results = [item for item in results if item[0] != logo_embedding.logo_id][
             : settings.K_NEAREST_NEIGHBORS
         ]
@@ -201,31 +285,138 @@ def save_nearest_neighbors(
                 "logo_ids": logo_ids,
                 "updated_at": datetime.datetime.now(datetime.UTC).isoformat(),
             }
-            updated.append(logo_embedding.logo)
+            updated[logo_embedding.logo_id] = logo_embedding.logo.nearest_neighbors
 
     if updated:
-        LogoAnnotation.bulk_update(updated, fields=["nearest_neighbors"], batch_size=50)
+        bulk_update_nearest_neighbors(updated)
+
+
+def bulk_update_nearest_neighbors(nearest_neighbors: dict[int, JSONType]) -> int:
+    """Update the `nearest_neighbors` field of many logos with a single
+    UPDATE query.
+
+    :param nearest_neighbors: a dict mapping logo ID to the new
+        `nearest_neighbors` value
+    :return: the number of updated rows
+    """
+    values = ValuesList(
+        [
+            (logo_id, orjson.dumps(value).decode("utf-8"))
+            for logo_id, value in nearest_neighbors.items()
+        ],
+        columns=("id", "nearest_neighbors"),
+        alias="nn",
+    )
+    return (
+        LogoAnnotation.update(
+            nearest_neighbors=values.c.nearest_neighbors.cast("jsonb")
+        )
+        .from_(values)
+        .where(LogoAnnotation.id == values.c.id)
+        .execute()
+    )
 
 
 def knn_search(
     client: elasticsearch.Elasticsearch,
-    embedding_bytes: bytes,
+    embedding: np.ndarray,
     k: int = settings.K_NEAREST_NEIGHBORS,
     server_type: ServerType | None = None,
 ) -> list[tuple[int, float]]:
-    """Search for k approximate nearest neighbors of `embedding_bytes` in the
-    Elasticsearch logos index.
+    """Search for k approximate nearest neighbors of `embedding` in the
+    logos ANN index (Elasticsearch or local index, depending on
+    `settings.ANN_BACKEND`).
+
+    :param client: Elasticsearch client, not used with the `local` ANN
+        backend
+    :param embedding: 1d array of the logo embedding, as returned by
+        `LogoEmbedding.get_embedding()`
+    :param k: number of nearest neighbors to return, defaults to
+        `settings.K_NEAREST_NEIGHBORS`
+    :param server_type: the server type (project) associated with the logos
+        to be returned. If not provided, logos from all projects are returned.
+    """
+    if settings.ANN_BACKEND == ANNBackend.local:
+        server_types = list(ServerType) if server_type is None else [server_type]
+        local_results = itertools.chain.from_iterable(
+            get_local_ann_index(st).search(embedding, k + 1) for st in server_types
+        )
+        return sorted(local_results, key=operator.itemgetter(1))[: k + 1]
 
-    :param client: Elasticsearch client
-    :param embedding_bytes: 1d array of the logo embedding serialized using
-        `numpy.tobytes()`
+    results = client.search(
+        index=ElasticSearchIndex.logo,
+        knn=_get_knn_body(embedding, k, server_type),
+        source=False,
+        size=k + 1,
+    )
+    return _parse_knn_hits(results["hits"]["hits"])
+
+
+def knn_search_batch(
+    client: elasticsearch.Elasticsearch,
+    embeddings: list[np.ndarray],
+    k: int = settings.K_NEAREST_NEIGHBORS,
+    server_type: ServerType | None = None,
+    batch_size: int = 50,
+    max_workers: int = 4,
+) -> list[list[tuple[int, float]]]:
+    """Search for k approximate nearest neighbors of each embedding of
+    `embeddings`.
+
+    With the Elasticsearch backend, queries are grouped in `msearch`
+    requests of `batch_size` queries, and at most `max_workers` requests are
+    sent concurrently.
+
+    :param client: Elasticsearch client, not used with the `local` ANN
+        backend
+    :param embeddings: a list of 1d logo embeddings
     :param k: number of nearest neighbors to return, defaults to
         `settings.K_NEAREST_NEIGHBORS`
     :param server_type: the server type (project) associated with the logos
         to be returned. If not provided, logos from all projects are returned.
+    :param batch_size: number of queries per `msearch` request
+    :param max_workers: maximum number of concurrent `msearch` requests
+    :return: a list of kNN results (see `knn_search`), one per embedding, in
+        the same order as `embeddings`
     """
-    embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
-    knn_body = {
+    if settings.ANN_BACKEND == ANNBackend.local:
+        return [
+            knn_search(client, embedding, k, server_type) for embedding in embeddings
+        ]
+
+    def _msearch(batch: list[np.ndarray]) -> list[list[tuple[int, float]]]:
+        searches: list[dict] = []
+        for embedding in batch:
+            searches.append({"index": ElasticSearchIndex.logo.name})
+            searches.append(
+                {
+                    "knn": _get_knn_body(embedding, k, server_type),
+                    "size": k + 1,
+                    "_source": False,
+                }
+            )
+        batch_results: list[list[tuple[int, float]]] = []
+        for response in client.msearch(searches=searches)["responses"]:
+            if "error" in response:
+                logger.warning("Error during ANN query: %s", response["error"])
+                batch_results.append([])
+            else:
+                batch_results.append(_parse_knn_hits(response["hits"]["hits"]))
+        return batch_results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            itertools.chain.from_iterable(
+                executor.map(_msearch, chunked(embeddings, batch_size))
+            )
+        )
+
+
+def _get_knn_body(
+    embedding: np.ndarray, k: int, server_type: ServerType | None
+) -> JSONType:
+    """Return the body of an Elasticsearch kNN query, see `knn_search`."""
+    knn_body: JSONType = {
         "field": "embedding",
         "query_vector": embedding / np.linalg.norm(embedding),
         "k": k + 1,
@@ -235,13 +426,11 @@ def knn_search(
     if server_type is not None:
         knn_body["filter"] = {"term": {"server_type": server_type.name}}
 
-    results = client.search(
-        index=ElasticSearchIndex.logo, knn=knn_body, source=False, size=k + 1
-    )
-    if hits := results["hits"]["hits"]:
-        return [(int(hit["_id"]), 1.0 - hit["_score"]) for hit in hits]
+    return knn_body
+
 
-    return []
+def _parse_knn_hits(hits: list[JSONType]) -> list[tuple[int, float]]:
+    return [(int(hit["_id"]), 1.0 - hit["_score"]) for hit in hits]
 
 
 def get_logo_annotations(logo_ids: list[int]) -> dict[int, LogoLabelType]:
@@ -280,44 +469,80 @@ def get_logo_annotations(logo_ids: list[int]) -> dict[int, LogoLabelType]:
 def predict_proba(
     logo: LogoAnnotation, weights: str = "distance"
 ) -> dict[LogoLabelType, float] | None:
-    if logo.nearest_neighbors is None:
-        return None
-
-    nn_distances = logo.nearest_neighbors["distances"]
-    nn_logo_ids = logo.nearest_neighbors["logo_ids"]
-
-    logo_annotations = get_logo_annotations(nn_logo_ids)
-
-    nn_labels: list[LogoLabelType] = []
-    for nn_logo_id in nn_logo_ids:
-        nn_labels.append(logo_annotations.get(nn_logo_id, UNKNOWN_LABEL))
-
-    return _predict_proba(nn_labels, nn_distances, weights)
-
-
-def _predict_proba(
-    nn_labels: list[LogoLabelType],
-    nn_distances: list[float],
-    weights: str,
-) -> dict[LogoLabelType, float]:
-    weights = get_weights(np.array(nn_distances), weights)
-    labels: list[LogoLabelType] = [UNKNOWN_LABEL] + [
-        x for x in set(nn_labels) if x != UNKNOWN_LABEL
-    ]
-    label_to_id = {label: i for i, label in enumerate(labels)}
-    proba_k = np.zeros(len(labels))
-    pred_labels = np.array([label_to_id[x] for x in nn_labels])
-
-    for i, idx in enumerate(pred_labels.T):
-        proba_k[idx] += weights[i]
-
-    proba_k /= proba_k.sum()
+    """Predict the label probabilities of a logo from its nearest neighbors,
+    see `predict_proba_many`."""
+    return predict_proba_many([logo], weights)[0]
+
+
+def predict_proba_many(
+    logos: list[LogoAnnotation], weights: str = "distance"
+) -> list[dict[LogoLabelType, float] | None]:
+    """Predict the label probabilities of each logo from the annotations of
+    its nearest neighbors.
+
+    Annotations of all neighbors are fetched with a single SQL query, and
+    the weighted votes of all logos are computed at once, using padded
+    (logo, neighbor) matrices.
+
+    :param logos: a list of `LogoAnnotation` model instances
+    :param weights: the neighbor weighting strategy, see `get_weights`
+    :return: a list with, for each logo, a dict mapping each label of its
+        neighbors (and `UNKNOWN_LABEL`) to its probability, or None if the
+        logo has no nearest neighbors
+    """
+    results: list[dict[LogoLabelType, float] | None] = [None] * len(logos)
+    indices = [i for i, logo in enumerate(logos) if logo.nearest_neighbors is not None]
+    if not indices:
+        return results
+
+    nn_logo_ids_list = [logos[i].nearest_neighbors["logo_ids"] for i in indices]
+    nn_distances_list = [logos[i].nearest_neighbors["distances"] for i in indices]
+    logo_annotations = get_logo_annotations(
+        list(set(itertools.chain.from_iterable(nn_logo_ids_list)))
+    )
 
-    prediction: dict[LogoLabelType, float] = {}
-    for i in range(len(proba_k)):
-        prediction[labels[i]] = float(proba_k[i])
+    # Label index 0 is always UNKNOWN_LABEL
+    labels: list[LogoLabelType] = [UNKNOWN_LABEL]
+    label_to_id = {UNKNOWN_LABEL: 0}
+    n_logos = len(indices)
+    max_k = max(len(nn_logo_ids) for nn_logo_ids in nn_logo_ids_list)
+    # Padded values are masked out with `valid`
+    distances = np.ones((n_logos, max_k))
+    label_ids = np.zeros((n_logos, max_k), dtype=np.int64)
+    valid = np.zeros((n_logos, max_k), dtype=bool)
+
+    for row, (nn_logo_ids, nn_distances) in enumerate(
+        zip(nn_logo_ids_list, nn_distances_list, strict=True)
+    ):
+        count = len(nn_logo_ids)
+        distances[row, :count] = nn_distances
+        valid[row, :count] = True
+        for col, nn_logo_id in enumerate(nn_logo_ids):
+            label = logo_annotations.get(nn_logo_id, UNKNOWN_LABEL)
+            if label not in label_to_id:
+                label_to_id[label] = len(labels)
+                labels.append(label)
+            label_ids[row, col] = label_to_id[label]
+
+    nn_weights = np.where(valid, get_weights(distances, weights), 0.0)
+    rows = np.broadcast_to(np.arange(n_logos)[:, None], label_ids.shape)
+    votes = np.zeros((n_logos, len(labels)))
+    np.add.at(votes, (rows, label_ids), nn_weights)
+    present = np.zeros((n_logos, len(labels)), dtype=bool)
+    present[rows[valid], label_ids[valid]] = True
+    present[:, 0] = True
+
+    with np.errstate(invalid="ignore"):
+        # Logos with an empty neighbor list get NaN probabilities
+        proba = votes / votes.sum(axis=1, keepdims=True)
+
+    for row, logo_idx in enumerate(indices):
+        results[logo_idx] = {
+            labels[label_id]: float(proba[row, label_id])
+            for label_id in np.flatnonzero(present[row])
+        }
 
-    return prediction
+    return results
 
 
 def get_weights(dist: np.ndarray, weights: str = "uniform"):
@@ -339,10 +564,12 @@ def get_weights(dist: np.ndarray, weights: str = "uniform"):
         # if user attempts to classify a point that was zero distance from one
         # or more training points, those training points are weighted as 1.0
         # and the other points as 0.0
+        # The weights are computed row-wise for 2D arrays (one row per
+        # logo)
         with np.errstate(divide="ignore"):
             dist = 1.0 / dist
         inf_mask = np.isinf(dist)
-        inf_row = np.any(inf_mask)
+        inf_row = np.any(inf_mask, axis=-1)
         dist[inf_row] = inf_mask[inf_row]
         return dist
     elif callable(weights):
@@ -377,9 +604,7 @@ def import_logo_insights(
     """
     selected_logos = []
     logo_probs = []
-    for logo in logos:
-        probs = predict_proba(logo)
-
+    for logo, probs in zip(logos, predict_proba_many(logos), strict=True):
         if not probs:
             continue
 
@@ -581,31 +806,77 @@ def generate_prediction(
     )
 
 
-def refresh_nearest_neighbors(
-    server_type: ServerType, day_offset: int = 7, batch_size: int = 500
-):
-    """Refresh each logo nearest neighbors if the last refresh is more than
-    `day_offset` days old."""
-    sql_query = """
-        SELECT
-        id
-        FROM
-        logo_annotation
-        WHERE
-        (
-            logo_annotation.completed_at IS NULL
-            AND (
-                logo_annotation.nearest_neighbors IS NULL
-                OR ((logo_annotation.nearest_neighbors ->> 'updated_at') ::timestamp < (now() - '%s days' ::interval))
-            )
-        );"""
-    logo_ids = [item[0] for item in db.execute_sql(sql_query, (day_offset,))]
-    logger.info("%s logos to refresh", len(logo_ids))
-
+def get_logos_to_refresh(
+    changed_logos: dict[int, JSONType],
+    neighbor_logos: dict[int, JSONType | None],
+    k: int,
+) -> set[int]:
+    """Select the logos whose neighborhood is impacted by newly indexed or
+    newly annotated logos.
+
+    The kNN of each changed logo is used as a proxy of the reverse kNN: a
+    logo N in the neighborhood of a changed logo C is impacted if C is
+    already one of its nearest neighbors (its annotation changed), or if C
+    is closer to N than its current k-th nearest neighbor (C enters its
+    neighborhood).
+
+    :param changed_logos: a dict mapping the ID of each changed logo to its
+        `nearest_neighbors` field
+    :param neighbor_logos: a dict mapping the ID of each candidate logo (the
+        uncompleted neighbors of changed logos) to its `nearest_neighbors`
+        field
+    :param k: the number of nearest neighbors stored for each logo
+    :return: the IDs of the logos to refresh
+    """
+    to_refresh = set()
+    for changed_logo_id, nearest_neighbors in changed_logos.items():
+        for logo_id, distance in zip(
+            nearest_neighbors["logo_ids"], nearest_neighbors["distances"], strict=True
+        ):
+            if logo_id not in neighbor_logos or logo_id in to_refresh:
+                continue
+            neighbor_nn = neighbor_logos[logo_id]
+            if (
+                neighbor_nn is None
+                or changed_logo_id in neighbor_nn["logo_ids"]
+                or len(neighbor_nn["logo_ids"]) < k
+                or distance < max(neighbor_nn["distances"])
+            ):
+                to_refresh.add(logo_id)
+    return to_refresh
+
+
+def _get_refresh_state_key(server_type: ServerType) -> str:
+    return f"robotoff:logo_nearest_neighbors_refresh:{server_type.name}"
+
+
+def _get_refresh_state(server_type: ServerType) -> JSONType | None:
+    """Return the state saved by the last refresh of logo nearest neighbors
+    (see `refresh_nearest_neighbors`), or None if no refresh was performed
+    yet."""
+    value = redis_conn.get(_get_refresh_state_key(server_type))
+    return orjson.loads(value) if value is not None else None
+
+
+def _save_refresh_state(server_type: ServerType, state: JSONType) -> None:
+    redis_conn.set(_get_refresh_state_key(server_type), orjson.dumps(state))
+
+
+def _refresh_logos(
+    logo_ids: list[int], server_type: ServerType, batch_size: int
+) -> bool:
+    """Recompute the nearest neighbors of `logo_ids` and regenerate the
+    associated predictions and insights.
+
+    :return: True if all logos were refreshed, False if the ANN query of at
+        least one batch failed
+    """
     es_client = get_es_client()
     thresholds = get_logo_confidence_thresholds()
+    success = True
 
-    for logo_id_batch in chunked(logo_ids, batch_size):
+    for batch_idx, logo_id_batch in enumerate(chunked(logo_ids, batch_size)):
+        start_time = time.monotonic()
         with db.atomic():
             logo_embeddings = list(
                 LogoEmbedding.select(LogoEmbedding, LogoAnnotation)
@@ -619,13 +890,161 @@ def refresh_nearest_neighbors(
                 elasticsearch.ConnectionTimeout,
             ) as e:
                 logger.info("Request error during ANN batch query", exc_info=e)
+                success = False
             else:
                 logos = [embedding.logo for embedding in logo_embeddings]
                 import_logo_insights(
                     logos, thresholds=thresholds, server_type=server_type
                 )
+        elapsed = time.monotonic() - start_time
+        logger.info(
+            "Batch %d: %d logos refreshed in %.1fs (%.1f logos/s)",
+            batch_idx,
+            len(logo_id_batch),
+            elapsed,
+            len(logo_id_batch) / elapsed if elapsed else 0.0,
+        )
+    return success
+
+
+def _get_incremental_logo_ids(
+    server_type: ServerType, max_logo_id: int, last_run: datetime.datetime
+) -> list[int]:
+    """Return the IDs of the uncompleted logos impacted by logos indexed
+    (ID greater than `max_logo_id`) or annotated since `last_run`, and of
+    the uncompleted logos without nearest neighbors."""
+    changed_logos = {
+        logo_id: nearest_neighbors
+        for logo_id, nearest_neighbors in LogoAnnotation.select(
+            LogoAnnotation.id, LogoAnnotation.nearest_neighbors
+        )
+        .where(
+            LogoAnnotation.server_type == server_type.name,
+            LogoAnnotation.nearest_neighbors.is_null(False),
+            (LogoAnnotation.id > max_logo_id)
+            | (LogoAnnotation.completed_at > last_run),
+        )
+        .tuples()
+        .iterator()
+    }
+    logger.info("%d logos indexed or annotated since last run", len(changed_logos))
+    candidate_ids = {
+        logo_id
+        for nearest_neighbors in changed_logos.values()
+        for logo_id in nearest_neighbors["logo_ids"]
+    }
+    neighbor_logos: dict[int, JSONType | None] = {}
+    for candidate_id_batch in chunked(candidate_ids, 10_000):
+        neighbor_logos.update(
+            LogoAnnotation.select(LogoAnnotation.id, LogoAnnotation.nearest_neighbors)
+            .where(
+                LogoAnnotation.id.in_(candidate_id_batch),
+                LogoAnnotation.completed_at.is_null(),
+            )
+            .tuples()
+        )
+    logo_ids = get_logos_to_refresh(
+        changed_logos, neighbor_logos, settings.K_NEAREST_NEIGHBORS
+    )
+    # Logos whose nearest neighbors were never computed (or whose last
+    # refresh failed) are not in the neighborhood of any changed logo
+    logo_ids.update(
+        logo_id
+        for (logo_id,) in LogoAnnotation.select(LogoAnnotation.id)
+        .where(
+            LogoAnnotation.server_type == server_type.name,
+            LogoAnnotation.nearest_neighbors.is_null(),
+            LogoAnnotation.completed_at.is_null(),
+        )
+        .tuples()
+        .iterator()
+    )
+    return sorted(logo_ids)
+
 
-    logger.info("refresh of logo nearest neighbors finished")
+def refresh_nearest_neighbors(
+    server_type: ServerType,
+    day_offset: int = 7,
+    batch_size: int = 500,
+    incremental: bool = False,
+    full_refresh_day_offset: int = 30,
+):
+    """Refresh each logo nearest neighbors if the last refresh is more than
+    `day_offset` days old.
+
+    In incremental mode, only the logos whose neighborhood is impacted by
+    logos indexed or annotated since the last run are refreshed (see
+    `get_logos_to_refresh`). A full refresh is performed instead if no full
+    refresh was performed during the last `full_refresh_day_offset` days.
+
+    :param server_type: the server type of the logos to refresh
+    :param day_offset: minimum age (in days) of nearest neighbors to refresh
+        during a full refresh
+    :param batch_size: number of logos to process at once
+    :param incremental: if True, use the incremental mode
+    :param full_refresh_day_offset: in incremental mode, number of days
+        between two full refreshes
+    """
+    sql_query = """
+        SELECT
+        id
+        FROM
+        logo_annotation
+        WHERE
+        (
+            logo_annotation.completed_at IS NULL
+            AND (
+                logo_annotation.nearest_neighbors IS NULL
+                OR ((logo_annotation.nearest_neighbors ->> 'updated_at') ::timestamp < (now() - '%s days' ::interval))
+            )
+        );"""
+    start = datetime.datetime.now(datetime.UTC)
+    # Logos added after this point are handled during the next run
+    max_logo_id = LogoAnnotation.select(fn.MAX(LogoAnnotation.id)).scalar() or 0
+
+    state = _get_refresh_state(server_type) if incremental else None
+    if state is None or (
+        start - datetime.datetime.fromisoformat(state["last_full_refresh"])
+    ) > datetime.timedelta(days=full_refresh_day_offset):
+        full_refresh = True
+        logo_ids = [item[0] for item in db.execute_sql(sql_query, (day_offset,))]
+        last_full_refresh = start.isoformat()
+    else:
+        full_refresh = False
+        logo_ids = _get_incremental_logo_ids(
+            server_type,
+            state["max_logo_id"],
+            datetime.datetime.fromisoformat(state["last_run"]),
+        )
+        last_full_refresh = state["last_full_refresh"]
+
+    logger.info(
+        "%s refresh: %d logos to refresh",
+        "full" if full_refresh else "incremental",
+        len(logo_ids),
+    )
+    success = _refresh_logos(logo_ids, server_type, batch_size)
+
+    if not success:
+        # Keep the previous state, so that logos impacted by changes since
+        # the last run are refreshed again during the next run
+        logger.warning(
+            "ANN query failed for some logos, refresh state of %s not updated",
+            server_type.name,
+        )
+    elif incremental:
+        _save_refresh_state(
+            server_type,
+            {
+                "last_run": start.isoformat(),
+                "last_full_refresh": last_full_refresh,
+                "max_logo_id": max_logo_id,
+            },
+        )
+    logger.info(
+        "refresh of logo nearest neighbors finished: %d logos refreshed",
+        len(logo_ids),
+    )
 
 
 function_cache_register.register(get_logo_confidence_thresholds)
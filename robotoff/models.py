@@ -5,6 +5,7 @@ import uuid
 from collections.abc import Iterable
 from pathlib import Path
 
+import numpy as np
 import peewee
 from peewee_migrate import Router
 from playhouse.pool import PooledPostgresqlExtDatabase
@@ -13,7 +14,8 @@ from playhouse.shortcuts import model_to_dict
 
 from robotoff import settings
 from robotoff.off import generate_image_url
-from robotoff.types import ProductIdentifier, ServerType
+from robotoff.types import EmbeddingEncoding, ProductIdentifier, ServerType
+from robotoff.utils.embedding import decode_embedding
 
 db = PooledPostgresqlExtDatabase(
     settings.POSTGRES_DB,
@@ -235,6 +237,13 @@ class ProductInsight(BaseModel):
         help_text="Whether we have an image to display to illustrate the insight",
     )
 
+    class Meta:
+        # Used for cursor-based pagination
+        indexes = (
+            (("server_type", "id"), False),
+            (("server_type", "unique_scans_n", "id"), False),
+        )
+
     def get_product_id(self) -> ProductIdentifier:
         return ProductIdentifier(self.barcode, ServerType[self.server_type])
 
@@ -260,6 +269,10 @@ class Prediction(BaseModel):
         default="off",
     )
 
+    class Meta:
+        # Used for cursor-based pagination
+        indexes = ((("server_type", "id"), False),)
+
     def get_product_id(self) -> ProductIdentifier:
         return ProductIdentifier(self.barcode, ServerType[self.server_type])
 
@@ -302,6 +315,8 @@ class ImageModel(BaseModel):
 
     class Meta:
         table_name = "image"
+        # Used for cursor-based pagination
+        indexes = ((("server_type", "id"), False),)
 
     def get_product_id(self) -> ProductIdentifier:
         return ProductIdentifier(self.barcode, ServerType[self.server_type])
@@ -409,10 +424,18 @@ class LogoEmbedding(BaseModel):
         primary_key=True,
     )
     embedding = peewee.BlobField(null=False)
+    # encoding of the `embedding` field, one of `EmbeddingEncoding`
+    encoding = peewee.CharField(
+        null=False, max_length=10, default=EmbeddingEncoding.float32.value
+    )
 
     class Meta:
         schema = "embedding"
 
+    def get_embedding(self) -> np.ndarray:
+        """Return the decoded embedding, as a 1D float32 array."""
+        return decode_embedding(self.embedding, self.encoding)
+
 
 class ImageEmbedding(BaseModel):
     """Table to store image embeddings generated by CLIP model."""
@@ -427,10 +450,18 @@ class ImageEmbedding(BaseModel):
     )
     # embedding numpy array is stored as a binary data
     embedding = peewee.BlobField(null=False)
+    # encoding of the `embedding` field, one of `EmbeddingEncoding`
+    encoding = peewee.CharField(
+        null=False, max_length=10, default=EmbeddingEncoding.float32.value
+    )
 
     class Meta:
         schema = "embedding"
 
+    def get_embedding(self) -> np.ndarray:
+        """Return the decoded embedding, as a 1D float32 array."""
+        return decode_embedding(self.embedding, self.encoding)
+
 
 class LogoConfidenceThreshold(BaseModel):
     type = peewee.CharField(null=True)
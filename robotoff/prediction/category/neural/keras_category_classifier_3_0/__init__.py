@@ -5,10 +5,10 @@ from typing import Literal
 
 import numpy as np
 import peewee
-from openfoodfacts.ocr import OCRResult
 from PIL import Image
 from tritonclient.grpc import service_pb2
 
+from robotoff import settings
 from robotoff.images import refresh_images_in_db
 from robotoff.models import ImageEmbedding, ImageModel, db, with_db
 from robotoff.off import generate_image_url, generate_json_ocr_url
@@ -22,6 +22,8 @@ from robotoff.triton import (
 from robotoff.types import JSONType, NeuralCategoryClassifierModel, ProductIdentifier
 from robotoff.utils import get_image_from_url, http_session
 from robotoff.utils.cache import function_cache_register
+from robotoff.utils.embedding import decode_embedding, encode_embedding
+from robotoff.utils.ocr import get_ocr_result
 
 from .preprocessing import (
     IMAGE_EMBEDDING_DIM,
@@ -55,8 +57,10 @@ def fetch_cached_image_embeddings(
     :return: a dict mapping image IDs to CLIP image embedding
     """
     cached_embeddings = {}
-    for image_id, embedding in (
-        ImageEmbedding.select(ImageModel.image_id, ImageEmbedding.embedding)
+    for image_id, embedding, encoding in (
+        ImageEmbedding.select(
+            ImageModel.image_id, ImageEmbedding.embedding, ImageEmbedding.encoding
+        )
         .join(ImageModel)
         .where(
             ImageModel.barcode == product_id.barcode,
@@ -66,7 +70,7 @@ def fetch_cached_image_embeddings(
         .tuples()
         .iterator()
     ):
-        cached_embeddings[image_id] = np.frombuffer(embedding, dtype=np.float32)
+        cached_embeddings[image_id] = decode_embedding(embedding, encoding)
 
     return cached_embeddings
 
@@ -105,7 +109,10 @@ def save_image_embeddings(
                 with db.atomic():
                     ImageEmbedding.create(
                         image_id=image_id_to_model_id[image_id],
-                        embedding=embedding.tobytes(),
+                        embedding=encode_embedding(
+                            embedding, settings.EMBEDDING_ENCODING
+                        ),
+                        encoding=settings.EMBEDDING_ENCODING.value,
                     )
                 created += 1
             except peewee.IntegrityError:
@@ -245,7 +252,7 @@ def fetch_ocr_texts(product: JSONType, product_id: ProductIdentifier) -> list[st
     image_ids = (id_ for id_ in product.get("images", {}).keys() if id_.isdigit())
     for image_id in image_ids:
         ocr_url = generate_json_ocr_url(product_id, image_id)
-        ocr_result = OCRResult.from_url(
+        ocr_result = get_ocr_result(
             ocr_url, http_session, error_raise=False, warning_missing=False
         )
         if ocr_result:
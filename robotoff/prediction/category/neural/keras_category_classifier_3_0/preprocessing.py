@@ -12,6 +12,8 @@ from robotoff.taxonomy import Taxonomy
 from robotoff.types import JSONType
 from robotoff.utils.cache import function_cache_register
 from robotoff.utils.text import KeywordProcessor
+from robotoff.utils.text.frozen_flashtext import FrozenKeywordProcessor
+from robotoff.utils.text.snapshot import load_keyword_processor
 
 from .text_utils import fold, get_tag
 
@@ -40,10 +42,13 @@ def get_ingredient_taxonomy():
 
 
 @functools.cache
-def get_ingredient_processor():
-    ingredient_taxonomy = get_ingredient_taxonomy()
-    return build_ingredient_processor(
-        ingredient_taxonomy, add_synonym_combinations=True
+def get_ingredient_processor() -> FrozenKeywordProcessor:
+    return load_keyword_processor(
+        "ingredient_v3",
+        [V3_MODEL_DATA_DIR / "ingredients.full.json.gz"],
+        lambda: build_ingredient_processor(
+            get_ingredient_taxonomy(), add_synonym_combinations=True
+        ),
     )
 
 
@@ -195,7 +200,9 @@ MULTIPLE_SPACES_REGEX = re.compile(r" {2,}")
 
 
 def extract_ocr_ingredients(
-    values: list[str], processor: KeywordProcessor, debug: bool = False
+    values: list[str],
+    processor: KeywordProcessor | FrozenKeywordProcessor,
+    debug: bool = False,
 ) -> list[str]:
     """Extract ingredient tags from OCR texts.
 
@@ -339,7 +346,7 @@ FORBIDDEN_CHARS = set(string.ascii_lowercase + string.digits)
 
 
 def extract_ingredient_from_text(
-    processor: KeywordProcessor, text: str
+    processor: KeywordProcessor | FrozenKeywordProcessor, text: str
 ) -> list[tuple[list[tuple[str, str]], int, int]]:
     """Extract taxonomy ingredients from text.
 
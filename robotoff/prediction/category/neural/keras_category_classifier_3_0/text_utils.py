@@ -1,3 +1,4 @@
+import functools
 import re
 from collections import defaultdict
 
@@ -1383,6 +1384,22 @@ codepoint_to_replacement = [
 translate_table = codepoint_to_self + codepoint_to_replacement
 
 
+# Translate tables used by `fold`, by replacement string. Characters missing
+# from `translate_table` are added to a table on first lookup, the tables are
+# replaced by new ones when they get too large
+_translate_tables: dict[str, defaultdict] = {}
+
+
+def _get_translate_table(replacement: str) -> defaultdict:
+    table = _translate_tables.get(replacement)
+    if table is None or len(table) > len(translate_table) + 10_000:
+        if len(_translate_tables) >= 4:
+            _translate_tables.clear()
+        table = defaultdict(lambda: replacement or None, translate_table)
+        _translate_tables[replacement] = table
+    return table
+
+
 def fold(string: str, replacement: str = "") -> str:
     """Fold string to ASCII.
 
@@ -1396,19 +1413,11 @@ def fold(string: str, replacement: str = "") -> str:
     if string is None:
         return ""
 
-    try:
-        # If string contains only ASCII characters, return it.
-        string.encode("ascii")
+    # If string contains only ASCII characters, return it.
+    if string.isascii():
         return string
-    except UnicodeEncodeError:
-        pass
-
-    if replacement:
-        t = defaultdict(lambda: replacement, translate_table)
-    else:
-        t = defaultdict(lambda: None, translate_table)  # type: ignore
 
-    return string.translate(t)
+    return string.translate(_get_translate_table(replacement))
 
 
 CONSECUTIVE_SPACES_REGEX = re.compile(r" {2,}")
@@ -1419,6 +1428,7 @@ def strip_consecutive_spaces(text: str) -> str:
     return CONSECUTIVE_SPACES_REGEX.sub(" ", text)
 
 
+@functools.lru_cache(maxsize=16384)
 def get_tag(text: str) -> str:
     """Return a tag from a text.
 
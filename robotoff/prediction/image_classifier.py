@@ -266,3 +266,16 @@ class ImageClassifier:
             time.monotonic() - start_time,
         )
         return results
+
+
+class ImageClassifierRegistry:
+    """Registry of image classifiers, so that classifiers are created once
+    per process instead of once per prediction."""
+
+    models: dict[ImageClassificationModel, ImageClassifier] = {}
+
+    @classmethod
+    def get(cls, model: ImageClassificationModel) -> ImageClassifier:
+        if model not in cls.models:
+            cls.models[model] = ImageClassifier(MODELS_CONFIG[model])
+        return cls.models[model]
@@ -15,6 +15,7 @@ from robotoff.prediction.langid import LanguagePrediction, predict_lang_batch
 from robotoff.triton import GRPCInferenceServiceStub, get_triton_inference_stub
 from robotoff.utils import http_session
 from robotoff.utils.cache import function_cache_register
+from robotoff.utils.ocr import get_ocr_result
 
 from .transformers_pipeline import AggregationStrategy, TokenClassificationPipeline
 
@@ -102,7 +103,7 @@ def predict_from_ocr(
     ocr_result: OCRResult
     if isinstance(input_ocr, str):
         # `input_ocr` is a URL, fetch OCR JSON and get OCRResult
-        ocr_result = OCRResult.from_url(input_ocr, http_session, error_raise=True)  # type: ignore
+        ocr_result = get_ocr_result(input_ocr, http_session, error_raise=True)  # type: ignore
     else:
         ocr_result = input_ocr
 
@@ -7,17 +7,52 @@ information.
 """
 
 import dataclasses
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+import requests
+from cachetools import LRUCache
+from requests.adapters import HTTPAdapter
 
 from robotoff import settings
-from robotoff.utils import http_session
+from robotoff.utils import USER_AGENT_HEADERS
+
+logger = logging.getLogger(__name__)
+ml_metrics_logger = logging.getLogger("robotoff.ml_metrics")
 
+# Dedicated session with a connection pool, so that concurrent requests to
+# the fasttext server reuse keep-alive connections
+fasttext_session = requests.Session()
+fasttext_session.headers.update(USER_AGENT_HEADERS)
+fasttext_session.mount(
+    settings.FASTTEXT_SERVER_URI,
+    HTTPAdapter(
+        pool_connections=1, pool_maxsize=settings.FASTTEXT_POOL_SIZE, max_retries=1
+    ),
+)
 
-@dataclasses.dataclass
+
+# Frozen, as predictions are shared between the callers through the cache of
+# `LanguagePredictionBatcher`
+@dataclasses.dataclass(frozen=True)
 class LanguagePrediction:
     lang: str
     confidence: float
 
 
+def normalize_text(text: str) -> str:
+    """Normalize a text before sending it to the fasttext server.
+
+    fasttext splits texts on whitespaces, so collapsing whitespaces and
+    newlines into a single space doesn't change the prediction, while
+    increasing the cache hit ratio.
+    """
+    return " ".join(text.split())
+
+
 def predict_lang_batch(
     texts: list[str], k: int = 10, threshold: float = 0.0
 ) -> list[list[LanguagePrediction]]:
@@ -31,7 +66,7 @@ def predict_lang_batch(
         sorted by descending confidence scores
     """
     predictions: list[list[LanguagePrediction]] = []
-    r = http_session.post(
+    r = fasttext_session.post(
         f"{settings.FASTTEXT_SERVER_URI}/predict?k={k}&threshold={threshold}",
         json=texts,
     )
@@ -46,11 +81,147 @@ def predict_lang_batch(
     return predictions
 
 
+class LanguagePredictionBatcher:
+    """Merge concurrent `predict` calls into a single request to the fasttext
+    server.
+
+    The first caller waits for `max_wait` seconds (or until `max_batch_size`
+    texts are pending) for other calls to join, and then sends a single batch
+    request for all pending texts. Predictions are cached in an LRU cache,
+    keyed by (normalized text, k, threshold).
+
+    :param max_wait: maximum time (in seconds) to wait for other calls before
+        sending the batch. If 0, every call sends its own request. Waiting is
+        only useful when `predict` is called from several threads: in a
+        single-threaded process (sync gunicorn worker, rq worker), no other
+        call can join the batch and every call would pay the wait.
+    :param max_batch_size: maximum number of texts sent in a single request
+    :param cache_size: maximum number of predictions kept in the LRU cache
+    """
+
+    def __init__(self, max_wait: float, max_batch_size: int, cache_size: int):
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, int, float, Future]] = []
+        self._batch_full = threading.Event()
+        self._leader_waiting = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batch_count = 0
+        self.batched_text_count = 0
+
+    def predict(
+        self, text: str, k: int = 10, threshold: float = 0.0
+    ) -> list[LanguagePrediction]:
+        """Predict the language of `text`, see `predict_lang` for parameters."""
+        text = normalize_text(text)
+        key = (text, k, threshold)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return list(cached)
+            self.cache_misses += 1
+
+            future: Future = Future()
+            self._pending.append((text, k, threshold, future))
+            is_leader = not self._leader_waiting
+            if is_leader:
+                self._leader_waiting = True
+                self._batch_full.clear()
+            elif len(self._pending) >= self.max_batch_size:
+                self._batch_full.set()
+
+        if is_leader:
+            if self.max_wait > 0:
+                self._batch_full.wait(self.max_wait)
+            with self._lock:
+                pending = self._pending
+                self._pending = []
+                self._leader_waiting = False
+            self._flush(pending)
+
+        return list(future.result())
+
+    def _flush(self, pending: list[tuple[str, int, float, Future]]) -> None:
+        """Send batch requests for all `pending` items and resolve their
+        futures."""
+        groups: dict[tuple[int, float], list[tuple[str, Future]]] = defaultdict(list)
+        for text, k, threshold, future in pending:
+            groups[(k, threshold)].append((text, future))
+
+        for (k, threshold), items in groups.items():
+            # The same text may have been requested by several callers
+            unique_texts = list(dict.fromkeys(text for text, _ in items))
+            results: dict[str, list[LanguagePrediction]] = {}
+            try:
+                for start in range(0, len(unique_texts), self.max_batch_size):
+                    batch = unique_texts[start : start + self.max_batch_size]
+                    start_time = time.monotonic()
+                    batch_predictions = predict_lang_batch(batch, k, threshold)
+                    self._record_batch(len(batch), time.monotonic() - start_time)
+                    results.update(zip(batch, batch_predictions, strict=True))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                for text, predictions in results.items():
+                    self._cache[(text, k, threshold)] = predictions
+            for text, future in items:
+                future.set_result(results[text])
+
+    def _record_batch(self, batch_size: int, duration: float) -> None:
+        with self._lock:
+            self.batch_count += 1
+            self.batched_text_count += batch_size
+        ml_metrics_logger.info(
+            "Fasttext langid batch: %d texts in %ss, cache hit ratio: %.3f",
+            batch_size,
+            duration,
+            self.cache_hit_ratio,
+        )
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+
+    def get_metrics(self) -> dict[str, float]:
+        """Return batching and caching metrics since process start."""
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": self.cache_hit_ratio,
+            "batch_count": self.batch_count,
+            "mean_batch_size": (
+                self.batched_text_count / self.batch_count if self.batch_count else 0.0
+            ),
+        }
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+language_prediction_batcher = LanguagePredictionBatcher(
+    max_wait=settings.FASTTEXT_BATCH_MAX_WAIT,
+    max_batch_size=settings.FASTTEXT_BATCH_MAX_SIZE,
+    cache_size=settings.FASTTEXT_CACHE_SIZE,
+)
+
+
 def predict_lang(
     text: str, k: int = 10, threshold: float = 0.0
 ) -> list[LanguagePrediction]:
     """Predict the language of `text`.
 
+    Concurrent calls are merged into a single request to the fasttext server,
+    and predictions are cached (see `LanguagePredictionBatcher`).
+
     :param text: The text we want to know the language of
     :param k: number of detected language to return, defaults to 10
     :param threshold: minimum confidence threshold of predictions, defaults to
@@ -58,4 +229,4 @@ def predict_lang(
     :return: a list of `LanguagePrediction`, sorted by descending confidence
         scores
     """
-    return predict_lang_batch([text], k, threshold)[0]
+    return language_prediction_batcher.predict(text, k, threshold)
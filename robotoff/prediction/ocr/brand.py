@@ -10,6 +10,8 @@ from robotoff.types import JSONType, Prediction, PredictionType
 from robotoff.utils import text_file_iter
 from robotoff.utils.cache import function_cache_register
 from robotoff.utils.text import KeywordProcessor, get_tag
+from robotoff.utils.text.frozen_flashtext import FrozenKeywordProcessor
+from robotoff.utils.text.snapshot import load_keyword_processor
 
 from .utils import generate_keyword_processor
 
@@ -53,21 +55,32 @@ def get_logo_annotation_brands() -> dict[str, str]:
 
 
 @functools.cache
-def get_taxonomy_brand_processor():
-    return generate_brand_keyword_processor(
-        text_file_iter(settings.OCR_TAXONOMY_BRANDS_PATH)
+def get_taxonomy_brand_processor() -> FrozenKeywordProcessor:
+    return load_keyword_processor(
+        "taxonomy_brand",
+        [
+            settings.OCR_TAXONOMY_BRANDS_PATH,
+            settings.OCR_TAXONOMY_BRANDS_BLACKLIST_PATH,
+        ],
+        lambda: generate_brand_keyword_processor(
+            text_file_iter(settings.OCR_TAXONOMY_BRANDS_PATH)
+        ),
     )
 
 
 @functools.cache
-def get_brand_processor():
-    return generate_brand_keyword_processor(
-        text_file_iter(settings.OCR_BRANDS_PATH),
+def get_brand_processor() -> FrozenKeywordProcessor:
+    return load_keyword_processor(
+        "brand",
+        [settings.OCR_BRANDS_PATH, settings.OCR_TAXONOMY_BRANDS_BLACKLIST_PATH],
+        lambda: generate_brand_keyword_processor(
+            text_file_iter(settings.OCR_BRANDS_PATH),
+        ),
     )
 
 
 def extract_brands(
-    processor: KeywordProcessor,
+    processor: KeywordProcessor | FrozenKeywordProcessor,
     content: OCRResult | str,
     data_source_name: str,
     automatic_processing: bool,
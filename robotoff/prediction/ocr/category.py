@@ -41,12 +41,15 @@ def category_taxonomisation(lang, match) -> str | None:
     return None
 
 
+# The category names are bounded to 100 characters of the same line: with an
+# unbounded `.+` prefix, each start position scans (and backtracks over) the
+# rest of the line, which is quadratic on long lines.
 AOC_REGEX = {
     "fr:": [
         OCRRegex(
             # re.compile(r"(?<=appellation\s).*(?=(\scontr[ôo]l[ée]e)|(\sprot[ée]g[ée]e))"),
             re.compile(
-                r"(appellation)\s*(?P<category>.+)\s*(contr[ôo]l[ée]e|prot[ée]g[ée]e)",
+                r"(appellation)\s*(?P<category>[^\n]{1,100})\s*(contr[ôo]l[ée]e|prot[ée]g[ée]e)",
                 re.I,
             ),
             field=OCRField.full_text_contiguous,
@@ -54,7 +57,7 @@ AOC_REGEX = {
         ),
         OCRRegex(
             re.compile(
-                r"(?P<category>.+)\s*(appellation d'origine contr[ôo]l[ée]e|appellation d'origine prot[ée]g[ée]e)",
+                r"(?P<category>[^\n]{1,100})\s*(appellation d'origine contr[ôo]l[ée]e|appellation d'origine prot[ée]g[ée]e)",
                 re.I,
             ),
             field=OCRField.full_text_contiguous,
@@ -63,7 +66,9 @@ AOC_REGEX = {
     ],
     "es:": [
         OCRRegex(
-            re.compile(r"(?P<category>.+)(\s*denominacion de origen protegida)", re.I),
+            re.compile(
+                r"(?P<category>[^\n]{1,100})(\s*denominacion de origen protegida)", re.I
+            ),
             field=OCRField.full_text_contiguous,
             processing_func=category_taxonomisation,
         ),
@@ -75,7 +80,7 @@ AOC_REGEX = {
     ],
     "en:": [
         OCRRegex(
-            re.compile(r"(?P<category>.+)\s*(aop|dop|pdo)", re.I),
+            re.compile(r"(?P<category>[^\n]{1,100})\s*(aop|dop|pdo)", re.I),
             field=OCRField.full_text_contiguous,
             processing_func=category_taxonomisation,
         ),
@@ -88,12 +93,22 @@ AOC_REGEX = {
 }
 
 
+# All `AOC_REGEX` regexes contain one of these mentions: the extraction is
+# skipped if none of them is found in the text
+AOC_TRIGGER_REGEX = OCRRegex(
+    re.compile(r"appellation|denominacion|aop|dop|pdo", re.I),
+    field=OCRField.full_text_contiguous,
+)
+
+
 def find_category(content: OCRResult | str) -> list[Prediction]:
     """This function returns a prediction of the product category.
     For now we are extracting categories via REGEX
     only thanks to an AOP syntax but we may find in the future
     other ways to get sure prediction of categories.
     """
+    if not AOC_TRIGGER_REGEX.regex.search(get_text(content, AOC_TRIGGER_REGEX)):
+        return []
 
     predictions = []
 
@@ -1,3 +1,4 @@
+import functools
 import logging
 import pathlib
 from collections.abc import Callable, Iterable
@@ -5,28 +6,44 @@ from typing import TextIO
 
 from openfoodfacts.ocr import OCRResult
 
+from robotoff.taxonomy import TaxonomyType, get_taxonomy
 from robotoff.types import JSONType, Prediction, PredictionType, ProductIdentifier
 from robotoff.utils import jsonl_iter, jsonl_iter_fp
 
-from .brand import find_brands
+from .brand import (
+    find_brands,
+    get_brand_processor,
+    get_logo_annotation_brands,
+    get_taxonomy_brand_processor,
+)
 from .category import find_category
 from .expiration_date import find_expiration_date
-from .image_flag import flag_image
+from .image_flag import flag_image, generate_image_flag_keyword_processor
 from .image_lang import get_image_lang
 from .image_orientation import find_image_orientation
-from .label import find_labels
-from .location import find_locations
+from .label import (
+    find_labels,
+    generate_label_keyword_processor,
+    get_logo_annotation_labels,
+)
+from .location import find_locations, get_address_extractor
 from .nutrient import find_nutrient_mentions, find_nutrient_values
-from .packager_code import find_packager_codes
-from .packaging import find_packaging
+from .packager_code import (
+    find_packager_codes,
+    generate_fishing_code_keyword_processor,
+    generate_USDA_code_keyword_processor,
+)
+from .packaging import find_packaging, load_grammar, load_taxonomy_map
 from .product_weight import find_product_weight
-from .store import find_stores
-from .trace import find_traces
+from .store import find_stores, get_store_ocr_regex
+from .trace import find_traces, generate_trace_keyword_processor
 
 logger = logging.getLogger(__name__)
 
 
-PREDICTION_TYPE_TO_FUNC: dict[str, Callable[[OCRResult | str], list[Prediction]]] = {
+PREDICTION_TYPE_TO_FUNC: dict[
+    PredictionType, Callable[[OCRResult | str], list[Prediction]]
+] = {
     PredictionType.category: find_category,
     PredictionType.packager_code: find_packager_codes,
     PredictionType.label: find_labels,
@@ -45,6 +62,38 @@ PREDICTION_TYPE_TO_FUNC: dict[str, Callable[[OCRResult | str], list[Prediction]]
 }
 
 
+# Cached functions loading the resources (keyword processors, taxonomies,
+# grammars,...) used by each extractor, see `preload_extractors`. Calling the
+# extractor on an empty text is not enough: most extractors only load their
+# resources when the text contains a potential match.
+PREDICTION_TYPE_TO_LOADERS: dict[PredictionType, list[Callable[[], object]]] = {
+    PredictionType.category: [
+        functools.partial(get_taxonomy, TaxonomyType.category.name)
+    ],
+    PredictionType.packager_code: [
+        generate_USDA_code_keyword_processor,
+        generate_fishing_code_keyword_processor,
+    ],
+    PredictionType.label: [
+        get_logo_annotation_labels,
+        generate_label_keyword_processor,
+    ],
+    PredictionType.image_flag: [generate_image_flag_keyword_processor],
+    PredictionType.trace: [generate_trace_keyword_processor],
+    PredictionType.brand: [
+        get_logo_annotation_brands,
+        get_brand_processor,
+        get_taxonomy_brand_processor,
+    ],
+    PredictionType.store: [get_store_ocr_regex],
+    PredictionType.packaging: [
+        functools.partial(load_grammar, "fr"),
+        functools.partial(load_taxonomy_map, "fr"),
+    ],
+    PredictionType.location: [get_address_extractor],
+}
+
+
 def extract_predictions(
     content: OCRResult | str,
     prediction_type: PredictionType,
@@ -74,6 +123,17 @@ def extract_predictions(
         raise ValueError(f"unknown prediction type: {prediction_type}")
 
 
+def preload_extractors(prediction_types: Iterable[PredictionType]) -> None:
+    """Load the resources of the extractors of `prediction_types` (see
+    `PREDICTION_TYPE_TO_LOADERS`), which are otherwise loaded on first use.
+
+    This is useful to load them once when a worker process starts.
+    """
+    for prediction_type in prediction_types:
+        for loader in PREDICTION_TYPE_TO_LOADERS.get(prediction_type, []):
+            loader()
+
+
 def ocr_content_iter(items: Iterable[JSONType]) -> Iterable[tuple[str | None, dict]]:
     for item in items:
         if "content" in item:
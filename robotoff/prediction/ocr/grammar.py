@@ -1,12 +1,28 @@
+import importlib
+import io
 import logging
+import os
+import pickle
+import re
+import time
+import types
+from collections.abc import Iterator
 from pathlib import Path
 
+import lark
+from lark import Lark
+
+from robotoff import settings
 from robotoff.taxonomy import Taxonomy, TaxonomyType, get_taxonomy
 from robotoff.utils import dump_json
 from robotoff.utils.text import strip_accents_v2
+from robotoff.utils.text.snapshot import get_source_key
 
 logger = logging.getLogger(__name__)
 
+# Relative imports of other grammar files (`%import .terminal_packaging_shape_fr.X`)
+GRAMMAR_IMPORT_REGEX = re.compile(r"^%import \.(\w+)\.", re.MULTILINE)
+
 
 def normalize_string(text: str, lowercase: bool, strip_accent: bool) -> str:
     """Normalize names/synonyms of taxonomy nodes or input text before
@@ -177,3 +193,102 @@ def generate_terminal_symbols_text(
 
     texts.append("\n")
     return "\n".join(texts), name_to_id_mapping
+
+
+class _ParserPickler(pickle.Pickler):
+    """Pickler of Lark parsers: the parser keeps a reference to the regex
+    module it uses (`re` or `regex`), which is pickled by name."""
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.ModuleType):
+            return importlib.import_module, (obj.__name__,)
+        return NotImplemented
+
+
+def iter_grammar_files(grammar_path: Path) -> Iterator[Path]:
+    """Iterate over a grammar file and the grammar files it imports
+    (recursively).
+
+    Only relative imports are followed: grammars of the Lark standard library
+    (`%import common.WS`) only change with Lark version.
+    """
+    yield grammar_path
+    for name in GRAMMAR_IMPORT_REGEX.findall(grammar_path.read_text()):
+        yield from iter_grammar_files(grammar_path.parent / f"{name}.lark")
+
+
+def load_lark_parser(
+    grammar_path: Path, start: str, snapshot_dir: Path | None = None, **kwargs
+) -> Lark:
+    """Load a Lark parser from its snapshot, or build it from the grammar
+    file (and save the snapshot) if the snapshot doesn't exist or is stale.
+
+    Lark only supports caching LALR parsers (`Lark(cache=...)`), while our
+    grammars need the Earley parser: the whole built parser is pickled
+    instead. The snapshot is keyed by the content of the grammar file and of
+    the grammar files it imports (terminal files generated from the
+    taxonomies), the Lark version and the parser options: the snapshot is
+    rebuilt when the grammar or the taxonomies change.
+
+    Loading a pickle can run arbitrary code, and the source key doesn't
+    authenticate the snapshot: the snapshot directory must only be writable
+    by the application user. Snapshots are written with mode 0644, and
+    snapshots writable by group or others are ignored (and rebuilt).
+
+    :param grammar_path: the path of the grammar file
+    :param start: the start rule of the grammar
+    :param snapshot_dir: the directory of the snapshots, defaults to
+        `settings.GRAMMAR_SNAPSHOT_DIR`
+    :param kwargs: other options of the Lark parser
+    """
+    snapshot_dir = snapshot_dir or settings.GRAMMAR_SNAPSHOT_DIR
+    snapshot_path = snapshot_dir / f"{grammar_path.stem}.{start}.pickle"
+    source_key = get_source_key(
+        grammar_path.stem,
+        f"{lark.__version__}:{start}:{sorted(kwargs.items())}",
+        iter_grammar_files(grammar_path),
+    )
+
+    start_time = time.monotonic()
+    try:
+        with snapshot_path.open("rb") as f:
+            if os.fstat(f.fileno()).st_mode & 0o022:
+                logger.warning(
+                    "Grammar snapshot %s is writable by group or others, ignoring it",
+                    snapshot_path,
+                )
+            elif f.read(len(source_key)) == source_key:
+                parser = pickle.load(f)
+                logger.debug(
+                    "Grammar %s loaded from snapshot in %.3fs",
+                    grammar_path.name,
+                    time.monotonic() - start_time,
+                )
+                return parser
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning(
+            "Error while loading grammar snapshot %s", snapshot_path, exc_info=True
+        )
+
+    parser = Lark.open(str(grammar_path), start=start, **kwargs)
+    logger.info(
+        "Grammar %s built in %.3fs", grammar_path.name, time.monotonic() - start_time
+    )
+    try:
+        buffer = io.BytesIO()
+        buffer.write(source_key)
+        _ParserPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(parser)
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        # Write the snapshot atomically, as several processes may build it
+        # concurrently
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(buffer.getvalue())
+        tmp_path.chmod(0o644)
+        os.replace(tmp_path, snapshot_path)
+    except (OSError, TypeError, pickle.PicklingError):
+        logger.warning(
+            "Error while saving grammar snapshot %s", snapshot_path, exc_info=True
+        )
+    return parser
@@ -1,8 +1,9 @@
+import bisect
 import dataclasses
 import gzip
 import json
 import re
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from functools import cache
 from pathlib import Path
 from typing import BinaryIO
@@ -12,12 +13,18 @@ from openfoodfacts.ocr import OCRResult
 from robotoff import settings
 from robotoff.types import Prediction, PredictionType
 from robotoff.utils import get_logger
+from robotoff.utils.cache import function_cache_register
 from robotoff.utils.text import KeywordProcessor, strip_accents_v1
+from robotoff.utils.text.frozen_flashtext import FrozenKeywordProcessor
 
 # Increase version ID when introducing breaking change: changes for which we
 # want old predictions to be removed in DB and replaced by newer ones
 PREDICTOR_VERSION = "1"
 
+# Candidate French postal codes: 5 digits, allowing non-digits directly next
+# to them
+POSTAL_CODE_REGEX = re.compile(r"(?<![0-9])[0-9]{5}(?![0-9])")
+
 
 @dataclasses.dataclass(frozen=True)
 class City:
@@ -100,10 +107,12 @@ class AddressExtractor:
     * The text is prepared by taking it lower case, removing accents, and
       replacing the characters ' and - with " " (space), as city names must
       follow this format.
-    * City names are searched for in the text.
-    * For each city name found, its corresponding postal code is searched for
-      in the surrounding text, at a maximum distance of
-      `postal_code_search_distance`.
+    * City names and candidate postal codes (5-digit numbers) are searched
+      for in the text.
+    * For each city name found, the candidate postal codes of the
+      surrounding text, at a maximum distance of
+      `postal_code_search_distance`, are looked up in the postal codes of
+      the cities with this name (several cities can have the same name).
     * If the postal code is found, the match is added to the list of returned
       addresses, along with an extract of the text surrounding the address, at
       a maximum distance of `text_extract_distance`.
@@ -128,9 +137,19 @@ class AddressExtractor:
         self.postal_code_search_distance = postal_code_search_distance
         self.text_extract_distance = text_extract_distance
 
-        self.cities_processor = KeywordProcessor()
+        # City name -> postal code -> City
+        self.cities_by_name: dict[str, dict[str, City]] = {}
         for city in self.cities:
-            self.cities_processor.add_keyword(city.name, city)
+            self.cities_by_name.setdefault(city.name, {}).setdefault(
+                city.postal_code, city
+            )
+
+        # The clean name of each keyword is the city name, used as key of
+        # `cities_by_name`
+        processor = KeywordProcessor()
+        for name in self.cities_by_name:
+            processor.add_keyword(name)
+        self.cities_processor = FrozenKeywordProcessor(processor)
 
     def extract_addresses(self, content: str | OCRResult) -> list[Prediction]:
         """Extract addresses from the given OCR result.
@@ -149,15 +168,18 @@ class AddressExtractor:
             text = content
 
         text = self.normalize_text(text)
-        city_matches = self.find_city_names(text)
+        name_matches = self.cities_processor.extract_keywords(text, span_info=True)
+        if not name_matches:
+            return []
+        postal_codes = self.find_postal_codes(text)
 
         locations = []
-        for city, city_start, city_end in city_matches:
-            pc_match = self.find_nearby_postal_code(text, city, city_start, city_end)
-            if pc_match is None:
+        for name, city_start, city_end in name_matches:
+            city_match = self.find_nearby_city(name, postal_codes, city_start, city_end)
+            if city_match is None:
                 continue
 
-            pc, pc_start, pc_end = pc_match
+            city, pc_start, pc_end = city_match
             address_start = min(city_start, pc_start) - self.text_extract_distance
             address_end = max(city_end, pc_end) + self.text_extract_distance
             text_extract = text[max(0, address_start) : min(len(text), address_end)]
@@ -212,10 +234,89 @@ class AddressExtractor:
             in the text, with the start and end indices of their names
             locations in the text. Empty list if none found.
         """
-        return self.cities_processor.extract_keywords(text, span_info=True)
+        return [
+            (city, start, end)
+            for name, start, end in self.cities_processor.extract_keywords(
+                text, span_info=True
+            )
+            for city in self.cities_by_name[name].values()
+        ]
+
+    @staticmethod
+    def find_postal_codes(text: str) -> list[tuple[str, int, int]]:
+        """Find all candidate postal codes in the text.
+
+        Args:
+            text (str): Text to search postal codes in.
+
+        Returns:
+            list of (str, int, int): The candidate postal codes, with their
+            start and end indices in the text, sorted by start index.
+        """
+        return [
+            (match.group(), match.start(), match.end())
+            for match in POSTAL_CODE_REGEX.finditer(text)
+        ]
+
+    def iter_nearby_postal_codes(
+        self, postal_codes: list[tuple[str, int, int]], city_start: int, city_end: int
+    ) -> Iterator[tuple[str, int, int]]:
+        """Iterate over the candidate postal codes at a maximum distance of
+        `postal_code_search_distance` from a city name.
+
+        Args:
+            postal_codes (list of (str, int, int)): The candidate postal codes
+            of the text, see `find_postal_codes`. city_start (int): Start index
+            of the city name match. city_end (int): End index of the city name
+            match.
+        """
+        sub_start = city_start - self.postal_code_search_distance
+        sub_end = city_end + self.postal_code_search_distance
+        index = bisect.bisect_left(postal_codes, sub_start, key=lambda pc: pc[1])
+        for postal_code in postal_codes[index:]:
+            if postal_code[2] > sub_end:
+                break
+            yield postal_code
+
+    def find_nearby_city(
+        self,
+        name: str,
+        postal_codes: list[tuple[str, int, int]],
+        city_start: int,
+        city_end: int,
+    ) -> tuple[City, int, int] | None:
+        """Search for the postal code of a city named `name` close to the city
+        name in the text.
+
+        Each candidate postal code is looked up in the postal codes of the
+        cities with this name, in O(1).
+
+        Args:
+            name (str): The city name found in the text. postal_codes (list of
+            (str, int, int)): The candidate postal codes of the text, see
+            `find_postal_codes`. city_start (int): Start index of the city
+            name match. city_end (int): End index of the city name match.
+
+        Returns:
+            (City, int, int) or None: The first `City` with this name whose
+            postal code was found close to the city name match, along with the
+            start and end indices of the postal code in the text, or None.
+        """
+        cities = self.cities_by_name[name]
+        for postal_code, start, end in self.iter_nearby_postal_codes(
+            postal_codes, city_start, city_end
+        ):
+            if (city := cities.get(postal_code)) is not None:
+                return city, start, end
+        return None
 
     def find_nearby_postal_code(
-        self, text: str, city: City, city_start: int, city_end: int
+        self,
+        text: str,
+        city: City,
+        city_start: int,
+        city_end: int,
+        postal_codes: list[tuple[str, int, int]] | None = None,
     ) -> tuple[str, int, int] | None:
         """Search for a city's postal code close to its name in the text.
 
@@ -230,7 +331,9 @@ class AddressExtractor:
             text (str): The OCR result text. city (City): The `City` for which
             to search the postal code. city_start (int): Start index of the
             city name match in `text`. city_end (int): End index of the city
-            name match in `text`.
+            name match in `text`. postal_codes (list of (str, int, int),
+            optional): The candidate postal codes of `text`, see
+            `find_postal_codes`, to avoid searching them again for each city.
 
         Returns:
             (str, int, int) or None: If the `City`'s postal code was found
@@ -241,17 +344,22 @@ class AddressExtractor:
             logger = get_logger(f"{self.__module__}.{self.__class__.__name__}")
             logger.error("postal code contains non-digit characters: %s", city)
             return None
-        pattern = rf"(?:[^0-9]|^)({city.postal_code})(?:[^0-9]|$)"
 
-        sub_start = max(0, city_start - self.postal_code_search_distance)
-        sub_end = min(len(text), city_end + self.postal_code_search_distance)
-        sub_text = text[sub_start:sub_end]
+        if postal_codes is None:
+            postal_codes = self.find_postal_codes(text)
+        for postal_code in self.iter_nearby_postal_codes(
+            postal_codes, city_start, city_end
+        ):
+            if postal_code[0] == city.postal_code:
+                return postal_code
+        return None
 
-        match = re.search(pattern, sub_text)
-        if match is None:
-            return None
-        else:
-            return match.group(1), sub_start + match.start(1), sub_start + match.end(1)
+
+@cache
+def get_address_extractor() -> AddressExtractor:
+    """Return the address extractor of French cities, built once per
+    process."""
+    return AddressExtractor(load_cities_fr())
 
 
 def find_locations(content: OCRResult | str) -> list[Prediction]:
@@ -265,5 +373,25 @@ def find_locations(content: OCRResult | str) -> list[Prediction]:
     Returns:
         list of Prediction: See :meth:`.AddressExtractor.extract_addresses`.
     """
-    location_extractor = AddressExtractor(load_cities_fr())
-    return location_extractor.extract_addresses(content)
+    return get_address_extractor().extract_addresses(content)
+
+
+def find_locations_batch(
+    contents: Iterable[OCRResult | str],
+) -> Iterator[list[Prediction]]:
+    """Find location predictions in many text contents, lazily.
+
+    Args:
+        contents (iterable of OCRResult or str): The contents to be searched
+        for locations.
+
+    Returns:
+        iterator of list of Prediction: The location predictions of each
+        content, in order, see :func:`find_locations`.
+    """
+    location_extractor = get_address_extractor()
+    for content in contents:
+        yield location_extractor.extract_addresses(content)
+
+
+function_cache_register.register(get_address_extractor)
@@ -13,6 +13,8 @@ from robotoff import settings
 from robotoff.types import JSONType, Prediction, PredictionType
 from robotoff.utils import text_file_iter
 from robotoff.utils.text import KeywordProcessor
+from robotoff.utils.text.frozen_flashtext import FrozenKeywordProcessor
+from robotoff.utils.text.snapshot import load_keyword_processor
 
 from .utils import generate_keyword_processor
 
@@ -57,14 +59,23 @@ def process_USDA_match_to_flashtext(match) -> str | None:
 
 
 @cache
-def generate_USDA_code_keyword_processor() -> KeywordProcessor:
-    """Builds the KeyWordProcessor for USDA codes."""
-
-    codes = text_file_iter(settings.OCR_USDA_CODE_FLASHTEXT_DATA_PATH)
-    return generate_keyword_processor(codes)
+def generate_USDA_code_keyword_processor() -> FrozenKeywordProcessor:
+    """Builds the KeyWordProcessor for USDA codes.
+
+    The processor is frozen, as it's kept in memory during the whole life of
+    the process."""
+    return load_keyword_processor(
+        "USDA_code",
+        [settings.OCR_USDA_CODE_FLASHTEXT_DATA_PATH],
+        lambda: generate_keyword_processor(
+            text_file_iter(settings.OCR_USDA_CODE_FLASHTEXT_DATA_PATH)
+        ),
+    )
 
 
-def extract_USDA_code(processor: KeywordProcessor, text: str) -> str | None:
+def extract_USDA_code(
+    processor: KeywordProcessor | FrozenKeywordProcessor, text: str
+) -> str | None:
     """Given a string, returns the USDA code it contains or None"""
     USDA_code = None
     matches: list[tuple[str, str]] = processor.extract_keywords(text)  # type: ignore
@@ -183,13 +194,19 @@ def find_packager_codes_regex(content: OCRResult | str) -> list[Prediction]:
 
 
 @cache
-def generate_fishing_code_keyword_processor() -> KeywordProcessor:
-    codes = text_file_iter(settings.OCR_FISHING_FLASHTEXT_DATA_PATH)
-    return generate_keyword_processor(f"{c.upper()}||{c}" for c in codes)
+def generate_fishing_code_keyword_processor() -> FrozenKeywordProcessor:
+    return load_keyword_processor(
+        "fishing_code",
+        [settings.OCR_FISHING_FLASHTEXT_DATA_PATH],
+        lambda: generate_keyword_processor(
+            f"{c.upper()}||{c}"
+            for c in text_file_iter(settings.OCR_FISHING_FLASHTEXT_DATA_PATH)
+        ),
+    )
 
 
 def extract_fishing_code(
-    processor: KeywordProcessor, content: OCRResult | str
+    processor: KeywordProcessor | FrozenKeywordProcessor, content: OCRResult | str
 ) -> list[Prediction]:
     predictions = []
     text = get_text(content)
@@ -7,6 +7,7 @@ from openfoodfacts.ocr import OCRResult, get_text
 from robotoff import settings
 from robotoff.prediction.ocr.grammar import (
     generate_terminal_symbols_file,
+    load_lark_parser,
     normalize_string,
 )
 from robotoff.taxonomy import TaxonomyType
@@ -51,6 +52,9 @@ def generate_packaging_lark_file(lang: str):
 
     File for recycling instruction terminal symbol was generated
     semi-automatically, as some fixes were required.
+
+    The snapshot of the packaging parser is then rebuilt from the new
+    terminal files.
     """
     generate_terminal_symbols_file(
         output_path=settings.GRAMMARS_DIR / f"terminal_packaging_shape_{lang}.lark",
@@ -68,14 +72,16 @@ def generate_packaging_lark_file(lang: str):
         terminal_priority=1,
         ignore_ids={"en:unknown"},
     )
+    load_grammar.cache_clear()
+    load_grammar(lang)
 
 
 @functools.cache
 def load_grammar(lang: str, start: str = "value", **kwargs) -> Lark:
-    return Lark.open(
-        str(settings.GRAMMARS_DIR / f"packaging_{lang}.lark"),
-        start=start,
-        **kwargs,
+    """Load the packaging parser of a language, from its snapshot if it's up
+    to date (see `load_lark_parser`)."""
+    return load_lark_parser(
+        settings.GRAMMARS_DIR / f"packaging_{lang}.lark", start=start, **kwargs
     )
 
 
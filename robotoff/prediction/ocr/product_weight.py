@@ -1,6 +1,5 @@
 import functools
 import logging
-import math
 import re
 
 from openfoodfacts.ocr import (
@@ -12,7 +11,7 @@ from openfoodfacts.ocr import (
 )
 
 from robotoff.types import Prediction, PredictionType
-from robotoff.utils.weight_unit import get_unit_registry
+from robotoff.utils.weight_unit import normalize_weight
 
 logger = logging.getLogger(__name__)
 
@@ -21,40 +20,6 @@ logger = logging.getLogger(__name__)
 PREDICTOR_VERSION = "1"
 
 
-def normalize_weight(value: str, unit: str) -> tuple[float, str]:
-    """Normalize the product weight unit to g for mass and mL for volumes.
-    Return a (value, unit) tuple, where value is the normalized value as a
-    float and unit either 'g' or 'ml'."""
-    if "," in value:
-        # pint does not recognize ',' separator
-        value = value.replace(",", ".")
-
-    if unit == "fl oz":
-        # For nutrition labeling, a fluid ounce is equal to 30 ml
-        value = str(float(value) * 30)
-        unit = "ml"
-
-    ureg = get_unit_registry()
-    quantity = ureg.parse_expression(f"{value} {unit}")
-
-    if ureg.gram in quantity.compatible_units():
-        normalized_quantity = quantity.to(ureg.gram)
-        normalized_unit = "g"
-    elif ureg.liter in quantity.compatible_units():
-        normalized_quantity = quantity.to(ureg.milliliter)
-        normalized_unit = "ml"
-    else:
-        raise ValueError(f"unknown unit: {quantity.u}")
-
-    # Rounding errors due to float may occur with Pint,
-    # round normalized value to floor if there is no significant difference
-    normalized_value = normalized_quantity.magnitude
-    if math.isclose(math.floor(normalized_value), normalized_value):
-        normalized_value = math.floor(normalized_value)
-
-    return normalized_value, normalized_unit
-
-
 def is_valid_weight(weight_value: str) -> bool:
     """Weight values are considered invalid if one of the following rules
     is met:
@@ -52,8 +52,10 @@ def get_sorted_stores() -> list[tuple[str, str]]:
 @functools.cache
 def get_store_ocr_regex() -> OCRRegex:
     sorted_stores = get_sorted_stores()
-    store_regex_str = "|".join(
-        rf"((?<!\w){pattern}(?!\w))" for _, pattern in sorted_stores
+    # The word boundary check is shared by all stores, so that it's performed
+    # once per position instead of once per store
+    store_regex_str = r"(?<!\w)(?:{})".format(
+        "|".join(rf"({pattern})(?!\w)" for _, pattern in sorted_stores)
     )
     return OCRRegex(
         re.compile(store_regex_str, re.I), field=OCRField.full_text_contiguous
@@ -595,6 +595,24 @@ class DBProductStore(ProductStore):
         # schema.
         return self._convert_schema(product)
 
+    def get_products(
+        self, barcodes: list[str], projection: list[str] | None = None
+    ) -> dict[str, JSONType]:
+        """Fetch several products from the MongoDB, with a single query.
+
+        :param barcodes: the barcodes of the products to fetch
+        :param projection: list of fields to retrieve, if not provided all fields
+            are queried
+        :return: a dict mapping the barcode to the product, products that were
+            not found are missing
+        """
+        if not settings.ENABLE_MONGODB_ACCESS or not barcodes:
+            return {}
+        return {
+            product["_id"]: typing.cast(JSONType, self._convert_schema(product))
+            for product in self.collection.find({"_id": {"$in": barcodes}}, projection)
+        }
+
     @staticmethod
     def _convert_schema(product: JSONType | None) -> JSONType | None:
         """Convert the product to the legacy `images` schema if the product
@@ -642,3 +660,28 @@ def get_product(
     :return: the product as a dict or None if it was not found
     """
     return get_product_store(product_id.server_type).get_product(product_id, projection)
+
+
+def get_products(
+    product_ids: Iterable[ProductIdentifier], projection: list[str] | None = None
+) -> dict[ProductIdentifier, JSONType]:
+    """Get several products from MongoDB, with a single query per server type.
+
+    :param product_ids: identifiers of the products to fetch
+    :param projection: list of fields to retrieve, if not provided all fields
+    are queried
+    :return: a dict mapping the product identifier to the product, products
+        that were not found are missing
+    """
+    barcodes_by_server_type: dict[ServerType, list[str]] = {}
+    for product_id in product_ids:
+        barcodes_by_server_type.setdefault(product_id.server_type, []).append(
+            product_id.barcode
+        )
+    return {
+        ProductIdentifier(barcode, server_type): product
+        for server_type, barcodes in barcodes_by_server_type.items()
+        for barcode, product in get_product_store(server_type)
+        .get_products(barcodes, projection)
+        .items()
+    }
@@ -18,6 +18,8 @@ from sentry_sdk import capture_exception
 from robotoff import settings
 from robotoff.insights.annotate import annotate
 from robotoff.insights.importer import BrandInsightImporter, is_valid_insight_image
+from robotoff.insights.question_pool import rebuild_question_pool
+from robotoff.logos import rebuild_local_ann_index
 from robotoff.metrics import (
     ensure_influx_database,
     save_facet_metrics,
@@ -32,7 +34,7 @@ from robotoff.products import (
     has_jsonl_dataset_changed,
 )
 from robotoff.taxonomy import download_taxonomies
-from robotoff.types import InsightType, ServerType
+from robotoff.types import ANNBackend, InsightType, ServerType
 
 settings.init_sentry()
 
@@ -301,6 +303,31 @@ def _update_data() -> None:
         return
 
 
+def rebuild_question_pools() -> None:
+    """Rebuild the question pool of all server types (see
+    `robotoff.insights.question_pool`)."""
+    with db.connection_context():
+        for server_type in ServerType:
+            rebuild_question_pool(server_type)
+
+
+def rebuild_logo_ann_indices() -> None:
+    """Rebuild the snapshot of the local logo ANN indices (see `robotoff.ann`)
+    that have more than `settings.ANN_REBUILD_THRESHOLD` logos added since
+    their last snapshot."""
+    with db.connection_context():
+        for server_type in ServerType:
+            count = rebuild_local_ann_index(
+                server_type, min_added_count=settings.ANN_REBUILD_THRESHOLD
+            )
+            if count is not None:
+                logger.info(
+                    "Local ANN index of %s rebuilt with %d logos",
+                    server_type.name,
+                    count,
+                )
+
+
 def clean_tmp_files() -> None:
     """Remove temporary files that are no longer needed."""
     logger.info("Cleaning temporary files in /tmp older than 2 days")
@@ -385,5 +412,24 @@ def run():
         max_instances=1,
     )
 
+    # The question pool is updated incrementally when insights are imported or
+    # voted on, but insights can also be deleted by other jobs: we rebuild
+    # the pool periodically (and at startup) to remove stale insights.
+    scheduler.add_job(
+        rebuild_question_pools,
+        "interval",
+        hours=6,
+        max_instances=1,
+        next_run_time=datetime.datetime.now(datetime.UTC),
+    )
+
+    if settings.ANN_BACKEND == ANNBackend.local:
+        # Logos added to the local ANN index since the last snapshot are
+        # scanned exhaustively: rebuild the snapshot when there are too many
+        # of them
+        scheduler.add_job(
+            rebuild_logo_ann_indices, "interval", hours=1, max_instances=1
+        )
+
     scheduler.add_listener(exception_listener, EVENT_JOB_ERROR)
     scheduler.start()
@@ -8,7 +8,7 @@ from openfoodfacts import Environment
 from sentry_sdk.integrations import Integration
 from sentry_sdk.integrations.logging import LoggingIntegration
 
-from robotoff.types import ServerType
+from robotoff.types import ANNBackend, EmbeddingEncoding, ServerType
 
 
 # Robotoff instance gives the environment, either `prod` or `dev`
@@ -229,6 +229,25 @@ ELASTICSEARCH_TYPE = "document"
 # when predicting the value of a logo
 K_NEAREST_NEIGHBORS = 10
 
+# Backend used for logo nearest neighbor search, either `elasticsearch` or
+# `local` (embedded index stored in ANN_INDEX_DIR, see robotoff.ann)
+ANN_BACKEND = ANNBackend(os.environ.get("ANN_BACKEND", ANNBackend.elasticsearch))
+ANN_INDEX_DIR = Path(os.environ.get("ANN_INDEX_DIR", CACHE_DIR / "ann"))
+# Number of clusters scanned during a local ANN index search: higher values
+# improve recall at the expense of latency
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", 16))
+# Number of logos added to a local ANN index since its last snapshot above
+# which the scheduler rebuilds the snapshot: these logos are scanned
+# exhaustively at search time
+ANN_REBUILD_THRESHOLD = int(os.environ.get("ANN_REBUILD_THRESHOLD", 50_000))
+
+# Encoding used to store new logo and image embeddings in DB. Embeddings
+# stored with another encoding are still decoded transparently, see
+# robotoff.utils.embedding
+EMBEDDING_ENCODING = EmbeddingEncoding(
+    os.environ.get("EMBEDDING_ENCODING", EmbeddingEncoding.float16)
+)
+
 # image moderation service
 IMAGE_MODERATION_SERVICE_URL: str | None = os.environ.get(
     "IMAGE_MODERATION_SERVICE_URL", None
@@ -287,6 +306,18 @@ OCR_PACKAGING_DATA_PATH = OCR_DATA_DIR / "packaging.txt"
 OCR_TRACE_ALLERGEN_DATA_PATH = OCR_DATA_DIR / "trace_allergen.txt"
 # Try to detect postal codes in France
 OCR_CITIES_FR_PATH = OCR_DATA_DIR / "cities_laposte_hexasmal.json.gz"
+# Directory where snapshots of the keyword processors built from the files
+# above are stored, see robotoff.utils.text.snapshot. Snapshots contain pickled
+# data: this directory must only be writable by the application user
+KEYWORD_PROCESSOR_SNAPSHOT_DIR = Path(
+    os.environ.get("KEYWORD_PROCESSOR_SNAPSHOT_DIR", CACHE_DIR / "keyword_processors")
+)
+# Directory where snapshots of the Lark parsers built from the grammars of
+# GRAMMARS_DIR are stored, see robotoff.prediction.ocr.grammar. Snapshots are
+# pickles: this directory must only be writable by the application user
+GRAMMAR_SNAPSHOT_DIR = Path(
+    os.environ.get("GRAMMAR_SNAPSHOT_DIR", CACHE_DIR / "grammars")
+)
 
 BRAND_PREFIX_PATH = DATA_DIR / "brand_prefix.json.gz"
 
@@ -315,10 +346,24 @@ TRITON_URI_NUTRITION_EXTRACTOR = os.environ.get(
     "TRITON_URI_NUTRITION_EXTRACTOR", DEFAULT_TRITON_URI
 )
 TRITON_MODELS_DIR = PROJECT_DIR / "models/triton"
+# Maximum number of models run concurrently (per API worker) by the
+# /images/predict endpoint
+IMAGE_PREDICTOR_MAX_WORKERS = int(os.environ.get("IMAGE_PREDICTOR_MAX_WORKERS", 4))
 
 _fasttext_host = os.environ.get("FASTTEXT_HOST", "fasttext")
 _fasttext_port = os.environ.get("FASTTEXT_PORT", "8000")
 FASTTEXT_SERVER_URI = f"http://{_fasttext_host}:{_fasttext_port}"
+# Concurrent language predictions are merged into a single request to the
+# fasttext server, see robotoff.prediction.langid.LanguagePredictionBatcher.
+# Maximum time (in seconds) to wait for other predictions before sending
+# the batch (0 disables batching). Only enable it for multi-threaded processes:
+# API and rq workers are single-threaded, so no call can join the batch.
+FASTTEXT_BATCH_MAX_WAIT = float(os.environ.get("FASTTEXT_BATCH_MAX_WAIT", 0))
+FASTTEXT_BATCH_MAX_SIZE = int(os.environ.get("FASTTEXT_BATCH_MAX_SIZE", 64))
+# Number of language predictions to keep in the in-memory LRU cache
+FASTTEXT_CACHE_SIZE = int(os.environ.get("FASTTEXT_CACHE_SIZE", 10_000))
+# Maximum number of keep-alive connections to the fasttext server
+FASTTEXT_POOL_SIZE = int(os.environ.get("FASTTEXT_POOL_SIZE", 10))
 
 # We require a minimum of 15 occurences of the brands already on OFF to perform
 # the extraction. This reduces false positive. We require a minimum of 4
@@ -369,8 +414,40 @@ DISKCACHE_DIR = CACHE_DIR / "diskcache"
 TESTS_DISKCACHE_DIR = CACHE_DIR / "diskcache_tests_assets"
 
 
+# Time (in seconds) during which the number of results of paginated API
+# endpoints is cached, see robotoff.app.count
+COUNT_CACHE_TTL = int(os.environ.get("COUNT_CACHE_TTL", 60))
+
+# Time (in seconds) during which the images of the products are cached when
+# formatting questions, see robotoff.insights.question.ProductImageCache
+QUESTION_PRODUCT_IMAGES_CACHE_TTL = int(
+    os.environ.get("QUESTION_PRODUCT_IMAGES_CACHE_TTL", 300)
+)
+
+# Time (in seconds) after which the Redis set of the insights voted on by a
+# user expires if the user doesn't vote, see robotoff.insights.voted_insights
+VOTED_INSIGHTS_TTL = int(os.environ.get("VOTED_INSIGHTS_TTL", 7 * 86400))
+
+# Path of the disk cache of raw OCR JSONs, see robotoff.utils.ocr. OCR JSONs
+# are large, they have their own cache so that they don't evict the entries
+# of the main disk cache
+OCR_DISKCACHE_DIR = CACHE_DIR / "ocr_diskcache"
+# Maximum size (in bytes) of the OCR disk cache
+OCR_CACHE_SIZE_LIMIT = int(os.environ.get("OCR_CACHE_SIZE_LIMIT", 2**31))
+# Time (in seconds) during which raw OCR JSONs are kept in the disk cache,
+# see robotoff.utils.ocr. Cached JSONs are revalidated on each use.
+OCR_CACHE_EXPIRE = int(os.environ.get("OCR_CACHE_EXPIRE", 86400))
+# Number of parsed OCR results kept in the in-process LRU cache, and time
+# (in seconds) during which they are used without revalidation
+OCR_RESULT_CACHE_SIZE = int(os.environ.get("OCR_RESULT_CACHE_SIZE", 8))
+OCR_RESULT_CACHE_TTL = int(os.environ.get("OCR_RESULT_CACHE_TTL", 300))
+
 # Domains allowed to be used as image sources while cropping
 CROP_ALLOWED_DOMAINS = os.environ.get("CROP_ALLOWED_DOMAINS", "").split(",")
 
+# Time (in seconds) during which cropped images are cached, both in the disk
+# cache and by HTTP clients (Cache-Control header)
+CROP_CACHE_EXPIRE = int(os.environ.get("CROP_CACHE_EXPIRE", 86400))
+
 # Batch jobs
 GOOGLE_PROJECT_NAME = "robotoff"
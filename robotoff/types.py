@@ -299,6 +299,28 @@ class ElasticSearchIndex(enum.StrEnum):
     logo = "logo"
 
 
+@enum.unique
+class ANNBackend(enum.StrEnum):
+    """Backend used for logo approximate nearest neighbor (ANN) search."""
+
+    elasticsearch = "elasticsearch"
+    #: embedded index, see robotoff.ann
+    local = "local"
+
+
+@enum.unique
+class EmbeddingEncoding(enum.StrEnum):
+    """Binary encoding used to store an embedding vector in DB
+    (`LogoEmbedding` and `ImageEmbedding` tables)."""
+
+    #: raw float32 array (legacy encoding, 4 bytes per dimension)
+    float32 = "float32"
+    #: raw float16 array (2 bytes per dimension)
+    float16 = "float16"
+    #: float32 scale followed by an int8 array (1 byte per dimension)
+    int8 = "int8"
+
+
 @dataclasses.dataclass
 class ProductInsightImportResult:
     insight_created_ids: list[uuid.UUID]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from robotoff.types import EmbeddingEncoding
+
+# Size (in bytes) of the float32 scale prepended to int8-encoded embeddings
+_INT8_SCALE_SIZE = np.dtype(np.float32).itemsize
+
+
+def encode_embedding(embedding: np.ndarray, encoding: EmbeddingEncoding) -> bytes:
+    """Serialize a 1D embedding vector to bytes, so that it can be stored in
+    a `BlobField`.
+
+    With `EmbeddingEncoding.int8`, the vector is scaled so that its largest
+    absolute component maps to 127, and the float32 scale is stored before
+    the int8 values.
+
+    :param embedding: the 1D embedding to encode
+    :param encoding: the encoding to use
+    :return: the serialized embedding
+    """
+    embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+    if encoding == EmbeddingEncoding.float32:
+        return embedding.tobytes()
+    elif encoding == EmbeddingEncoding.float16:
+        return embedding.astype(np.float16).tobytes()
+    elif encoding == EmbeddingEncoding.int8:
+        max_abs = float(np.abs(embedding).max(initial=0.0))
+        scale = np.float32(max_abs / 127.0 if max_abs > 0 else 1.0)
+        quantized = np.clip(np.rint(embedding / scale), -127, 127).astype(np.int8)
+        return scale.tobytes() + quantized.tobytes()
+
+    raise ValueError(f"unknown embedding encoding: {encoding}")
+
+
+def decode_embedding(
+    data: bytes | memoryview, encoding: EmbeddingEncoding | str
+) -> np.ndarray:
+    """Deserialize an embedding serialized with `encode_embedding`.
+
+    :param data: the serialized embedding
+    :param encoding: the encoding used to serialize the embedding
+    :return: the embedding, as a 1D float32 array
+    """
+    encoding = EmbeddingEncoding(encoding)
+
+    if encoding == EmbeddingEncoding.float32:
+        return np.frombuffer(data, dtype=np.float32)
+    elif encoding == EmbeddingEncoding.float16:
+        return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+    elif encoding == EmbeddingEncoding.int8:
+        scale = np.frombuffer(data, dtype=np.float32, count=1)[0]
+        quantized = np.frombuffer(data, dtype=np.int8, offset=_INT8_SCALE_SIZE)
+        return quantized.astype(np.float32) * scale
+
+    raise ValueError(f"unknown embedding encoding: {encoding}")
@@ -1,4 +1,5 @@
 import logging
+import math
 from io import BytesIO
 from pathlib import Path
 from typing import Literal
@@ -177,3 +178,48 @@ def convert_bounding_box_absolute_to_relative(
         min(1.0, bounding_box_absolute[2] / height),
         min(1.0, bounding_box_absolute[3] / width),
     )
+
+
+def crop_image(
+    image: Image.Image,
+    bounding_box: tuple[float, float, float, float],
+    max_size: int | None = None,
+) -> Image.Image:
+    """Crop an image using relative coordinates.
+
+    If `max_size` is provided, the crop is resized so that its largest side
+    is at most `max_size` pixels. For JPEG images that were not decoded yet,
+    JPEG draft mode is used to decode the image at the smallest resolution
+    (1/2, 1/4 or 1/8 of the full resolution) that is large enough for the
+    requested size, which is much faster than decoding the full image.
+
+    :param image: the image to crop, as returned by `Image.open`
+    :param bounding_box: the relative (y_min, x_min, y_max, x_max)
+        coordinates of the crop
+    :param max_size: the maximum size (in pixels) of the largest side of the
+        crop, defaults to None (no resizing)
+    :return: the cropped image
+    """
+    y_min, x_min, y_max, x_max = bounding_box
+    if max_size is not None and image.format == "JPEG":
+        crop_size = max((x_max - x_min) * image.width, (y_max - y_min) * image.height)
+        if crop_size > max_size:
+            scale = max_size / crop_size
+            # draft() selects the largest scale reduction that keeps the image
+            # larger than the requested size
+            image.draft(
+                image.mode,
+                (math.ceil(image.width * scale), math.ceil(image.height * scale)),
+            )
+
+    cropped_image = image.crop(
+        (
+            round(x_min * image.width),
+            round(y_min * image.height),
+            round(x_max * image.width),
+            round(y_max * image.height),
+        )
+    )
+    if max_size is not None:
+        cropped_image.thumbnail((max_size, max_size))
+    return cropped_image
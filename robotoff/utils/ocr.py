@@ -0,0 +1,179 @@
+"""Cached fetching of OCR results.
+
+The same OCR JSON is used by several jobs for each image (OCR predictions,
+logo detection, ingredient and nutrition extraction, category
+prediction,...). OCR JSON files are often several MB large: `get_ocr_result`
+should be used instead of `OCRResult.from_url`, to avoid downloading and
+parsing them again for each job:
+
+- the raw OCR JSON is stored gzip-compressed in a dedicated disk cache
+  (`ocr_disk_cache`, shared by all processes, with its own size limit),
+  keyed by URL. On cache hit, the cached JSON is revalidated with a
+  conditional HTTP request (`If-None-Match`/`If-Modified-Since`), so that
+  the JSON is only downloaded again if it changed (OCR run again on the
+  image)
+- parsed `OCRResult` objects are kept in a small in-process LRU cache, during
+  `settings.OCR_RESULT_CACHE_TTL` seconds (without revalidation). This cache
+  is not shared between processes: rq workers run each job in a new forked
+  process, so it only avoids parsing the same JSON again during a job, or in
+  long-running processes (API workers). Jobs share the disk cache only.
+"""
+
+import gzip
+import json
+import logging
+import threading
+import zlib
+
+import requests
+from cachetools import TTLCache
+from diskcache import Cache
+from openfoodfacts.ocr import (
+    OCRParsingException,
+    OCRResult,
+    OCRResultGenerationException,
+)
+
+from robotoff import settings
+from robotoff.utils import http_session
+
+logger = logging.getLogger(__name__)
+
+# Disk cache of raw OCR JSONs, shared by all processes
+ocr_disk_cache = Cache(
+    settings.OCR_DISKCACHE_DIR, size_limit=settings.OCR_CACHE_SIZE_LIMIT
+)
+
+# Parsed OCR results, by OCR URL
+_ocr_result_cache: TTLCache[str, OCRResult] = TTLCache(
+    maxsize=settings.OCR_RESULT_CACHE_SIZE, ttl=settings.OCR_RESULT_CACHE_TTL
+)
+_ocr_result_cache_lock = threading.Lock()
+
+
+def get_ocr_cache_key(ocr_url: str) -> str:
+    return f"ocr:{ocr_url}"
+
+
+def fetch_ocr_json(
+    ocr_url: str,
+    session: requests.Session,
+    error_raise: bool = True,
+    warning_missing: bool = True,
+) -> bytes | None:
+    """Return the gzip-compressed OCR JSON, from the disk cache if it's still
+    valid, or from the server otherwise (the disk cache is then updated).
+
+    If the server can't be reached, the cached JSON is returned (if any).
+
+    See `get_ocr_result` for a description of the parameters.
+    """
+    key = get_ocr_cache_key(ocr_url)
+    cached = ocr_disk_cache.get(key)
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        r = session.get(ocr_url, headers=headers)
+    except requests.exceptions.RequestException as e:
+        if cached is not None:
+            logger.info("HTTP error when fetching OCR URL, using cache: %s", ocr_url)
+            return cached["content"]
+        error_message = "HTTP Error when fetching OCR URL"
+        if error_raise:
+            raise OCRResultGenerationException(error_message, ocr_url) from e
+        logger.warning(error_message + ": %s", ocr_url, exc_info=e)
+        return None
+
+    if r.status_code == 304 and cached is not None:
+        ocr_disk_cache.touch(key, expire=settings.OCR_CACHE_EXPIRE)
+        return cached["content"]
+
+    if not r.ok:
+        error_message = "Non-200 status code (%s) when fetching OCR URL"
+        if error_raise:
+            raise OCRResultGenerationException(error_message % r.status_code, ocr_url)
+        if warning_missing:
+            logger.warning(error_message + ": %s", r.status_code, ocr_url)
+        return None
+
+    # The fastest compression level already divides the size of OCR JSONs
+    # by ~8
+    content = gzip.compress(r.content, compresslevel=1)
+    ocr_disk_cache.set(
+        key,
+        {
+            "content": content,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+        },
+        expire=settings.OCR_CACHE_EXPIRE,
+    )
+    return content
+
+
+def get_ocr_result(
+    ocr_url: str,
+    session: requests.Session | None = None,
+    error_raise: bool = True,
+    warning_missing: bool = True,
+) -> OCRResult | None:
+    """Return the OCRResult of an OCR JSON URL, using the OCR caches.
+
+    This is a cached version of `OCRResult.from_url`, with the same
+    parameters.
+
+    :param ocr_url: The URL of the JSON OCR
+    :param session: the requests Session to use to download the JSON file,
+        defaults to Robotoff HTTP session
+    :param error_raise: if True, raises an OCRResultGenerationException if
+        an error occured during download or analysis, defaults to True
+    :param warning_missing: if True, log a warning if a non HTTP 200 status
+        code is returned when fetching the OCR URL, defaults to True
+    :return: if `error_raise` is True, always return an OCRResult (or raise an
+        error). Otherwise return the OCRResult or None if an error occured.
+    """
+    with _ocr_result_cache_lock:
+        ocr_result = _ocr_result_cache.get(ocr_url)
+    if ocr_result is not None:
+        return ocr_result
+
+    content = fetch_ocr_json(
+        ocr_url, session or http_session, error_raise, warning_missing
+    )
+    if content is None:
+        return None
+
+    try:
+        ocr_data: dict = json.loads(gzip.decompress(content))
+    except (ValueError, zlib.error, EOFError) as e:
+        # Don't keep an invalid JSON in cache
+        ocr_disk_cache.delete(get_ocr_cache_key(ocr_url))
+        error_message = "Error while decoding OCR JSON"
+        if error_raise:
+            raise OCRResultGenerationException(error_message, ocr_url) from e
+        logger.warning(error_message + ": %s", ocr_url, exc_info=e)
+        return None
+
+    try:
+        ocr_result = OCRResult.from_json(ocr_data)
+    except OCRParsingException as e:
+        if error_raise:
+            raise OCRResultGenerationException(str(e), ocr_url) from e
+        logger.warning("Error while parsing OCR JSON from %s", ocr_url, exc_info=e)
+        return None
+
+    if ocr_result is not None:
+        with _ocr_result_cache_lock:
+            _ocr_result_cache[ocr_url] = ocr_result
+    return ocr_result
+
+
+def clear_ocr_result_cache() -> None:
+    """Clear the in-process cache of parsed OCR results."""
+    with _ocr_result_cache_lock:
+        _ocr_result_cache.clear()
@@ -1,3 +1,4 @@
+import functools
 import logging
 import re
 import unicodedata
@@ -50,6 +51,7 @@ def strip_consecutive_spaces(text: str) -> str:
     return CONSECUTIVE_SPACES_REGEX.sub(" ", text)
 
 
+@functools.lru_cache(maxsize=16384)
 def get_tag(text: str) -> str:
     """Return a tag from a text.
 
@@ -59,6 +61,9 @@ def get_tag(text: str) -> str:
     - accent removal
     - replacement of punctuation by either a comma ("-") or nothing, depending
     on the punctuation
+
+    Results are cached, as the same values (brands, labels,...) are tagged
+    many times.
     """
     text = fold_without_deletion(text)
     text = (
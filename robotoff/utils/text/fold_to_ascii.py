@@ -1381,42 +1381,44 @@ codepoint_to_replacement = [
 
 translate_table = codepoint_to_self + codepoint_to_replacement
 
+# Translate tables (see `str.translate` function) are plain dicts, so that the
+# lookups are performed in C. With a dict, characters missing from the table
+# are kept as is.
 
-class TranslateTableWithoutInsertionDeletion:
-    """Class to be used as a translate table (see `str.translate` function)
-    without any insertion or deletion: only characters with a replacement of
-    length 1 are kept from the original `translate_table` mapping."""
+# Translate table without any insertion or deletion: only characters with a
+# replacement of length 1 are kept from the original `translate_table`
+# mapping
+translate_table_without_insertion_deletion = {
+    ordinal: replacement
+    for (ordinal, replacement) in translate_table
+    if len(replacement) == 1
+}
+# Translate table without deletion: unrecognized characters are kept as is
+translate_table_without_deletion = dict(translate_table)
 
-    _translate_table = dict(
-        (ordinal, replacement)
-        for (ordinal, replacement) in translate_table
-        if len(replacement) == 1
-    )
 
-    def __getitem__(self, value):
-        if (replacement_value := self._translate_table.get(value)) is None:
-            # Return original character if it is not in translate table
-            return value
-        return replacement_value
+# Translate tables used by `fold`, by replacement string. Characters missing
+# from `translate_table` are added to a table on first lookup, so that next
+# lookups of the same character are performed in C. The tables are replaced
+# by new ones when they get too large, and at most `MAX_FOLD_TABLES`
+# replacements are cached (`fold` is almost always called with the default
+# replacement).
+_fold_translate_tables: dict[str, defaultdict] = {}
+MAX_FOLD_TABLE_SIZE = len(translate_table) + 10_000
+MAX_FOLD_TABLES = 4
 
 
-class TranslateTableWithoutDeletion:
-    """Class to be used as a translate table (see `str.translate` function)
-    without deletion: we keep unrecognized characters as it."""
-
-    _translate_table = dict(
-        (ordinal, replacement) for (ordinal, replacement) in translate_table
-    )
-
-    def __getitem__(self, value):
-        if (replacement_value := self._translate_table.get(value)) is None:
-            # Return original character if it is not in translate table
-            return value
-        return replacement_value
-
-
-translate_table_without_insertion_deletion = TranslateTableWithoutInsertionDeletion()
-translate_table_without_deletion = TranslateTableWithoutDeletion()
+def get_fold_translate_table(replacement: str) -> defaultdict:
+    """Return the translate table used by `fold` for a replacement string."""
+    table = _fold_translate_tables.get(replacement)
+    if table is None or len(table) > MAX_FOLD_TABLE_SIZE:
+        if len(_fold_translate_tables) >= MAX_FOLD_TABLES:
+            _fold_translate_tables.clear()
+        # The previous table is not modified, as it may still be used by
+        # another thread
+        table = defaultdict(lambda: replacement or None, translate_table)
+        _fold_translate_tables[replacement] = table
+    return table
 
 
 def fold_without_insertion_deletion(string: str):
@@ -1431,12 +1433,9 @@ def fold_without_insertion_deletion(string: str):
     if string is None:
         return ""
 
-    try:
-        # If string contains only ASCII characters, return it.
-        string.encode("ascii")
+    # If string contains only ASCII characters, return it.
+    if string.isascii():
         return string
-    except UnicodeEncodeError:
-        pass
 
     return string.translate(translate_table_without_insertion_deletion)
 
@@ -1451,12 +1450,9 @@ def fold_without_deletion(string: str):
     if string is None:
         return ""
 
-    try:
-        # If string contains only ASCII characters, return it.
-        string.encode("ascii")
+    # If string contains only ASCII characters, return it.
+    if string.isascii():
         return string
-    except UnicodeEncodeError:
-        pass
 
     return string.translate(translate_table_without_deletion)
 
@@ -1474,16 +1470,8 @@ def fold(string: str, replacement: str = "") -> str:
     if string is None:
         return ""
 
-    try:
-        # If string contains only ASCII characters, return it.
-        string.encode("ascii")
+    # If string contains only ASCII characters, return it.
+    if string.isascii():
         return string
-    except UnicodeEncodeError:
-        pass
-
-    if replacement:
-        t = defaultdict(lambda: replacement, translate_table)
-    else:
-        t = defaultdict(lambda: None, translate_table)  # type: ignore
 
-    return string.translate(t)
+    return string.translate(get_fold_translate_table(replacement))
@@ -0,0 +1,498 @@
+"""Read-only, memory-efficient version of `KeywordProcessor`.
+
+`KeywordProcessor` stores its trie as nested dicts (one dict per character
+node), which is convenient to add or remove keywords, but uses a lot of
+memory for large keyword lists (ingredients, brands,...). Once all keywords
+were added, a `FrozenKeywordProcessor` can be built from the processor: the
+trie is then stored in flat arrays, and `extract_keywords` returns the same
+results as the original processor.
+
+A frozen processor can be saved to a binary snapshot file (see
+`FrozenKeywordProcessor.save`), and loaded back by memory-mapping the file
+(see `FrozenKeywordProcessor.load`), which is much faster than building the
+processor from the keyword files.
+
+Snapshot files contain pickled data (the clean names can be any Python
+object), and loading a file can therefore run arbitrary code: snapshots must
+only be loaded from a directory that only the application user can write to.
+"""
+
+import functools
+import gc
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+from .flashtext import KeywordProcessor, _get_span_indices, get_index_mapping
+
+# Increase when the snapshot file format changes
+SNAPSHOT_FORMAT_VERSION = 1
+# Arrays are stored in native byte order: the byte order is part of the magic
+# number, so that a snapshot is never loaded on a platform with another byte
+# order
+SNAPSHOT_MAGIC = b"RKPSNAP" + (b"<" if sys.byteorder == "little" else b">")
+# magic number, format version, source key (SHA-256 digest), number of nodes,
+# number of edges, byte length of the edge characters (UTF-8) and byte length
+# of the metadata (pickle)
+SNAPSHOT_HEADER = struct.Struct("=8sI32sQQQQ")
+
+
+class FrozenKeywordProcessor:
+    """Read-only `KeywordProcessor`, with a flat-array trie.
+
+    Nodes are identified by an integer (the root node is 0), and are stored
+    in breadth-first order:
+
+    - the outgoing edges of node `i` are the edges
+      `edge_start[i]:edge_start[i + 1]`, in insertion order (the order of the
+      dict trie, used to enumerate children during fuzzy matching)
+    - `edge_chars` (a string) and `edge_children` store the character and
+      the child node of each edge: the child of a node for a character is
+      found with `str.find` on the slice of `edge_chars` of the node
+    - `keyword_ids[i]` is the index of the clean name of node `i` in
+      `clean_names`, or -1 if no keyword ends at node `i`. Equal clean names
+      are only stored once.
+    """
+
+    def __init__(self, processor: KeywordProcessor):
+        """Build the frozen trie from `processor`.
+
+        :param processor: the processor to freeze, later updates of this
+            processor are not reflected in the frozen processor
+        """
+        self.case_sensitive = processor.case_sensitive
+        self.non_word_boundaries = frozenset(processor.non_word_boundaries)
+        self._white_space_chars = frozenset(processor._white_space_chars)
+        self._terms_in_trie = len(processor)
+        self.clean_names: list[Any] = []
+        keyword_ids = array("i")
+        edge_start = array("I", [0])
+        edge_children = array("I")
+        edge_chars = []
+
+        clean_name_ids: dict[Any, int] = {}
+        keyword = processor._keyword
+        # Nodes of the dict trie, indexed by node ID
+        nodes = [processor.keyword_trie_dict]
+        for node in nodes:
+            keyword_id = -1
+            for key, value in node.items():
+                if key == keyword:
+                    keyword_id = self._intern_clean_name(clean_name_ids, value)
+                else:
+                    edge_chars.append(key)
+                    edge_children.append(len(nodes))
+                    nodes.append(value)
+            keyword_ids.append(keyword_id)
+            edge_start.append(len(edge_chars))
+        self._set_trie(keyword_ids, edge_start, edge_children, "".join(edge_chars))
+
+    def _set_trie(
+        self,
+        keyword_ids: Sequence[int],
+        edge_start: Sequence[int],
+        edge_children: Sequence[int],
+        edge_chars: str,
+    ) -> None:
+        # The arrays are either `array` objects or memoryviews on a
+        # memory-mapped snapshot file
+        self.keyword_ids = keyword_ids
+        self.edge_start = edge_start
+        self.edge_children = edge_children
+        self.edge_chars = edge_chars
+        # Most lookups are performed on the root node, which has the largest
+        # number of children: its children are also stored in a dict
+        self.root_children = {
+            edge_chars[edge]: edge_children[edge]
+            for edge in range(edge_start[0], edge_start[1])
+        }
+
+    def save(self, path: Path, source_key: bytes) -> None:
+        """Save the processor to a snapshot file.
+
+        The file is written atomically: concurrent readers either see the
+        previous file or the new one. It's only writable by its owner, as it
+        contains pickled data (see `load`).
+
+        :param path: the path of the snapshot file
+        :param source_key: a SHA-256 digest identifying the data the processor
+            was built from, checked when loading the snapshot
+        """
+        edge_chars = self.edge_chars.encode("utf-8")
+        metadata = pickle.dumps(
+            {
+                "case_sensitive": self.case_sensitive,
+                "non_word_boundaries": self.non_word_boundaries,
+                "white_space_chars": self._white_space_chars,
+                "terms_in_trie": self._terms_in_trie,
+                "clean_names": self.clean_names,
+            },
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            f.write(
+                SNAPSHOT_HEADER.pack(
+                    SNAPSHOT_MAGIC,
+                    SNAPSHOT_FORMAT_VERSION,
+                    source_key,
+                    len(self.keyword_ids),
+                    len(self.edge_children),
+                    len(edge_chars),
+                    len(metadata),
+                )
+            )
+            # The header size is a multiple of 4, so that all arrays are
+            # aligned
+            for values, typecode in (
+                (self.keyword_ids, "i"),
+                (self.edge_start, "I"),
+                (self.edge_children, "I"),
+            ):
+                f.write(array(typecode, values).tobytes())
+            f.write(edge_chars)
+            f.write(metadata)
+        tmp_path.chmod(0o644)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, source_key: bytes) -> "FrozenKeywordProcessor | None":
+        """Load a processor from a snapshot file saved with `save`.
+
+        The file is memory-mapped: the trie arrays are not copied in memory,
+        and are shared between all processes loading the same snapshot.
+
+        The source key only detects stale snapshots, it doesn't authenticate
+        the file: the metadata is unpickled, so the file must come from a
+        trusted directory (only writable by the application user).
+
+        :param path: the path of the snapshot file
+        :param source_key: the expected source key of the snapshot
+        :return: the processor, or None if the file doesn't exist, is
+            invalid, or was built from other data (`source_key` mismatch)
+        """
+        if not path.is_file() or path.stat().st_size < SNAPSHOT_HEADER.size:
+            return None
+
+        with path.open("rb") as f:
+            # The mapping remains valid after the file is closed
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            format_version,
+            snapshot_source_key,
+            node_count,
+            edge_count,
+            edge_chars_length,
+            metadata_length,
+        ) = SNAPSHOT_HEADER.unpack_from(buffer)
+        offset = SNAPSHOT_HEADER.size
+        sizes = (node_count * 4, (node_count + 1) * 4, edge_count * 4)
+        if (
+            magic != SNAPSHOT_MAGIC
+            or format_version != SNAPSHOT_FORMAT_VERSION
+            or snapshot_source_key != source_key
+            or len(buffer) != offset + sum(sizes) + edge_chars_length + metadata_length
+        ):
+            buffer.close()
+            return None
+
+        view = memoryview(buffer)
+        arrays: list[Sequence[int]] = []
+        for size, typecode in zip(sizes, ("i", "I", "I"), strict=True):
+            arrays.append(view[offset : offset + size].cast(typecode))
+            offset += size
+        keyword_ids, edge_start, edge_children = arrays
+        edge_chars = str(view[offset : offset + edge_chars_length], "utf-8")
+        offset += edge_chars_length
+        # Unpickling creates many container objects (clean names), which
+        # triggers full garbage collections of the (large) process heap
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            metadata = pickle.loads(view[offset : offset + metadata_length])
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        processor = cls.__new__(cls)
+        processor.case_sensitive = metadata["case_sensitive"]
+        processor.non_word_boundaries = metadata["non_word_boundaries"]
+        processor._white_space_chars = metadata["white_space_chars"]
+        processor._terms_in_trie = metadata["terms_in_trie"]
+        processor.clean_names = metadata["clean_names"]
+        processor._set_trie(keyword_ids, edge_start, edge_children, edge_chars)
+        return processor
+
+    def _intern_clean_name(self, clean_name_ids: dict[Any, int], value: Any) -> int:
+        try:
+            key: Any = (type(value), value)
+            hash(key)
+        except TypeError:
+            # Unhashable clean names are not deduplicated
+            key = id(value)
+        if key not in clean_name_ids:
+            clean_name_ids[key] = len(self.clean_names)
+            self.clean_names.append(value)
+        return clean_name_ids[key]
+
+    def __len__(self) -> int:
+        return self._terms_in_trie
+
+    def __contains__(self, word: str) -> bool:
+        return self[word] is not None
+
+    def __getitem__(self, word: str) -> Any | None:
+        if not self.case_sensitive:
+            word = word.lower()
+        node = 0
+        for char in word:
+            node = self._get_child(node, char)
+            if node == -1:
+                return None
+        keyword_id = self.keyword_ids[node]
+        return self.clean_names[keyword_id] if keyword_id != -1 else None
+
+    def _get_child(self, node: int, char: str) -> int:
+        """Return the child of `node` for `char`, or -1 if there is none."""
+        index = self.edge_chars.find(
+            char, self.edge_start[node], self.edge_start[node + 1]
+        )
+        return self.edge_children[index] if index != -1 else -1
+
+    def _has_keyword(self, node: int) -> bool:
+        return self.keyword_ids[node] != -1
+
+    def _get_keyword(self, node: int) -> Any:
+        return self.clean_names[self.keyword_ids[node]]
+
+    def extract_keywords(
+        self, sentence: str, span_info: bool = False, max_cost: int = 0
+    ) -> list[Any | tuple[Any, int, int]]:
+        """Search in the string for all keywords of the trie, see
+        `KeywordProcessor.extract_keywords`."""
+        keywords_extracted: list[Any | tuple[Any, int, int]] = []
+        if not sentence:
+            return keywords_extracted
+
+        index_mapping = get_index_mapping(sentence, self.case_sensitive)
+        get_span_indices = functools.partial(
+            _get_span_indices, index_mapping=index_mapping
+        )
+        if not self.case_sensitive:
+            sentence = sentence.lower()
+        # Trie lookups are inlined in the loops below, as function calls are
+        # expensive
+        non_word_boundaries = self.non_word_boundaries
+        keyword_ids = self.keyword_ids
+        edge_chars = self.edge_chars
+        edge_start = self.edge_start
+        edge_children = self.edge_children
+        root_children = self.root_children
+        current_node = 0
+        sequence_start_pos = 0
+        sequence_end_pos = 0
+        reset_current_node = False
+        idx = 0
+        sentence_len = len(sentence)
+        curr_cost = max_cost
+        while idx < sentence_len:
+            char = sentence[idx]
+            # when we reach a character that might denote word end
+            if char not in non_word_boundaries:
+                if current_node == 0:
+                    child = root_children.get(char, -1)
+                else:
+                    edge = edge_chars.find(
+                        char, edge_start[current_node], edge_start[current_node + 1]
+                    )
+                    child = edge_children[edge] if edge != -1 else -1
+                if keyword_ids[current_node] != -1 or child != -1:
+                    # update longest sequence found
+                    longest_sequence_found = None
+                    is_longer_seq_found = False
+                    if keyword_ids[current_node] != -1:
+                        longest_sequence_found = self._get_keyword(current_node)
+                        sequence_end_pos = idx
+
+                    # re look for longest_sequence from this position
+                    if child != -1:
+                        current_node_continued = child
+
+                        idy = idx + 1
+                        while idy < sentence_len:
+                            inner_char = sentence[idy]
+                            if (
+                                inner_char not in non_word_boundaries
+                                and keyword_ids[current_node_continued] != -1
+                            ):
+                                # update longest sequence found
+                                longest_sequence_found = self._get_keyword(
+                                    current_node_continued
+                                )
+                                sequence_end_pos = idy
+                                is_longer_seq_found = True
+                            inner_edge = edge_chars.find(
+                                inner_char,
+                                edge_start[current_node_continued],
+                                edge_start[current_node_continued + 1],
+                            )
+                            if inner_edge != -1:
+                                current_node_continued = edge_children[inner_edge]
+                            elif curr_cost > 0:
+                                next_word = self.get_next_word(sentence[idy:])
+                                current_node_continued, cost, _ = next(
+                                    self.levensthein(
+                                        next_word,
+                                        max_cost=curr_cost,
+                                        start_node=current_node_continued,
+                                    ),
+                                    # no match: the next iteration goes to a
+                                    # `break`
+                                    (-1, 0, 0),
+                                )
+                                curr_cost -= cost
+                                idy += len(next_word) - 1
+                                if current_node_continued == -1:
+                                    break
+                            else:
+                                break
+                            idy += 1
+                        else:
+                            # end of sentence reached.
+                            if keyword_ids[current_node_continued] != -1:
+                                # update longest sequence found
+                                longest_sequence_found = self._get_keyword(
+                                    current_node_continued
+                                )
+                                sequence_end_pos = idy
+                                is_longer_seq_found = True
+                        if is_longer_seq_found:
+                            idx = sequence_end_pos
+                    current_node = 0
+                    if longest_sequence_found:
+                        keywords_extracted.append(
+                            (
+                                longest_sequence_found,
+                                *get_span_indices(sequence_start_pos, idx),
+                            )
+                        )
+                        curr_cost = max_cost
+                    reset_current_node = True
+                else:
+                    # we reset current_node
+                    current_node = 0
+                    reset_current_node = True
+            elif current_node == 0 and char in root_children:
+                # we can continue from this char
+                current_node = root_children[char]
+            elif (
+                current_node != 0
+                and (
+                    edge := edge_chars.find(
+                        char, edge_start[current_node], edge_start[current_node + 1]
+                    )
+                )
+                != -1
+            ):
+                # we can continue from this char
+                current_node = edge_children[edge]
+            elif curr_cost > 0:
+                next_word = self.get_next_word(sentence[idx:])
+                current_node, cost, _ = next(
+                    self.levensthein(
+                        next_word, max_cost=curr_cost, start_node=current_node
+                    ),
+                    (0, 0, 0),
+                )
+                curr_cost -= cost
+                idx += len(next_word) - 1
+            else:
+                # we reset current_node
+                current_node = 0
+                reset_current_node = True
+                # skip to end of word
+                idy = idx + 1
+                while idy < sentence_len:
+                    char = sentence[idy]
+                    if char not in non_word_boundaries:
+                        break
+                    idy += 1
+                idx = idy
+            # if we are end of sentence and have a sequence discovered
+            if idx + 1 >= sentence_len:
+                if keyword_ids[current_node] != -1:
+                    keywords_extracted.append(
+                        (
+                            self._get_keyword(current_node),
+                            *get_span_indices(sequence_start_pos, sentence_len),
+                        )
+                    )
+            idx += 1
+            if reset_current_node:
+                reset_current_node = False
+                sequence_start_pos = idx
+        if span_info:
+            return keywords_extracted
+        return [value[0] for value in keywords_extracted]
+
+    def get_next_word(self, sentence: str) -> str:
+        """Return the characters of `sentence` until the first word
+        boundary."""
+        next_word = ""
+        for char in sentence:
+            if char not in self.non_word_boundaries:
+                break
+            next_word += char
+        return next_word
+
+    def _iter_children(self, node: int) -> Iterator[tuple[str, int]]:
+        """Iterate over the (char, child node) of `node`, in insertion
+        order."""
+        for edge in range(self.edge_start[node], self.edge_start[node + 1]):
+            yield self.edge_chars[edge], self.edge_children[edge]
+
+    def levensthein(
+        self, word: str, max_cost: int = 2, start_node: int = 0
+    ) -> Iterator[tuple[int, int, int]]:
+        """Retrieve the nodes where there is a fuzzy match, see
+        `KeywordProcessor.levensthein`.
+
+        :yield: (node, cost, depth) tuples
+        """
+        rows = range(len(word) + 1)
+
+        for char, node in self._iter_children(start_node):
+            yield from self._levenshtein_rec(char, node, word, rows, max_cost, depth=1)
+
+    def _levenshtein_rec(self, char, node, word, rows, max_cost, depth=0):
+        n_columns = len(word) + 1
+        new_rows = [rows[0] + 1]
+        cost = 0
+
+        for col in range(1, n_columns):
+            insert_cost = new_rows[col - 1] + 1
+            delete_cost = rows[col] + 1
+            replace_cost = rows[col - 1] + int(word[col - 1] != char)
+            cost = min((insert_cost, delete_cost, replace_cost))
+            new_rows.append(cost)
+
+        stop_crit = self._has_keyword(node) or any(
+            self._get_child(node, white_space_char) != -1
+            for white_space_char in self._white_space_chars
+        )
+        if new_rows[-1] <= max_cost and stop_crit:
+            yield node, cost, depth
+
+        elif min(new_rows) <= max_cost:
+            for new_char, new_node in self._iter_children(node):
+                yield from self._levenshtein_rec(
+                    new_char, new_node, word, new_rows, max_cost, depth=depth + 1
+                )
@@ -0,0 +1,94 @@
+"""Snapshots of keyword processors, to avoid rebuilding them from the keyword
+files (or taxonomies) in every process.
+
+A snapshot is a `FrozenKeywordProcessor` saved in
+`settings.KEYWORD_PROCESSOR_SNAPSHOT_DIR`. It's identified by a source key,
+a hash of the files the processor is built from: when one of the files
+changes, the snapshot is stale and is rebuilt on first use.
+"""
+
+import hashlib
+import logging
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from robotoff import settings
+
+from .flashtext import KeywordProcessor
+from .frozen_flashtext import FrozenKeywordProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def get_source_key(name: str, version: str, source_paths: Iterable[Path]) -> bytes:
+    """Return the source key of a keyword processor snapshot, a SHA-256
+    digest of the processor name and version and of the name and content of
+    all source files.
+
+    The directory of the source files is not part of the key, so that a
+    snapshot stays valid when the project is installed in another
+    directory (ex: a snapshot built in a Docker image build step).
+
+    :param name: the name of the processor
+    :param version: the version of the processor, to increase when the way
+        the processor is built from the source files changes
+    :param source_paths: the paths of the files the processor is built from
+    """
+    digest = hashlib.sha256(f"{name}:{version}".encode())
+    for path in source_paths:
+        digest.update(path.name.encode())
+        with path.open("rb") as f:
+            digest.update(hashlib.file_digest(f, "sha256").digest())
+    return digest.digest()
+
+
+def load_keyword_processor(
+    name: str,
+    source_paths: Iterable[Path],
+    build: Callable[[], KeywordProcessor],
+    version: str = "1",
+    snapshot_dir: Path | None = None,
+) -> FrozenKeywordProcessor:
+    """Load a keyword processor from its snapshot, or build it (and save the
+    snapshot) if the snapshot doesn't exist or is stale.
+
+    Errors while saving the snapshot (read-only directory,...) are logged
+    and ignored: the built processor is returned anyway.
+
+    :param name: the name of the processor, used as snapshot file name
+    :param source_paths: the paths of the files the processor is built from
+    :param build: the function building the processor from the source files
+    :param version: the version of the processor, to increase when `build`
+        changes, defaults to "1"
+    :param snapshot_dir: the directory of the snapshots, defaults to
+        `settings.KEYWORD_PROCESSOR_SNAPSHOT_DIR`
+    """
+    snapshot_dir = snapshot_dir or settings.KEYWORD_PROCESSOR_SNAPSHOT_DIR
+    snapshot_path = snapshot_dir / f"{name}.bin"
+    source_key = get_source_key(name, version, source_paths)
+
+    start_time = time.monotonic()
+    processor = FrozenKeywordProcessor.load(snapshot_path, source_key)
+    if processor is not None:
+        logger.debug(
+            "Keyword processor %s loaded from snapshot in %.3fs",
+            name,
+            time.monotonic() - start_time,
+        )
+        return processor
+
+    processor = FrozenKeywordProcessor(build())
+    logger.info(
+        "Keyword processor %s built in %.3fs", name, time.monotonic() - start_time
+    )
+    try:
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        processor.save(snapshot_path, source_key)
+    except OSError:
+        logger.warning(
+            "Error while saving keyword processor snapshot %s",
+            snapshot_path,
+            exc_info=True,
+        )
+    return processor
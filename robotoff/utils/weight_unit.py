@@ -1,5 +1,7 @@
 import functools
 import math
+import re
+from fractions import Fraction
 
 import pint
 
@@ -10,6 +12,28 @@ def get_unit_registry():
     return pint.UnitRegistry()
 
 
+# Conversion factors (exact, as defined by pint) of the units accepted by the
+# product weight regexes, to g for mass and mL for volumes
+UNIT_CONVERSION_TABLE: dict[str, tuple[Fraction, str]] = {
+    "mg": (Fraction(1, 1000), "g"),
+    "g": (Fraction(1), "g"),
+    "kg": (Fraction(1000), "g"),
+    "oz": (Fraction("28.349523125"), "g"),
+    "lb": (Fraction("453.59237"), "g"),
+    "lbs": (Fraction("453.59237"), "g"),
+    "ml": (Fraction(1), "ml"),
+    "cl": (Fraction(10), "ml"),
+    "dl": (Fraction(100), "ml"),
+    "l": (Fraction(1000), "ml"),
+    # For nutrition labeling, a fluid ounce is equal to 30 ml
+    "fl oz": (Fraction(30), "ml"),
+}
+
+# Values handled by the conversion table. Other values (such as "007", that
+# pint parses as "0 07") are parsed by pint.
+DECIMAL_VALUE_REGEX = re.compile(r"(?:0|[1-9][0-9]*)(?:\.[0-9]*)?")
+
+
 def normalize_weight(value: str, unit: str) -> tuple[float, str]:
     """Normalize a weight (product weight or nutrient quantity) by converting the value
     to g for mass and mL for volumes.
@@ -26,6 +50,25 @@ def normalize_weight(value: str, unit: str) -> tuple[float, str]:
         # pint does not recognize ',' separator
         value = value.replace(",", ".")
 
+    if unit in UNIT_CONVERSION_TABLE and DECIMAL_VALUE_REGEX.fullmatch(value):
+        # Fast path: parsing the quantity with pint is much slower than the
+        # conversion with exact factors
+        factor, normalized_unit = UNIT_CONVERSION_TABLE[unit]
+        normalized_value = float(Fraction(value) * factor)
+    else:
+        normalized_value, normalized_unit = _normalize_weight_pint(value, unit)
+
+    # Rounding errors due to float may occur with Pint,
+    # round normalized value to floor if there is no significant difference
+    if math.isclose(math.floor(normalized_value), normalized_value):
+        normalized_value = math.floor(normalized_value)
+
+    return normalized_value, normalized_unit
+
+
+def _normalize_weight_pint(value: str, unit: str) -> tuple[float, str]:
+    """Normalize a weight with pint, for units and values missing from
+    the conversion table (see `normalize_weight`)."""
     if unit == "fl oz":
         # For nutrition labeling, a fluid ounce is equal to 30 ml
         value = str(float(value) * 30)
@@ -43,10 +86,4 @@ def normalize_weight(value: str, unit: str) -> tuple[float, str]:
     else:
         raise ValueError(f"unknown unit: {quantity.u}")
 
-    # Rounding errors due to float may occur with Pint,
-    # round normalized value to floor if there is no significant difference
-    normalized_value = normalized_quantity.magnitude
-    if math.isclose(math.floor(normalized_value), normalized_value):
-        normalized_value = math.floor(normalized_value)
-
-    return normalized_value, normalized_unit
+    return normalized_quantity.magnitude, normalized_unit
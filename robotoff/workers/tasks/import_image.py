@@ -63,10 +63,12 @@ from robotoff.types import (
     ServerType,
 )
 from robotoff.utils import get_image_from_url, http_session
+from robotoff.utils.embedding import encode_embedding
 from robotoff.utils.image import (
     convert_bounding_box_absolute_to_relative,
     convert_image_to_array,
 )
+from robotoff.utils.ocr import get_ocr_result
 from robotoff.workers.queues import (
     enqueue_job,
     get_high_queue,
@@ -680,7 +682,7 @@ def run_logo_object_detection(
             return_type="np",
         ),
     )
-    ocr_result = OCRResult.from_url(ocr_url, http_session, error_raise=False)
+    ocr_result = get_ocr_result(ocr_url, http_session, error_raise=False)
 
     if image is None:
         logger.info("Error while downloading image %s", image_url)
@@ -819,7 +821,11 @@ def save_logo_embeddings(
         for i in range(len(logos)):
             logo_id = logos[i].id
             logo_embedding = embeddings[i]
-            LogoEmbedding.create(logo_id=logo_id, embedding=logo_embedding.tobytes())
+            LogoEmbedding.create(
+                logo_id=logo_id,
+                embedding=encode_embedding(logo_embedding, settings.EMBEDDING_ENCODING),
+                encoding=settings.EMBEDDING_ENCODING.value,
+            )
 
 
 @with_db
@@ -1225,7 +1231,7 @@ def extract_nutrition_job(
             logger.info("Error while downloading image %s", image_url)
             return
 
-        ocr_result = OCRResult.from_url(ocr_url, http_session, error_raise=False)
+        ocr_result = get_ocr_result(ocr_url, http_session, error_raise=False)
 
         if ocr_result is None:
             logger.info("Error while downloading OCR JSON %s", ocr_url)
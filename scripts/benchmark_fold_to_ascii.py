@@ -0,0 +1,143 @@
+"""Benchmark ASCII folding (`fold`, `fold_without_deletion`,
+`fold_without_insertion_deletion`) and `get_tag` on a multilingual corpus,
+against the previous implementation (translate table built on each `fold`
+call, translate tables with a Python `__getitem__`).
+
+The output of both implementations is checked to be identical.
+
+Usage: python scripts/benchmark_fold_to_ascii.py [--repeat 20]
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from collections.abc import Callable
+
+from robotoff import settings
+from robotoff.utils.text import (
+    fold,
+    fold_without_deletion,
+    fold_without_insertion_deletion,
+    get_tag,
+    strip_consecutive_spaces,
+)
+from robotoff.utils.text.fold_to_ascii import translate_table
+
+SENTENCES = [
+    "Crème brûlée, œufs de plein air et pâte à tartiner",
+    "Straße, Müsli, Käse und Ölsardinen",
+    "Jamón ibérico, piñones y caña de azúcar",
+    "Żółć gęślą jaźń, čokoláda, smetana a řepka",
+    "Молоко пастеризованное 3,2%",
+    "Γιαούρτι στραγγιστό",
+    "緑茶 ペットボトル 500ml",
+    "Sữa tươi tiệt trùng",
+    "Reflets de France",
+]
+CORPUS_PATHS = [
+    settings.OCR_PACKAGING_DATA_PATH,
+    settings.OCR_TRACE_ALLERGEN_DATA_PATH,
+    settings.OCR_LABEL_FLASHTEXT_DATA_PATH,
+]
+
+
+class LegacyTranslateTable:
+    def __init__(self, only_length_1: bool):
+        self._translate_table = {
+            ordinal: replacement
+            for (ordinal, replacement) in translate_table
+            if not only_length_1 or len(replacement) == 1
+        }
+
+    def __getitem__(self, value):
+        if (replacement_value := self._translate_table.get(value)) is None:
+            return value
+        return replacement_value
+
+
+legacy_table_without_insertion_deletion = LegacyTranslateTable(True)
+legacy_table_without_deletion = LegacyTranslateTable(False)
+
+
+def legacy_fold(string: str, replacement: str = "") -> str:
+    if string.isascii():
+        return string
+    if replacement:
+        t = defaultdict(lambda: replacement, translate_table)
+    else:
+        t = defaultdict(lambda: None, translate_table)  # type: ignore
+    return string.translate(t)
+
+
+def legacy_fold_without_deletion(string: str) -> str:
+    if string.isascii():
+        return string
+    return string.translate(legacy_table_without_deletion)
+
+
+def legacy_fold_without_insertion_deletion(string: str) -> str:
+    if string.isascii():
+        return string
+    return string.translate(legacy_table_without_insertion_deletion)
+
+
+def legacy_get_tag(text: str) -> str:
+    text = legacy_fold_without_deletion(text)
+    text = (
+        text.lower()
+        .replace(" & ", "-")
+        .replace(" ", "-")
+        .replace("'", "-")
+        .replace(".", "-")
+        .replace("!", "")
+        .replace("?", "")
+    )
+    return strip_consecutive_spaces(text).strip("-")
+
+
+def load_corpus() -> list[str]:
+    corpus = list(SENTENCES)
+    for path in CORPUS_PATHS:
+        corpus += [line for line in path.read_text().splitlines() if line]
+    return corpus
+
+
+def bench(func: Callable[[str], str], corpus: list[str], repeat: int) -> float:
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            func(text)
+    return len(corpus) * repeat / (time.perf_counter() - start_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"corpus: {len(corpus)} strings")
+    for name, func, legacy_func in (
+        ("fold", fold, legacy_fold),
+        ("fold_without_deletion", fold_without_deletion, legacy_fold_without_deletion),
+        (
+            "fold_without_insertion_deletion",
+            fold_without_insertion_deletion,
+            legacy_fold_without_insertion_deletion,
+        ),
+        ("get_tag", get_tag, legacy_get_tag),
+    ):
+        assert [func(text) for text in corpus] == [
+            legacy_func(text) for text in corpus
+        ], f"{name}: output differs from the previous implementation"
+        throughput = bench(func, corpus, args.repeat)
+        legacy_throughput = bench(legacy_func, corpus, args.repeat)
+        print(
+            f"{name}: {throughput:,.0f} strings/s "
+            f"(previously {legacy_throughput:,.0f} strings/s, "
+            f"x{throughput / legacy_throughput:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Benchmark of the OCR prediction extractors (`PREDICTION_TYPE_TO_FUNC`).
+
+Two measurements are performed for each extractor:
+
+- latency: the extractor is run on every recorded OCR JSON of the corpus
+  (by default the OCR fixtures of `tests/unit` and `data/ocr`), and the p50,
+  p99 and max times are reported
+- growth: the extractor is run on texts of increasing length (built by
+  repeating the corpus texts and adversarial seeds, such as long digit runs
+  that trigger backtracking in weight or packager code regexes). The worst
+  time of each length is fitted to `time ~ length ** exponent`: extractors
+  with an exponent above `--growth-threshold` are flagged as superlinear.
+  Longer texts are skipped once a call took more than `--time-budget`.
+
+Results can be saved as a baseline (`--save-baseline`). Otherwise, they are
+compared with the stored baseline: the script exits with status 1 if the p50
+or p99 time of an extractor regressed by more than `--tolerance`, if an
+extractor became superlinear, or if an extractor failed.
+
+Timings depend on the machine and on the data files available (keyword
+lists, taxonomies,...): the comparison is only valid between runs in the test
+container, with `make benchmark-ocr-extraction`. The baseline must be
+recorded the same way, with `make benchmark-ocr-extraction
+args=--save-baseline`, and can't be saved if an extractor failed (use
+`--types` to only record the extractors that work). Extractors missing from
+the baseline are listed, but not compared.
+
+Usage: python scripts/benchmark_ocr_extraction.py [--save-baseline]
+"""
+
+import argparse
+import gzip
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TextIO
+
+from openfoodfacts.ocr import OCRParsingException, OCRResult
+
+from robotoff import settings
+from robotoff.prediction.ocr.core import PREDICTION_TYPE_TO_FUNC
+from robotoff.types import Prediction
+
+DEFAULT_CORPUS_PATHS = [settings.PROJECT_DIR / "tests/unit", settings.OCR_DATA_DIR]
+DEFAULT_BASELINE_PATH = Path(__file__).with_name(
+    "benchmark_ocr_extraction_baseline.json"
+)
+# Texts repeated to build the inputs of the growth benchmark, in addition to
+# the corpus texts
+ADVERSARIAL_SEEDS = [
+    "0123456789",
+    "1,2.3,4.5 ",
+    "poids net 1 ",
+    "EMB 01 FR 01.001.001 CE ",
+    "appellation ",
+    "a",
+    " ",
+]
+# Times below this value (in seconds) are too noisy to flag an extractor as
+# superlinear or as regressed
+MIN_SIGNIFICANT_TIME = 0.001
+
+Extractor = Callable[[OCRResult | str], list[Prediction]]
+# Result of the benchmark of an extractor, saved in the baseline
+ExtractorResult = dict[str, Any]
+
+
+@dataclass
+class GrowthResult:
+    # Exponent of the fit of the worst times to `time ~ length ** exponent`
+    exponent: float
+    # Worst time of each benchmarked length
+    worst_times: list[float]
+    # Adversarial seed of the worst time of the longest length, empty if the
+    # worst time was on a corpus text
+    worst_seed: str
+
+
+def open_text(path: Path) -> TextIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt")
+    return path.open("rt")
+
+
+def load_ocr_json(path: Path) -> dict | None:
+    try:
+        with open_text(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if isinstance(data, dict) and "responses" in data:
+        return data
+    return None
+
+
+def load_corpus(paths: Iterable[Path]) -> dict[str, OCRResult]:
+    """Load all OCR JSONs (`*.json` or `*.json.gz` files) found in `paths`
+    (files or directories, searched recursively)."""
+    corpus = {}
+    for path in paths:
+        if path.is_dir():
+            file_paths = sorted([*path.rglob("*.json"), *path.rglob("*.json.gz")])
+        else:
+            file_paths = [path]
+        for file_path in file_paths:
+            if (data := load_ocr_json(file_path)) is None:
+                continue
+            try:
+                ocr_result = OCRResult.from_json(data)
+            except OCRParsingException:
+                continue
+            if ocr_result is not None:
+                corpus[str(file_path.relative_to(settings.PROJECT_DIR))] = ocr_result
+    return corpus
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the q-th percentile (nearest rank) of the values."""
+    values = sorted(values)
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def benchmark_latency(
+    extractor: Extractor, corpus: list[OCRResult], repeat: int
+) -> dict[str, float]:
+    times = []
+    for ocr_result in corpus:
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            extractor(ocr_result)
+            times.append(time.perf_counter() - start_time)
+    return {
+        "p50": statistics.median(times),
+        "p99": percentile(times, 99),
+        "max": max(times),
+    }
+
+
+def benchmark_growth(
+    extractor: Extractor, seeds: list[str], lengths: list[int], time_budget: float
+) -> GrowthResult:
+    """Fit the worst time of the extractor on texts of increasing lengths to
+    `time ~ length ** exponent`.
+
+    Lengths are benchmarked in increasing order, the benchmark stops after
+    the first length where a call took more than `time_budget` seconds (a
+    superlinear extractor would take too long on the next lengths).
+    """
+    lengths = sorted(lengths)
+    worst_times: list[float] = []
+    worst_seed = ""
+    for length in lengths:
+        worst_time = 0.0
+        for seed in seeds:
+            text = (seed * math.ceil(length / len(seed)))[:length]
+            seed_time = _time_call(extractor, text)
+            if seed_time < time_budget:
+                # The minimum of several runs is the least noisy estimate
+                seed_time = min(
+                    seed_time, *(_time_call(extractor, text) for _ in range(2))
+                )
+            if seed_time > worst_time:
+                worst_time, worst_seed = seed_time, seed
+        worst_times.append(worst_time)
+        if worst_time > time_budget:
+            break
+
+    # Least squares fit of log(time) = exponent * log(length) + c
+    xs = [math.log(length) for length in lengths[: len(worst_times)]]
+    ys = [math.log(max(t, 1e-9)) for t in worst_times]
+    exponent = math.nan
+    if len(xs) >= 2:
+        x_mean, y_mean = statistics.fmean(xs), statistics.fmean(ys)
+        exponent = sum(
+            (x - x_mean) * (y - y_mean) for x, y in zip(xs, ys, strict=True)
+        ) / sum((x - x_mean) ** 2 for x in xs)
+    return GrowthResult(
+        exponent=exponent,
+        worst_times=worst_times,
+        # Only report a seed that is not a corpus text (too long to display)
+        worst_seed=worst_seed if worst_seed in ADVERSARIAL_SEEDS else "",
+    )
+
+
+def _time_call(extractor: Extractor, text: str) -> float:
+    start_time = time.perf_counter()
+    extractor(text)
+    return time.perf_counter() - start_time
+
+
+def run_benchmark(
+    corpus: dict[str, OCRResult],
+    prediction_types: list[str],
+    repeat: int,
+    lengths: list[int],
+    growth_threshold: float,
+    time_budget: float,
+) -> dict[str, ExtractorResult]:
+    seeds = [
+        text
+        for ocr_result in corpus.values()
+        if (text := ocr_result.get_full_text_contiguous())
+    ] + ADVERSARIAL_SEEDS
+    results: dict[str, ExtractorResult] = {}
+    for prediction_type, extractor in PREDICTION_TYPE_TO_FUNC.items():
+        if prediction_type.name not in prediction_types:
+            continue
+        try:
+            # Load the resources used by the extractor before timing it
+            extractor("")
+        except Exception as e:
+            results[prediction_type.name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{prediction_type.name}: error ({e})", file=sys.stderr)
+            continue
+        growth = benchmark_growth(extractor, seeds, lengths, time_budget)
+        result: ExtractorResult = {
+            **benchmark_latency(extractor, list(corpus.values()), repeat),
+            "growth_exponent": growth.exponent,
+            "superlinear": growth.exponent > growth_threshold
+            and growth.worst_times[-1] >= MIN_SIGNIFICANT_TIME,
+            "worst_seed": growth.worst_seed,
+        }
+        results[prediction_type.name] = result
+        print(format_result(prediction_type.name, result), file=sys.stderr)
+    return results
+
+
+def format_result(name: str, result: ExtractorResult) -> str:
+    if "error" in result:
+        return f"{name:<18} error: {result['error']}"
+    text = (
+        f"{name:<18} p50 {result['p50'] * 1000:8.2f} ms  "
+        f"p99 {result['p99'] * 1000:8.2f} ms  "
+        f"growth exponent {result['growth_exponent']:5.2f}"
+    )
+    if result["superlinear"]:
+        text += " SUPERLINEAR"
+        if result["worst_seed"]:
+            text += f" (worst input: {result['worst_seed']!r} repeated)"
+    return text
+
+
+def compare_with_baseline(
+    results: dict[str, ExtractorResult], baseline: dict, tolerance: float
+) -> list[str]:
+    """Return the list of regressions of `results` compared to `baseline`."""
+    regressions = []
+    for name, result in results.items():
+        if "error" in result:
+            regressions.append(f"{name}: {result['error']}")
+            continue
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            continue
+        for key in ("p50", "p99"):
+            value, baseline_value = result[key], baseline_result[key]
+            if (
+                value > baseline_value * (1 + tolerance)
+                and value - baseline_value >= MIN_SIGNIFICANT_TIME
+            ):
+                regressions.append(
+                    f"{name}: {key} {baseline_value * 1000:.2f} ms -> "
+                    f"{value * 1000:.2f} ms"
+                )
+        if result["superlinear"] and not baseline_result["superlinear"]:
+            regressions.append(
+                f"{name}: became superlinear (growth exponent "
+                f"{baseline_result['growth_exponent']:.2f} -> "
+                f"{result['growth_exponent']:.2f})"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        nargs="+",
+        default=DEFAULT_CORPUS_PATHS,
+        help="OCR JSON files or directories containing OCR JSON files",
+    )
+    parser.add_argument(
+        "--types",
+        nargs="+",
+        default=[prediction_type.name for prediction_type in PREDICTION_TYPE_TO_FUNC],
+        help="prediction types to benchmark, defaults to all",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--lengths",
+        type=int,
+        nargs="+",
+        default=[125, 250, 500, 1000, 2000],
+        help="text lengths of the growth benchmark",
+    )
+    parser.add_argument("--growth-threshold", type=float, default=1.5)
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=1.0,
+        help="maximum time (in seconds) of a call of the growth benchmark, "
+        "longer texts are not benchmarked once it is exceeded",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="relative slowdown tolerated before reporting a regression",
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="save the results as the new baseline instead of comparing them",
+    )
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error("no OCR JSON found in the corpus")
+    print(f"corpus: {len(corpus)} OCR JSON(s)", file=sys.stderr)
+
+    results = run_benchmark(
+        corpus,
+        args.types,
+        args.repeat,
+        args.lengths,
+        args.growth_threshold,
+        args.time_budget,
+    )
+    if args.save_baseline:
+        if errors := [name for name, result in results.items() if "error" in result]:
+            print(
+                f"baseline not saved, extractors failed: {', '.join(errors)}",
+                file=sys.stderr,
+            )
+            return 1
+        baseline = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": sorted(corpus),
+            "lengths": args.lengths,
+            "results": results,
+        }
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"baseline saved in {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline found in {args.baseline}", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if missing := sorted(set(results) - set(baseline["results"])):
+        print(
+            f"not compared, missing from the baseline: {', '.join(missing)}",
+            file=sys.stderr,
+        )
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
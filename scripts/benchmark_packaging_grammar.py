@@ -0,0 +1,77 @@
+"""Benchmark the loading of the packaging parser (built from the grammar
+files or loaded from its snapshot) and the packaging parse latency on OCR
+fixtures.
+
+Usage: python scripts/benchmark_packaging_grammar.py [--repeat 20]
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from openfoodfacts.ocr import OCRResult
+
+from robotoff import settings
+from robotoff.prediction.ocr.grammar import load_lark_parser
+from robotoff.prediction.ocr.packaging import match_packaging
+
+OCR_FIXTURE_DIR = settings.PROJECT_DIR / "tests/unit/prediction/ocr/data"
+TEXTS = [
+    "étui EN  carton à recycler",
+    "bouteille en plastique pet",
+    "BOUTEILLE en verre sombre et son bouchon en aluminium à jeter",
+    "Ingrédients: 100% tomate",
+]
+
+
+def load_texts() -> list[str]:
+    texts = list(TEXTS)
+    for path in sorted(OCR_FIXTURE_DIR.glob("*.json")):
+        ocr_result = OCRResult.from_json(json.loads(path.read_text()))
+        if ocr_result is not None:
+            texts.append(ocr_result.get_full_text() or "")
+    return texts
+
+
+def time_load(snapshot_dir: Path) -> float:
+    start_time = time.perf_counter()
+    load_lark_parser(
+        settings.GRAMMARS_DIR / "packaging_fr.lark",
+        start="value",
+        snapshot_dir=snapshot_dir,
+    )
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        build_time = time_load(Path(snapshot_dir))
+        snapshot_time = min(time_load(Path(snapshot_dir)) for _ in range(5))
+    print(f"parser build: {build_time * 1000:.1f} ms")
+    print(f"parser snapshot load: {snapshot_time * 1000:.1f} ms")
+
+    texts = load_texts()
+    # Warm-up, to load the parser
+    match_packaging(texts[0])
+    for text in texts:
+        latencies = []
+        for _ in range(args.repeat):
+            start_time = time.perf_counter()
+            match_packaging(text)
+            latencies.append(time.perf_counter() - start_time)
+        print(
+            f"parse ({len(text)} chars): median "
+            f"{statistics.median(latencies) * 1000:.2f} ms, max "
+            f"{max(latencies) * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,24 @@ from robotoff.redis import Lock
 from robotoff.taxonomy import Taxonomy
 
 
+@pytest.fixture(scope="session")
+def snapshot_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("snapshots")
+
+
 @pytest.fixture(autouse=True)
-def set_global_settings(mocker, monkeypatch):
+def set_global_settings(mocker, monkeypatch, snapshot_dir):
     mocker.patch("robotoff.settings.ENABLE_MONGODB_ACCESS", True)
+    # Don't save the keyword processor and grammar snapshots built during
+    # tests in the cache directory of the repository
+    mocker.patch(
+        "robotoff.settings.KEYWORD_PROCESSOR_SNAPSHOT_DIR",
+        snapshot_dir / "keyword_processors",
+    )
+    mocker.patch("robotoff.settings.GRAMMAR_SNAPSHOT_DIR", snapshot_dir / "grammars")
+    # Don't reuse counts of paginated endpoints cached during previous tests
+    mocker.patch("robotoff.settings.COUNT_CACHE_TTL", 0)
+    mocker.patch("robotoff.settings.QUESTION_PRODUCT_IMAGES_CACHE_TTL", 0)
     # Reset envvar to default value
     monkeypatch.setenv("ROBOTOFF_INSTANCE", "dev")
     monkeypatch.delenv("ROBOTOFF_SCHEME", raising=False)
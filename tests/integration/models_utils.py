@@ -14,6 +14,7 @@ import numpy as np
 from factory_peewee import PeeweeModelFactory
 
 from robotoff import models
+from robotoff.insights.voted_insights import VOTED_INSIGHTS_PREFIX
 from robotoff.models import (
     AnnotationVote,
     ImageModel,
@@ -25,6 +26,7 @@ from robotoff.models import (
     ProductInsight,
 )
 from robotoff.off import generate_image_path
+from robotoff.redis import redis_conn
 from robotoff.types import ProductIdentifier, ServerType
 
 
@@ -176,4 +178,7 @@ def clean_db():
         ProductInsight,
     ):
         model.delete().execute()
+    # Sets of voted insights are a cache of the AnnotationVote table
+    for key in redis_conn.scan_iter(match=f"{VOTED_INSIGHTS_PREFIX}:*"):
+        redis_conn.delete(key)
     print("DEBUG: After cleaning: ", models.db.get_tables())
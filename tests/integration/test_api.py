@@ -1,7 +1,10 @@
 import base64
 import datetime
+import gzip
 import uuid
 
+import numpy as np
+import orjson
 import PIL
 import pytest
 import requests
@@ -52,6 +55,16 @@ def client():
     return testing.TestClient(api)
 
 
+def mock_get_products(mocker, product):
+    """Mock the products fetched while formatting questions."""
+    mocker.patch(
+        "robotoff.insights.question.get_products",
+        side_effect=lambda product_ids, projection: {
+            product_id: product for product_id in product_ids
+        },
+    )
+
+
 def test_get_insights_filter_by_lc(client, mocker, peewee_db):
     with peewee_db:
         ProductInsight.delete().execute()  # remove default sample
@@ -110,12 +123,13 @@ def test_random_question(client, mocker):
             }
         }
     }
-    mocker.patch("robotoff.insights.question.get_product", return_value=product)
+    mock_get_products(mocker, product)
     result = client.simulate_get("/api/v1/questions?order_by=random")
 
     assert result.status_code == 200
     assert result.json == {
         "count": 1,
+        "count_exact": True,
         "questions": [
             {
                 "barcode": "00000001",
@@ -134,7 +148,7 @@ def test_random_question(client, mocker):
 
 
 def test_random_question_user_has_already_seen(client, mocker, peewee_db):
-    mocker.patch("robotoff.insights.question.get_product", return_value={})
+    mock_get_products(mocker, {})
     with peewee_db:
         AnnotationVoteFactory(
             insight_id=insight_id,
@@ -144,16 +158,22 @@ def test_random_question_user_has_already_seen(client, mocker, peewee_db):
     result = client.simulate_get("/api/v1/questions?order_by=random&device_id=device1")
 
     assert result.status_code == 200
-    assert result.json == {"count": 0, "questions": [], "status": "no_questions"}
+    assert result.json == {
+        "count": 0,
+        "count_exact": True,
+        "questions": [],
+        "status": "no_questions",
+    }
 
 
 def test_popular_question(client, mocker):
-    mocker.patch("robotoff.insights.question.get_product", return_value={})
+    mock_get_products(mocker, {})
     result = client.simulate_get("/api/v1/questions?order_by=popularity")
 
     assert result.status_code == 200
     assert result.json == {
         "count": 1,
+        "count_exact": True,
         "questions": [
             {
                 "barcode": "00000001",
@@ -171,7 +191,7 @@ def test_popular_question(client, mocker):
 
 
 def test_popular_question_pagination(client, mocker, peewee_db):
-    mocker.patch("robotoff.insights.question.get_product", return_value={})
+    mock_get_products(mocker, {})
 
     with peewee_db:
         ProductInsight.delete().execute()  # remove default sample
@@ -238,7 +258,7 @@ def test_barcode_question_not_found(client):
 
 
 def test_barcode_question(client, mocker):
-    mocker.patch("robotoff.insights.question.get_product", return_value={})
+    mock_get_products(mocker, {})
     result = client.simulate_get("/api/v1/questions/1")
 
     assert result.status_code == 200
@@ -297,6 +317,44 @@ def test_annotate_insight_authenticated(client, peewee_db):
     assert insight["annotated_result"] == 1
 
 
+def test_annotate_insight_batch(client, mocker, peewee_db):
+    refresh_insights = mocker.patch(
+        "robotoff.app.core.refresh_insights", return_value=[]
+    )
+    with peewee_db:
+        other_insight = ProductInsightFactory(barcode=DEFAULT_BARCODE)
+
+    result = client.simulate_post(
+        "/api/v1/insights/annotate/batch",
+        json={
+            "annotations": [
+                {"insight_id": insight_id, "annotation": 0},
+                {"insight_id": str(other_insight.id), "annotation": 0},
+                {"insight_id": str(uuid.uuid4()), "annotation": 0},
+                {"insight_id": str(uuid.uuid4()), "annotation": 1, "data": {}},
+            ]
+        },
+        headers={"Authorization": "Basic " + base64.b64encode(b"a:b").decode("ascii")},
+    )
+
+    assert result.status_code == 200
+    assert [item["status"] for item in result.json["annotations"]] == [
+        "saved",
+        "saved",
+        "error_unknown_insight",
+        "error_invalid_data",
+    ]
+    # Insights are refreshed once per product
+    refresh_insights.assert_called_once_with(DEFAULT_PRODUCT_ID)
+
+    with peewee_db:
+        assert (
+            ProductInsight.select()
+            .where(ProductInsight.annotation == 0, ProductInsight.username == "a")
+            .count()
+        ) == 2
+
+
 def test_annotate_insight_authenticated_ignore(client, peewee_db):
     result = client.simulate_post(
         "/api/v1/insights/annotate",
@@ -629,6 +687,41 @@ def test_annotate_insight_anonymous_then_authenticated(client, mocker, peewee_db
     )
 
 
+def test_image_predictor(client, mocker):
+    mocker.patch(
+        "robotoff.app.api.get_image_from_url",
+        return_value=np.zeros((10, 10, 3), dtype=np.uint8),
+    )
+    detect_from_image = mocker.patch(
+        "robotoff.app.api.ObjectDetectionModelRegistry.get"
+    ).return_value.detect_from_image
+    detect_from_image.return_value.to_list.return_value = [{"label": "logo"}]
+    mocker.patch(
+        "robotoff.app.api.image_classifier.ImageClassifierRegistry.get"
+    ).return_value.predict.return_value = [("FRONT", 0.9), ("OTHER", 0.1)]
+
+    result = client.simulate_get(
+        "/api/v1/images/predict",
+        params={
+            "image_url": "https://images.openfoodfacts.org/images/1.jpg",
+            "models": "universal_logo_detector,front_image_classification",
+            "debug": "true",
+        },
+    )
+    assert result.status_code == 200
+    assert result.json["predictions"] == {
+        "universal_logo_detector": [{"label": "logo"}],
+        "front_image_classification": [
+            {"label": "FRONT", "score": 0.9},
+            {"label": "OTHER", "score": 0.1},
+        ],
+    }
+    assert set(result.json["debug"]["timings"]) == {
+        "universal_logo_detector",
+        "front_image_classification",
+    }
+
+
 def test_image_collection_no_result(client):
     result = client.simulate_get("/api/v1/images")
     assert result.status_code == 200
@@ -638,6 +731,29 @@ def test_image_collection_no_result(client):
     assert data["status"] == "no_images"
 
 
+def test_dump_insights(client, peewee_db):
+    result = client.simulate_get("/api/v1/insights/dump")
+    assert result.status_code == 200
+    assert result.headers["Content-Type"] == "text/csv"
+    lines = result.text.splitlines()
+    assert len(lines) == 2
+    assert lines[0].split(",")[0] == "id"
+    assert lines[1].startswith(insight_id)
+
+    result = client.simulate_get(
+        "/api/v1/insights/dump", params={"format": "jsonl", "compress": "true"}
+    )
+    assert result.status_code == 200
+    assert result.headers["Content-Type"] == "application/gzip"
+    (line,) = gzip.decompress(result.content).splitlines()
+    assert orjson.loads(line)["id"] == insight_id
+
+    result = client.simulate_get(
+        "/api/v1/insights/dump", params={"barcode": "9999999999"}
+    )
+    assert result.status_code == 204
+
+
 def test_image_collection(client, peewee_db):
     with peewee_db:
         image_model = ImageModelFactory(barcode="00000123")
@@ -769,15 +885,26 @@ def test_annotate_category_with_user_input(client, mocker, peewee_db):
 
 
 def test_prediction_collection_no_result(client):
+    # Without filter and exact_count, the count is estimated by the query
+    # planner
+    result = client.simulate_get("/api/v1/predictions?exact_count=true")
+    assert result.status_code == 200
+    assert result.json == {
+        "count": 0,
+        "count_exact": True,
+        "predictions": [],
+        "status": "no_predictions",
+    }
+
     result = client.simulate_get("/api/v1/predictions")
     assert result.status_code == 200
-    assert result.json == {"count": 0, "predictions": [], "status": "no_predictions"}
+    assert result.json["count_exact"] is False
 
 
 def test_prediction_collection_no_filter(client, peewee_db):
     with peewee_db:
         prediction1 = PredictionFactory(value_tag="en:seeds")
-    result = client.simulate_get("/api/v1/predictions")
+    result = client.simulate_get("/api/v1/predictions?exact_count=true")
     assert result.status_code == 200
     data = result.json
     assert data["count"] == 1
@@ -791,7 +918,7 @@ def test_prediction_collection_no_filter(client, peewee_db):
         prediction2 = PredictionFactory(
             value_tag="en:beers", data={"sample": 1}, type="brand"
         )
-    result = client.simulate_get("/api/v1/predictions")
+    result = client.simulate_get("/api/v1/predictions?exact_count=true")
     assert result.status_code == 200
     data = result.json
     assert data["count"] == 2
@@ -805,13 +932,64 @@ def test_prediction_collection_no_filter(client, peewee_db):
     assert prediction_data[1]["value_tag"] == "en:beers"
 
 
+def test_prediction_collection_cursor(client, peewee_db):
+    with peewee_db:
+        predictions = [PredictionFactory() for _ in range(5)]
+    expected_ids = sorted(prediction.id for prediction in predictions)
+
+    seen_ids = []
+    params = {"count": 2}
+    while True:
+        result = client.simulate_get("/api/v1/predictions", params=params)
+        assert result.status_code == 200
+        data = result.json
+        seen_ids += [prediction["id"] for prediction in data["predictions"]]
+        if "next_cursor" not in data:
+            break
+        params["cursor"] = data["next_cursor"]
+
+    assert seen_ids == expected_ids
+
+    result = client.simulate_get("/api/v1/predictions", params={"cursor": "invalid"})
+    assert result.status_code == 400
+
+
+def test_get_insights_cursor(client, peewee_db):
+    with peewee_db:
+        ProductInsight.delete().execute()  # remove default sample
+        insights = [ProductInsightFactory() for _ in range(5)]
+    expected_ids = sorted(str(insight.id) for insight in insights)
+
+    # No cursor is returned by default, as results are not ordered
+    result = client.simulate_get("/api/v1/insights", params={"count": 2})
+    assert "next_cursor" not in result.json
+
+    seen_ids = []
+    params = {"count": 2, "order_by": "id"}
+    while True:
+        result = client.simulate_get("/api/v1/insights", params=params)
+        assert result.status_code == 200
+        data = result.json
+        seen_ids += [insight["id"] for insight in data.get("insights", [])]
+        if "next_cursor" not in data:
+            break
+        params = {"count": 2, "cursor": data["next_cursor"]}
+
+    assert seen_ids == expected_ids
+
+
 def test_get_unanswered_questions_api_empty(client, peewee_db):
     with peewee_db:
         ProductInsight.delete().execute()  # remove default sample
     result = client.simulate_get("/api/v1/questions/unanswered")
 
     assert result.status_code == 200
-    assert result.json == {"count": 0, "questions": [], "status": "no_questions"}
+    assert result.json == {
+        "count": 0,
+        "count_exact": True,
+        "questions": [],
+        "status": "no_questions",
+    }
 
 
 def test_get_unanswered_questions_api(client, peewee_db):
@@ -1084,7 +1262,12 @@ def test_image_prediction_collection(client, peewee_db):
 def test_logo_annotation_collection_empty(client):
     result = client.simulate_get("/api/v1/annotation/collection/")
     assert result.status_code == 200
-    assert result.json == {"count": 0, "annotation": [], "status": "no_annotation"}
+    assert result.json == {
+        "count": 0,
+        "count_exact": True,
+        "annotation": [],
+        "status": "no_annotation",
+    }
 
 
 def test_logo_annotation_collection_api(client, peewee_db):
@@ -1395,8 +1578,7 @@ class TestNutritionPredictorResource:
 
     def test_nutrition_predictor_invalid_image_url(self, client, mocker):
         mocker.patch("robotoff.app.api.get_image_from_url", return_value=None)
-        OCRResultMock = mocker.patch("robotoff.app.api.OCRResult")
-        OCRResultMock.from_url.return_value = None
+        mocker.patch("robotoff.app.api.get_ocr_result", return_value=None)
         result = client.simulate_get(
             "/api/v1/predict/nutrition",
             params={
@@ -1413,8 +1595,7 @@ class TestNutritionPredictorResource:
     def test_nutrition_predictor_invalid_ocr_url(self, client, mocker):
         image = PIL.Image.new("RGB", (100, 100), color="white")
         mocker.patch("robotoff.app.api.get_image_from_url", return_value=image)
-        OCRResultMock = mocker.patch("robotoff.app.api.OCRResult")
-        OCRResultMock.from_url.return_value = None
+        mocker.patch("robotoff.app.api.get_ocr_result", return_value=None)
         result = client.simulate_get(
             "/api/v1/predict/nutrition",
             params={
@@ -1431,7 +1612,7 @@ class TestNutritionPredictorResource:
     def test_nutrition_predictor_successful_request(self, client, mocker):
         image = PIL.Image.new("RGB", (100, 100), color="white")
         mocker.patch("robotoff.app.api.get_image_from_url", return_value=image)
-        mocker.patch("robotoff.app.api.OCRResult")
+        mocker.patch("robotoff.app.api.get_ocr_result")
         raw_entity = {
             "word": "test",
             "entity": "B-TEST",
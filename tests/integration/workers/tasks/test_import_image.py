@@ -499,8 +499,10 @@ class TestExtractNutritionJob:
         get_image_from_url_mocker = mocker.patch(
             "robotoff.workers.tasks.import_image.get_image_from_url", return_value=None
         )
-        OCRResult = mocker.patch("robotoff.workers.tasks.import_image.OCRResult")
-        OCRResult.from_url.return_value = None
+        get_ocr_result = mocker.patch(
+            "robotoff.workers.tasks.import_image.get_ocr_result"
+        )
+        get_ocr_result.return_value = None
         nutrition_extraction_mocker = mocker.patch(
             "robotoff.workers.tasks.import_image.nutrition_extraction"
         )
@@ -518,7 +520,7 @@ class TestExtractNutritionJob:
         assert get_image_from_url_mocker.call_args.args[0] == generate_image_url(
             product_id, DEFAULT_IMAGE_ID
         )
-        assert OCRResult.from_url.call_count == 0
+        assert get_ocr_result.call_count == 0
         assert nutrition_extraction_mocker.predict.call_count == 0
 
     def test_extract_nutrition_job_error_json_ocr_download(self, mocker, peewee_db):
@@ -528,8 +530,10 @@ class TestExtractNutritionJob:
         nutrition_extraction_mocker = mocker.patch(
             "robotoff.workers.tasks.import_image.nutrition_extraction"
         )
-        OCRResult = mocker.patch("robotoff.workers.tasks.import_image.OCRResult")
-        OCRResult.from_url.return_value = None
+        get_ocr_result = mocker.patch(
+            "robotoff.workers.tasks.import_image.get_ocr_result"
+        )
+        get_ocr_result.return_value = None
         with peewee_db:
             ImageModelFactory(
                 barcode=DEFAULT_BARCODE, source_image=DEFAULT_SOURCE_IMAGE, image_id="1"
@@ -544,8 +548,8 @@ class TestExtractNutritionJob:
         assert get_image_from_url_mocker.call_args.args[0] == generate_image_url(
             product_id, DEFAULT_IMAGE_ID
         )
-        assert OCRResult.from_url.call_count == 1
-        assert OCRResult.from_url.call_args.args[0] == generate_json_ocr_url(
+        assert get_ocr_result.call_count == 1
+        assert get_ocr_result.call_args.args[0] == generate_json_ocr_url(
             product_id, DEFAULT_IMAGE_ID
         )
         assert nutrition_extraction_mocker.predict.call_count == 0
@@ -559,7 +563,9 @@ class TestExtractNutritionJob:
             "predict",
             return_value=None,
         )
-        OCRResult = mocker.patch("robotoff.workers.tasks.import_image.OCRResult")
+        get_ocr_result = mocker.patch(
+            "robotoff.workers.tasks.import_image.get_ocr_result"
+        )
         product_id = ProductIdentifier(DEFAULT_BARCODE, ServerType.off)
 
         with peewee_db:
@@ -572,7 +578,7 @@ class TestExtractNutritionJob:
                 generate_json_ocr_url(product_id, DEFAULT_IMAGE_ID),
             )
             assert get_image_from_url_mocker.call_count == 1
-            assert OCRResult.from_url.call_count == 1
+            assert get_ocr_result.call_count == 1
             assert nutrition_extraction_predict_mocker.call_count == 1
             image_predictions = list(ImagePrediction.select())
             # An image prediction was created
@@ -601,7 +607,9 @@ class TestExtractNutritionJob:
             "predict",
             return_value=nutrition_extraction_prediction,
         )
-        OCRResult = mocker.patch("robotoff.workers.tasks.import_image.OCRResult")
+        get_ocr_result = mocker.patch(
+            "robotoff.workers.tasks.import_image.get_ocr_result"
+        )
         enqueue_job = mocker.patch("robotoff.workers.tasks.import_image.enqueue_job")
         product_id = ProductIdentifier(DEFAULT_BARCODE, ServerType.off)
 
@@ -615,7 +623,7 @@ class TestExtractNutritionJob:
                 generate_json_ocr_url(product_id, DEFAULT_IMAGE_ID),
             )
             assert get_image_from_url_mocker.call_count == 1
-            assert OCRResult.from_url.call_count == 1
+            assert get_ocr_result.call_count == 1
             assert nutrition_extraction_predict_mocker.call_count == 1
             image_predictions = list(ImagePrediction.select())
             # An image prediction was created
@@ -666,7 +674,7 @@ class TestExtractNutritionJob:
             "predict",
             return_value=nutrition_extraction_prediction,
         )
-        mocker.patch("robotoff.workers.tasks.import_image.OCRResult")
+        mocker.patch("robotoff.workers.tasks.import_image.get_ocr_result")
         import_insights_mocker = mocker.patch(
             "robotoff.workers.tasks.import_image.import_insights"
         )
@@ -839,7 +847,7 @@ def test_save_logo_embeddings(peewee_db, mocker):
 
         for i, logo in enumerate(logos):
             assert logo.id in logo_id_to_logo_embedding
-            embedding = np.frombuffer(
-                logo_id_to_logo_embedding[logo.id].embedding, dtype=np.float32
-            ).reshape((1, 512))
-            assert (embedding == expected_embeddings[i]).all()
+            embedding = (
+                logo_id_to_logo_embedding[logo.id].get_embedding().reshape((1, 512))
+            )
+            assert np.allclose(embedding, expected_embeddings[i], atol=1e-3)
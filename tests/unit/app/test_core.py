@@ -0,0 +1,92 @@
+import uuid
+
+import falcon
+import pytest
+
+from robotoff.app.core import (
+    INSIGHT_CURSOR_FIELDS,
+    BatchAnnotation,
+    _get_keyset_clause,
+    decode_cursor,
+    encode_cursor,
+    get_insights,
+    save_annotations,
+)
+from robotoff.insights.annotate import (
+    FAILED_ANNOTATION_RESULT,
+    SAVED_ANNOTATION_RESULT,
+    UNKNOWN_INSIGHT_RESULT,
+)
+from robotoff.models import Prediction, ProductInsight
+from robotoff.types import ProductIdentifier, ServerType
+
+
+def test_cursor_round_trip():
+    insight = ProductInsight(id=uuid.uuid4(), unique_scans_n=12)
+    cursor = encode_cursor(insight, INSIGHT_CURSOR_FIELDS["popularity"])
+    assert decode_cursor(cursor, 2) == [12, str(insight.id)]
+
+
+@pytest.mark.parametrize("cursor", ["invalid", "", "WzFd", "e30="])
+def test_decode_invalid_cursor(cursor: str):
+    # "WzFd" is a valid cursor with a single value, "e30=" encodes a dict
+    with pytest.raises(falcon.HTTPBadRequest):
+        decode_cursor(cursor, 2)
+
+
+def test_get_keyset_clause():
+    cursor = encode_cursor(Prediction(id=10), (Prediction.id,))
+    sql, params = (
+        Prediction.select().where(_get_keyset_clause(cursor, (Prediction.id,))).sql()
+    )
+    assert sql.endswith('WHERE ("t1"."id" > %s)')
+    assert params == [10]
+
+    insight = ProductInsight(id=uuid.uuid4(), unique_scans_n=12)
+    fields = INSIGHT_CURSOR_FIELDS["popularity"]
+    cursor = encode_cursor(insight, fields)
+    sql, params = (
+        ProductInsight.select()
+        .where(_get_keyset_clause(cursor, fields, descending=True))
+        .sql()
+    )
+    assert sql.endswith('WHERE (("t1"."unique_scans_n", "t1"."id") < (%s, %s))')
+    assert params == [12, str(insight.id)]
+
+
+def test_get_insights_cursor_unsupported_order():
+    cursor = encode_cursor(ProductInsight(id=uuid.uuid4()), (ProductInsight.id,))
+    with pytest.raises(falcon.HTTPBadRequest):
+        get_insights(order_by="random", cursor=cursor)
+
+
+def test_save_annotations_failed_entry(mocker):
+    insight_ids = [str(uuid.uuid4()) for _ in range(4)]
+    product_insight = mocker.patch("robotoff.app.core.ProductInsight")
+    product_insight.select.return_value.where.return_value.tuples.return_value = [
+        (insight_id, "123", "off") for insight_id in insight_ids[:3]
+    ]
+    save_annotation = mocker.patch(
+        "robotoff.app.core.save_annotation",
+        side_effect=[SAVED_ANNOTATION_RESULT, ValueError, SAVED_ANNOTATION_RESULT],
+    )
+    refresh_insights = mocker.patch(
+        "robotoff.app.core.refresh_insights", return_value=[]
+    )
+
+    results = save_annotations(
+        [
+            BatchAnnotation(insight_id=insight_id, annotation=1)
+            for insight_id in insight_ids
+        ],
+        device_id="device",
+    )
+    # The entry after the failed one is still saved
+    assert results == [
+        SAVED_ANNOTATION_RESULT,
+        FAILED_ANNOTATION_RESULT,
+        SAVED_ANNOTATION_RESULT,
+        UNKNOWN_INSIGHT_RESULT,
+    ]
+    assert save_annotation.call_count == 3
+    refresh_insights.assert_called_once_with(ProductIdentifier("123", ServerType.off))
@@ -0,0 +1,97 @@
+import pytest
+from diskcache import Cache
+
+from robotoff.app import count as count_module
+from robotoff.app.core import SkipVotedOn, SkipVotedType
+from robotoff.app.count import get_count, get_count_cache_key, is_unfiltered
+from robotoff.types import ServerType
+
+
+@pytest.fixture
+def count_cache(tmp_path, mocker):
+    cache = Cache(tmp_path)
+    mocker.patch.object(count_module, "disk_cache", cache)
+    mocker.patch("robotoff.settings.COUNT_CACHE_TTL", 60)
+    return cache
+
+
+def test_get_count_cache_key():
+    key = get_count_cache_key(
+        "insights", {"server_type": ServerType.off, "keep_types": ["label", "brand"]}
+    )
+    assert key.startswith("count:insights:")
+    # The order of multi-valued filters and None filters are ignored
+    assert key == get_count_cache_key(
+        "insights",
+        {
+            "keep_types": ["brand", "label"],
+            "server_type": ServerType.off,
+            "barcode": None,
+        },
+    )
+    assert key != get_count_cache_key(
+        "insights", {"server_type": ServerType.obf, "keep_types": ["label", "brand"]}
+    )
+    assert key != get_count_cache_key(
+        "predictions",
+        {"server_type": ServerType.off, "keep_types": ["label", "brand"]},
+    )
+    # Votes exclusion depends on the user
+    assert get_count_cache_key(
+        "insights", {"avoid_voted_on": SkipVotedOn(SkipVotedType.USERNAME, "a")}
+    ) != get_count_cache_key(
+        "insights", {"avoid_voted_on": SkipVotedOn(SkipVotedType.USERNAME, "b")}
+    )
+
+
+def test_is_unfiltered():
+    assert is_unfiltered({"server_type": ServerType.off, "barcode": None})
+    assert is_unfiltered({"server_type": ServerType.off, "keep_types": []})
+    assert not is_unfiltered({"server_type": ServerType.off, "barcode": "123"})
+
+
+def test_get_count_cached(count_cache, mocker):
+    count_func = mocker.Mock(return_value=12)
+    filters = {"server_type": ServerType.off, "barcode": "123"}
+
+    assert get_count("predictions", filters, count_func) == (12, True)
+    count_func.return_value = 13
+    # The cached count is returned
+    assert get_count("predictions", filters, count_func) == (12, False)
+    assert count_func.call_count == 1
+    # Exact count requested
+    assert get_count("predictions", filters, count_func, exact=True) == (13, True)
+    assert get_count("predictions", filters, count_func) == (13, False)
+
+
+def test_get_count_estimate(count_cache, mocker):
+    estimate_count = mocker.patch.object(
+        count_module, "estimate_count", return_value=1_000_000
+    )
+    count_func = mocker.Mock(return_value=999_990)
+    estimate_query = mocker.Mock()
+
+    assert get_count(
+        "predictions",
+        {"server_type": ServerType.off, "barcode": None},
+        count_func,
+        estimate_query=estimate_query,
+    ) == (1_000_000, False)
+    estimate_count.assert_called_once_with(estimate_query)
+    count_func.assert_not_called()
+
+    # The estimate is only used for unfiltered queries
+    assert get_count(
+        "predictions",
+        {"server_type": ServerType.off, "barcode": "123"},
+        count_func,
+        estimate_query=estimate_query,
+    ) == (999_990, True)
+    # or if an exact count is not requested
+    assert get_count(
+        "predictions",
+        {"server_type": ServerType.off},
+        count_func,
+        exact=True,
+        estimate_query=estimate_query,
+    ) == (999_990, True)
@@ -0,0 +1,51 @@
+import csv
+import datetime
+import gzip
+import io
+import uuid
+
+import orjson
+
+from robotoff.app.dump import gzip_chunks, iter_csv_chunks, iter_jsonl_chunks
+
+ROWS = [
+    {
+        "id": uuid.UUID(int=i),
+        "barcode": str(i),
+        "timestamp": datetime.datetime(2024, 1, 1, 12, i),
+        "countries": ["en:france"],
+    }
+    for i in range(50)
+]
+
+
+def test_iter_csv_chunks():
+    chunks = list(iter_csv_chunks(ROWS, chunk_size=200))
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == 50
+    assert rows[1] == {
+        "id": "00000000-0000-0000-0000-000000000001",
+        "barcode": "1",
+        "timestamp": "2024-01-01T12:01:00",
+        "countries": "['en:france']",
+    }
+    assert list(iter_csv_chunks([])) == []
+
+
+def test_iter_jsonl_chunks():
+    chunks = list(iter_jsonl_chunks(ROWS, chunk_size=200))
+    assert len(chunks) > 1
+    lines = b"".join(chunks).splitlines()
+    assert len(lines) == 50
+    assert orjson.loads(lines[1]) == {
+        "id": "00000000-0000-0000-0000-000000000001",
+        "barcode": "1",
+        "timestamp": "2024-01-01T12:01:00",
+        "countries": ["en:france"],
+    }
+
+
+def test_gzip_chunks():
+    chunks = list(iter_jsonl_chunks(ROWS, chunk_size=200))
+    assert gzip.decompress(b"".join(gzip_chunks(chunks))) == b"".join(chunks)
@@ -0,0 +1,96 @@
+import gzip
+import json
+from pathlib import Path
+
+import orjson
+import pytest
+
+from robotoff.cli.insights import generate_from_ocr_archive, run_from_ocr_archive
+from robotoff.types import PredictionType, ServerType
+
+OCR_PATH = Path(__file__).parent.parent / "prediction/ocr/data/3038350013804_11.json"
+PREDICTION_TYPES = [
+    PredictionType.label,
+    PredictionType.packaging,
+    PredictionType.nutrient_mention,
+]
+
+
+def create_archive(path: Path) -> None:
+    ocr_json = json.loads(OCR_PATH.read_text())
+    with gzip.open(path, "wt") as f:
+        for i in range(7):
+            item = {"source": f"//303/835/001/3804/{i}.json", "content": ocr_json}
+            f.write(json.dumps(item) + "\n")
+        # Items without content are ignored
+        f.write(json.dumps({"source": "/303/835/001/3804/8.json"}) + "\n\n")
+
+
+def read_predictions(path: Path) -> list[dict]:
+    with gzip.open(path, "rb") as f:
+        return [orjson.loads(line) for line in f]
+
+
+def test_run_from_ocr_archive(tmp_path: Path):
+    archive_path = tmp_path / "ocr.jsonl.gz"
+    create_archive(archive_path)
+    expected = [
+        orjson.loads(orjson.dumps(prediction.to_dict()))
+        for prediction in generate_from_ocr_archive(
+            archive_path, PREDICTION_TYPES, ServerType.off
+        )
+    ]
+    assert expected
+
+    for workers in (1, 2):
+        output_path = tmp_path / f"predictions_{workers}.jsonl.gz"
+        run_from_ocr_archive(
+            archive_path,
+            PREDICTION_TYPES,
+            ServerType.off,
+            output_path,
+            workers=workers,
+            chunk_size=2,
+        )
+        assert read_predictions(output_path) == expected
+
+
+def test_run_from_ocr_archive_sharded(tmp_path: Path):
+    archive_path = tmp_path / "ocr.jsonl.gz"
+    create_archive(archive_path)
+    output_dir = tmp_path / "predictions"
+
+    def run(resume: bool, chunk_size: int = 3):
+        run_from_ocr_archive(
+            archive_path,
+            PREDICTION_TYPES,
+            ServerType.off,
+            output_dir,
+            chunk_size=chunk_size,
+            sharded=True,
+            resume=resume,
+        )
+
+    # Nothing to resume
+    with pytest.raises(ValueError, match="not found"):
+        run(resume=True)
+
+    run(resume=False)
+    shard_paths = sorted(output_dir.glob("*.jsonl.gz"))
+    assert [path.name for path in shard_paths] == [
+        "000000.jsonl.gz",
+        "000001.jsonl.gz",
+        "000002.jsonl.gz",
+    ]
+    expected = [read_predictions(path) for path in shard_paths]
+
+    # Only missing shards are generated again
+    shard_paths[1].unlink()
+    shard_paths[2].write_bytes(gzip.compress(b""))
+    run(resume=True)
+    assert read_predictions(shard_paths[1]) == expected[1]
+    assert read_predictions(shard_paths[2]) == []
+
+    # Shards of another chunk size are not reused
+    with pytest.raises(ValueError, match="changed since the previous run"):
+        run(resume=True, chunk_size=2)
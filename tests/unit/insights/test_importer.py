@@ -676,6 +676,9 @@ class TestInsightImporter:
         batch_insert_mock = mocker.patch(
             "robotoff.insights.importer.batch_insert", return_value=1
         )
+        update_question_pool_mock = mocker.patch(
+            "robotoff.insights.importer.question_pool.update_question_pool"
+        )
         import_result = FakeImporter.import_insights(
             DEFAULT_BARCODE,
             [Prediction(type=PredictionType.label)],
@@ -686,6 +689,10 @@ class TestInsightImporter:
         assert len(import_result.insight_deleted_ids) == 1
         batch_insert_mock.assert_called_once()
         product_insight_delete_mock.assert_called_once()
+        # Deleted insights are removed from the question pool, created
+        # insights are added
+        assert update_question_pool_mock.call_count == 2
+        assert update_question_pool_mock.call_args_list[0].kwargs == {"deleted": True}
 
     def test_add_fields(self):
         product = Product({"code": DEFAULT_BARCODE})
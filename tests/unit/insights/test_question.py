@@ -7,6 +7,7 @@ from robotoff.insights.question import (
     CategoryQuestionFormatter,
     ImageOrientationQuestionFormatter,
     LabelQuestionFormatter,
+    ProductImageCache,
     Question,
     generate_selected_images,
     get_display_image,
@@ -287,3 +288,25 @@ class TestGetSourceImageUrl:
             get_source_image_url(product_id=product_id, field_types=None)
             == "https://images.openfoodfacts.net/images/products/000/111/111/1111/2.400.jpg"
         )
+
+
+def test_product_image_cache(mocker):
+    product_id = ProductIdentifier("1111111111", ServerType.off)
+    other_product_id = ProductIdentifier("2222222222", ServerType.off)
+    get_products = mocker.patch(
+        "robotoff.insights.question.get_products",
+        return_value={
+            product_id: {"images": {"front_fr": {"rev": "8", "sizes": {"400": {}}}}}
+        },
+    )
+    product_images = ProductImageCache([product_id, other_product_id])
+
+    assert (
+        get_source_image_url(product_id, product_images=product_images)
+        == "https://images.openfoodfacts.net/images/products/000/111/111/1111/front_fr.8.400.jpg"
+    )
+    # Missing products are considered as products without images
+    assert get_source_image_url(other_product_id, product_images=product_images) is None
+    # All products were fetched with a single query
+    get_products.assert_called_once()
+    assert set(get_products.call_args.args[0]) == {product_id, other_product_id}
@@ -0,0 +1,202 @@
+import itertools
+import random
+import uuid
+from collections import Counter
+
+import pytest
+
+from robotoff.insights import question_pool, voted_insights
+from robotoff.insights.question_pool import (
+    count_questions,
+    get_bucket_key,
+    get_pool_key,
+    is_question_candidate,
+    iter_scores,
+    sample_question_ids,
+)
+from robotoff.models import ProductInsight
+from robotoff.types import ServerType
+
+POOL_KEY = get_pool_key(ServerType.off, "label")
+VOTED_SET_KEY = voted_insights.get_voted_set_key("device_id", "device1")
+
+
+class FakePipeline:
+    """Minimal in-memory replacement of a Redis pipeline, supporting the set
+    commands used to sample from the question pool."""
+
+    def __init__(self, sets: dict[str, set[str]], rng: random.Random):
+        self.sets = sets
+        self.rng = rng
+        self.commands: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def scard(self, key):
+        self.commands.append(lambda: len(self.sets.get(key, ())))
+
+    def srandmember(self, key, count):
+        self.commands.append(
+            lambda: [
+                item.encode() for item in self.rng.sample(sorted(self.sets[key]), count)
+            ]
+        )
+
+    def sintercard(self, numkeys, keys):
+        self.commands.append(
+            lambda: len(set.intersection(*(self.sets.get(key, set()) for key in keys)))
+        )
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+
+@pytest.fixture
+def fake_pool(mocker):
+    sets: dict[str, set[str]] = {}
+    rng = random.Random(0)
+    redis_conn = mocker.patch.object(question_pool, "redis_conn")
+    redis_conn.pipeline.side_effect = lambda **kwargs: FakePipeline(sets, rng)
+    voted_redis_conn = mocker.patch.object(voted_insights, "redis_conn")
+    voted_redis_conn.smismember.side_effect = lambda key, values: [
+        int(value in sets.get(key, ())) for value in values
+    ]
+    return sets
+
+
+def test_get_pool_key():
+    assert get_pool_key(ServerType.off, "label") == (
+        "robotoff:question_pool:off:label:all:all"
+    )
+    assert get_pool_key(ServerType.obf, "category", "en:france", "agribalyse") == (
+        "robotoff:question_pool:obf:category:en:france:agribalyse"
+    )
+    assert get_bucket_key(POOL_KEY, 2) == f"{POOL_KEY}:2"
+    # Insights with many votes are grouped in the last bucket
+    assert get_bucket_key(POOL_KEY, 100) == f"{POOL_KEY}:10"
+
+
+@pytest.mark.parametrize(
+    "fields,expected",
+    [
+        ({}, True),
+        ({"annotation": 1}, False),
+        ({"automatic_processing": True}, False),
+        ({"reserved_barcode": True}, False),
+    ],
+)
+def test_is_question_candidate(fields: dict, expected: bool):
+    insight = ProductInsight(
+        annotation=None, automatic_processing=False, reserved_barcode=False
+    )
+    for key, value in fields.items():
+        setattr(insight, key, value)
+    assert is_question_candidate(insight) is expected
+
+
+def sql_random_order(
+    buckets: dict[int, set[str]], limit: int, rng: random.Random
+) -> list[str]:
+    """Reference implementation of the `random` order of `get_insights`:
+    `ORDER BY random() * (n_votes + 1) DESC LIMIT limit`."""
+    scores = {
+        insight_id: rng.random() * (n_votes + 1)
+        for n_votes, insight_ids in buckets.items()
+        for insight_id in insight_ids
+    }
+    return sorted(scores, key=scores.__getitem__, reverse=True)[:limit]
+
+
+def test_iter_scores():
+    rng = random.Random(0)
+    scores = list(iter_scores([3, 0, 2], [1, 5, 2], rng))
+    # All elements get a score, in descending order
+    assert sorted(index for _, index in scores) == [0, 0, 0, 2, 2]
+    assert [score for score, _ in scores] == sorted(
+        (score for score, _ in scores), reverse=True
+    )
+    assert all(0 <= score <= 2 for score, _ in scores)
+
+
+def test_iter_scores_distribution():
+    rng = random.Random(0)
+    buckets = {0: [str(i) for i in range(20)], 2: [str(i) for i in range(20, 25)]}
+    sizes = [len(ids) for ids in buckets.values()]
+    weights = [n_votes + 1 for n_votes in buckets]
+    bucket_counts: Counter[tuple[int, ...]] = Counter()
+    sql_bucket_counts: Counter[tuple[int, ...]] = Counter()
+    for _ in range(2000):
+        top_scores = itertools.islice(iter_scores(sizes, weights, rng), 4)
+        bucket_counts[tuple(index for _, index in top_scores)] += 1
+        sql_ids = sql_random_order(
+            {n_votes: set(ids) for n_votes, ids in buckets.items()}, 4, rng
+        )
+        sql_bucket_counts[tuple(int(int(id_) >= 20) for id_ in sql_ids)] += 1
+    # The bucket sequence of the top scores has the same distribution as with
+    # the SQL ordering
+    for key in bucket_counts.keys() | sql_bucket_counts.keys():
+        assert abs(bucket_counts[key] - sql_bucket_counts[key]) < 80
+
+
+def test_sample_question_ids(fake_pool):
+    no_vote_ids = {str(uuid.uuid4()) for _ in range(50)}
+    two_votes_ids = {str(uuid.uuid4()) for _ in range(5)}
+    fake_pool[get_bucket_key(POOL_KEY, 0)] = no_vote_ids
+    fake_pool[get_bucket_key(POOL_KEY, 2)] = two_votes_ids
+    voted_ids = set(list(no_vote_ids)[:10])
+    fake_pool[VOTED_SET_KEY] = voted_ids | {voted_insights.LOADED_MARKER}
+
+    sampled_ids = sample_question_ids(
+        [POOL_KEY], limit=20, voted_set_key=VOTED_SET_KEY, rng=random.Random(1)
+    )
+    assert len(sampled_ids) == 20
+    assert len(set(sampled_ids)) == 20
+    assert not set(sampled_ids) & voted_ids
+    assert set(sampled_ids) <= no_vote_ids | two_votes_ids
+
+    # Excluded insights are replaced by other insights
+    excluded_ids = set(sampled_ids)
+    sampled_ids = sample_question_ids(
+        [POOL_KEY], limit=20, rng=random.Random(1), exclude=excluded_ids
+    )
+    assert len(sampled_ids) == 20
+    assert not set(sampled_ids) & excluded_ids
+
+    # Less insights than requested in the pool
+    assert set(sample_question_ids([POOL_KEY], limit=100)) == (
+        no_vote_ids | two_votes_ids
+    )
+    # Empty pool
+    assert sample_question_ids([get_pool_key(ServerType.off, "category")], 10) == []
+
+
+def test_sample_question_ids_skewed_pool(fake_pool):
+    buckets = {
+        0: {str(uuid.uuid4()) for _ in range(100_000)},
+        1: {str(uuid.uuid4()) for _ in range(500)},
+    }
+    for n_votes, insight_ids in buckets.items():
+        fake_pool[get_bucket_key(POOL_KEY, n_votes)] = insight_ids
+
+    # The top 25 insights by `random() * (n_votes + 1)` are all insights with
+    # a vote, as 500 insights have a score in [0, 2]
+    assert set(sql_random_order(buckets, 25, random.Random(0))) <= buckets[1]
+    for seed in range(10):
+        sampled_ids = sample_question_ids([POOL_KEY], 25, rng=random.Random(seed))
+        assert len(sampled_ids) == 25
+        assert set(sampled_ids) <= buckets[1]
+
+
+def test_count_questions(fake_pool):
+    ids = [str(uuid.uuid4()) for _ in range(10)]
+    fake_pool[get_bucket_key(POOL_KEY, 0)] = set(ids[:6])
+    fake_pool[get_bucket_key(POOL_KEY, 1)] = set(ids[6:])
+
+    assert count_questions([POOL_KEY]) == 10
+    fake_pool[VOTED_SET_KEY] = {ids[0], ids[9], voted_insights.LOADED_MARKER}
+    assert count_questions([POOL_KEY], voted_set_key=VOTED_SET_KEY) == 8
+    assert count_questions([POOL_KEY], max_count=5) == 5
@@ -0,0 +1,93 @@
+import pytest
+
+from robotoff.insights import voted_insights
+from robotoff.insights.voted_insights import (
+    LOADED_MARKER,
+    add_voted_insight,
+    get_voted_set_key,
+    is_voted,
+    load_voted_set,
+)
+
+KEY = get_voted_set_key("device_id", "device1")
+
+
+class FakePipeline:
+    """Pipeline of `FakeRedis`, commands are run immediately and their
+    results are returned by `execute`."""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.results: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        return lambda *args: self.results.append(command(*args))
+
+    def execute(self):
+        results, self.results = self.results, []
+        return results
+
+
+class FakeRedis:
+    """Minimal in-memory replacement of a Redis connection, supporting the
+    set commands used by the voted insight sets."""
+
+    def __init__(self):
+        self.sets: dict[str, set[str]] = {}
+        self.expired_keys: list[str] = []
+
+    def pipeline(self, **kwargs):
+        return FakePipeline(self)
+
+    def expire(self, key, ttl):
+        self.expired_keys.append(key)
+        return int(key in self.sets)
+
+    def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(values)
+
+    def sismember(self, key, value):
+        return int(value in self.sets.get(key, ()))
+
+    def smismember(self, key, values):
+        return [self.sismember(key, value) for value in values]
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    redis = FakeRedis()
+    mocker.patch.object(voted_insights, "redis_conn", redis)
+    return redis
+
+
+def test_get_voted_set_key():
+    assert KEY == "robotoff:voted_insights:device_id:device1"
+
+
+def test_load_voted_set(fake_redis):
+    load_voted_set(KEY, lambda: iter(["1", "2"]))
+    assert fake_redis.sets[KEY] == {"1", "2", LOADED_MARKER}
+    assert is_voted(KEY, ["2", "3", "1"]) == [True, False, True]
+    assert is_voted(KEY, []) == []
+
+    # The set is only loaded once, its TTL is refreshed when it's used
+    add_voted_insight([KEY], "3")
+    fake_redis.expired_keys.clear()
+    load_voted_set(KEY, lambda: [])
+    assert fake_redis.sets[KEY] == {"1", "2", "3", LOADED_MARKER}
+    assert fake_redis.expired_keys == [KEY]
+
+
+def test_load_voted_set_after_vote(fake_redis):
+    # A vote added before the loading of the set doesn't mark the set as
+    # loaded
+    add_voted_insight([KEY], "3")
+    load_voted_set(KEY, lambda: ["1"])
+    assert fake_redis.sets[KEY] == {"1", "3", LOADED_MARKER}
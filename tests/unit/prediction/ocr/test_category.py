@@ -1,5 +1,8 @@
+import time
+
 import pytest
 
+from robotoff.prediction.ocr import category
 from robotoff.prediction.ocr.category import find_category
 
 
@@ -16,9 +19,34 @@ from robotoff.prediction.ocr.category import find_category
         ),
         ("DOP Mozzarella    di bufala campana", ["en:mozzarella-di-bufala-campana"]),
         ("Mixed puffed cereals    AOP", ["en:mixed-puffed-cereals"]),
+        ("Pâtes aux courgettes", []),
+        pytest.param(
+            "0" * 10_000 + "\nMixed puffed cereals AOP",
+            ["en:mixed-puffed-cereals"],
+            id="long-line",
+        ),
     ],
 )
 def test_find_category_from_AOC(text: str, value_tags: list[str]):
     insights = find_category(text)
     detected_value_tags = set(i.value_tag for i in insights)
     assert detected_value_tags == set(value_tags)
+
+
+def test_find_category_without_mention(mocker):
+    get_taxonomy = mocker.patch.object(category, "get_taxonomy")
+    # No AOC/AOP mention: the category regexes are not run
+    assert find_category("Pâtes aux courgettes, " * 1000) == []
+    get_taxonomy.assert_not_called()
+
+
+def test_find_category_long_line(mocker):
+    get_taxonomy = mocker.patch.object(category, "get_taxonomy")
+    get_taxonomy.return_value.nodes = {}
+    # The category names are bounded: the regexes are linear in the line
+    # length, instead of quadratic
+    text = "appellation " + "a " * 10_000 + " AOP"
+    start_time = time.perf_counter()
+    assert find_category(text) == []
+    assert time.perf_counter() - start_time < 2
+    assert get_taxonomy.called
@@ -1,10 +1,22 @@
 import pytest
 
-from robotoff.prediction.ocr.core import extract_predictions
-from robotoff.types import InsightType
+from robotoff.prediction.ocr.core import (
+    PREDICTION_TYPE_TO_LOADERS,
+    extract_predictions,
+    preload_extractors,
+)
+from robotoff.types import InsightType, PredictionType
 
 
 def test_extract_insights_unknown_raises():
     """If we extract an unknown insights it raises"""
     with pytest.raises(ValueError, match="unknown prediction type"):
         extract_predictions("spam", InsightType.ingredient_spellcheck)
+
+
+def test_preload_extractors(mocker):
+    loader = mocker.Mock()
+    mocker.patch.dict(PREDICTION_TYPE_TO_LOADERS, {PredictionType.label: [loader]})
+    # Extractors without resources have no loader
+    preload_extractors([PredictionType.label, PredictionType.nutrient])
+    loader.assert_called_once_with()
@@ -0,0 +1,75 @@
+from robotoff import settings
+from robotoff.prediction.ocr import grammar
+from robotoff.prediction.ocr.grammar import iter_grammar_files, load_lark_parser
+
+GRAMMAR = """value: (FRUIT | WS)+
+%import .terminal_fruit.FRUIT
+%import common.WS
+"""
+
+
+def write_grammar(grammar_dir, fruits: list[str]):
+    (grammar_dir / "fruit.lark").write_text(GRAMMAR)
+    (grammar_dir / "terminal_fruit.lark").write_text(
+        "FRUIT: " + " | ".join(f'"{fruit}"' for fruit in fruits) + "\n"
+    )
+
+
+def test_iter_grammar_files():
+    grammar_path = settings.GRAMMARS_DIR / "packaging_fr.lark"
+    assert list(iter_grammar_files(grammar_path)) == [
+        grammar_path,
+        settings.GRAMMARS_DIR / "terminal_packaging_shape_fr.lark",
+        settings.GRAMMARS_DIR / "terminal_packaging_material_fr.lark",
+        settings.GRAMMARS_DIR / "terminal_packaging_recycling_fr.lark",
+    ]
+
+
+def test_load_lark_parser(tmp_path, mocker):
+    grammar_dir = tmp_path / "grammars"
+    grammar_dir.mkdir()
+    snapshot_dir = tmp_path / "snapshots"
+    write_grammar(grammar_dir, ["apple", "pear"])
+    grammar_path = grammar_dir / "fruit.lark"
+
+    parser = load_lark_parser(grammar_path, "value", snapshot_dir=snapshot_dir)
+    snapshot_path = snapshot_dir / "fruit.value.pickle"
+    assert snapshot_path.exists()
+
+    open_mock = mocker.patch("robotoff.prediction.ocr.grammar.Lark.open")
+    loaded = load_lark_parser(grammar_path, "value", snapshot_dir=snapshot_dir)
+    # The parser was loaded from the snapshot
+    open_mock.assert_not_called()
+    assert loaded.parse("apple pear") == parser.parse("apple pear")
+    mocker.stopall()
+
+    # The snapshot is stale when an imported grammar file changes
+    write_grammar(grammar_dir, ["apple", "pear", "plum"])
+    parser = load_lark_parser(grammar_path, "value", snapshot_dir=snapshot_dir)
+    assert [str(token) for token in parser.parse("plum").children] == ["plum"]
+
+
+def test_load_lark_parser_invalid_snapshot(tmp_path):
+    write_grammar(tmp_path, ["apple"])
+    grammar_path = tmp_path / "fruit.lark"
+    load_lark_parser(grammar_path, "value", snapshot_dir=tmp_path)
+    snapshot_path = tmp_path / "fruit.value.pickle"
+    snapshot_path.write_bytes(snapshot_path.read_bytes()[:-10])
+
+    parser = load_lark_parser(grammar_path, "value", snapshot_dir=tmp_path)
+    assert [str(token) for token in parser.parse("apple").children] == ["apple"]
+
+
+def test_load_lark_parser_snapshot_permissions(tmp_path, mocker):
+    write_grammar(tmp_path, ["apple"])
+    grammar_path = tmp_path / "fruit.lark"
+    load_lark_parser(grammar_path, "value", snapshot_dir=tmp_path)
+    snapshot_path = tmp_path / "fruit.value.pickle"
+    assert snapshot_path.stat().st_mode & 0o777 == 0o644
+
+    # Snapshots that other users can modify are not loaded
+    snapshot_path.chmod(0o666)
+    pickle_load = mocker.spy(grammar.pickle, "load")
+    load_lark_parser(grammar_path, "value", snapshot_dir=tmp_path)
+    pickle_load.assert_not_called()
+    assert snapshot_path.stat().st_mode & 0o777 == 0o644
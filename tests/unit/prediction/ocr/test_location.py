@@ -5,9 +5,11 @@ from robotoff.prediction.ocr.location import (
     AddressExtractor,
     City,
     find_locations,
+    find_locations_batch,
     load_cities_fr,
 )
 from robotoff.utils.text import KeywordProcessor
+from robotoff.utils.text.frozen_flashtext import FrozenKeywordProcessor
 
 module = "robotoff.prediction.ocr.location"
 
@@ -94,13 +96,14 @@ def cities():
 def test_address_extractor_init(mocker, cities):
     m_add_keyword = mocker.patch.object(KeywordProcessor, "add_keyword")
 
-    ae = AddressExtractor(cities)
+    ae = AddressExtractor(cities + [City("paris", "75001", None)])
 
-    assert isinstance(ae.cities_processor, KeywordProcessor)
-    assert m_add_keyword.call_args_list == [
-        mocker.call("paris", cities[0]),
-        mocker.call("poya", cities[1]),
-    ]
+    assert isinstance(ae.cities_processor, FrozenKeywordProcessor)
+    assert m_add_keyword.call_args_list == [mocker.call("paris"), mocker.call("poya")]
+    assert ae.cities_by_name == {
+        "paris": {"75000": cities[0], "75001": City("paris", "75001", None)},
+        "poya": {"98827": cities[1]},
+    }
 
 
 def test_address_extractor_get_text(mocker):
@@ -218,8 +221,32 @@ def test_address_extractor_extract_addresses(mocker, cities):
     }
 
 
-def test_find_locations(mocker):
-    m_extract_addresses = mocker.patch.object(AddressExtractor, "extract_addresses")
+def test_address_extractor_extract_addresses_same_name():
+    # Several cities can have the same name
+    c1 = City("saint denis", "93200", None)
+    c2 = City("saint denis", "97400", None)
+    ae = AddressExtractor([c1, c2], postal_code_search_distance=8)
+
+    assert ae.find_city_names("saint denis") == [(c1, 0, 11), (c2, 0, 11)]
+    insights = ae.extract_addresses("97400 saint-denis, 93200 saint denis")
+    assert [insight.data["postal_code"] for insight in insights] == ["97400", "93200"]
+    assert ae.extract_addresses("saint denis 75000") == []
+
+
+def test_find_locations(mocker, cities):
+    m_get_address_extractor = mocker.patch(
+        f"{module}.get_address_extractor",
+        return_value=AddressExtractor(cities, text_extract_distance=3),
+    )
 
-    assert find_locations(mocker.sentinel.content) == m_extract_addresses.return_value
-    m_extract_addresses.assert_called_once_with(mocker.sentinel.content)
+    assert find_locations("blah paris 75000 poya foo")[0].data == {
+        "country_code": "fr",
+        "city_name": "paris",
+        "postal_code": "75000",
+        "text_extract": "ah paris 75000 po",
+    }
+    assert [
+        len(predictions)
+        for predictions in find_locations_batch(["paris 75000", "", "poya 98827"])
+    ] == [1, 0, 1]
+    assert m_get_address_extractor.call_count == 2
@@ -0,0 +1,83 @@
+import dataclasses
+import threading
+
+import pytest
+
+from robotoff import settings
+from robotoff.prediction.langid import (
+    LanguagePrediction,
+    LanguagePredictionBatcher,
+    normalize_text,
+)
+
+PREDICT_URL = f"{settings.FASTTEXT_SERVER_URI}/predict"
+
+
+def _fasttext_response(request, context):
+    # Return a fake prediction for each text: the language is the first word
+    return [[[text.split()[0]], [0.9]] for text in request.json()]
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("hello world", "hello world"),
+        ("  hello\n\tworld  ", "hello world"),
+        ("", ""),
+    ],
+)
+def test_normalize_text(text: str, expected: str):
+    assert normalize_text(text) == expected
+
+
+def test_batcher_cache(requests_mock):
+    requests_mock.post(PREDICT_URL, json=_fasttext_response)
+    batcher = LanguagePredictionBatcher(max_wait=0, max_batch_size=8, cache_size=10)
+
+    assert batcher.predict("fr bonjour", k=1) == [LanguagePrediction("fr", 0.9)]
+    # Same normalized text: served from cache
+    assert batcher.predict("fr   bonjour\n", k=1) == [LanguagePrediction("fr", 0.9)]
+    assert requests_mock.call_count == 1
+    # Different k: not served from cache
+    batcher.predict("fr bonjour", k=2)
+    assert requests_mock.call_count == 2
+
+    # Cached predictions can't be modified by callers
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        batcher.predict("fr bonjour", k=1)[0].lang = "en"  # type: ignore
+
+    metrics = batcher.get_metrics()
+    assert metrics["cache_hits"] == 2
+    assert metrics["cache_misses"] == 2
+    assert metrics["batch_count"] == 2
+
+
+def test_batcher_coalesces_concurrent_calls(requests_mock):
+    requests_mock.post(PREDICT_URL, json=_fasttext_response)
+    batcher = LanguagePredictionBatcher(max_wait=5, max_batch_size=4, cache_size=10)
+    texts = ["fr bonjour", "en hello", "de hallo", "fr bonjour"]
+    results: dict[int, list[LanguagePrediction]] = {}
+
+    def run(i: int):
+        results[i] = batcher.predict(texts[i], k=1)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    for i, text in enumerate(texts):
+        assert results[i] == [LanguagePrediction(text.split()[0], 0.9)]
+    # The batch is sent as soon as `max_batch_size` texts are pending,
+    # duplicated texts are only sent once
+    assert requests_mock.call_count == 1
+    assert requests_mock.last_request.json() == ["fr bonjour", "en hello", "de hallo"]
+
+
+def test_batcher_propagates_errors(requests_mock):
+    requests_mock.post(PREDICT_URL, status_code=500, text="error")
+    batcher = LanguagePredictionBatcher(max_wait=0, max_batch_size=8, cache_size=10)
+
+    with pytest.raises(ValueError):
+        batcher.predict("fr bonjour")
@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from robotoff.ann import (
+    EMBEDDING_DIM,
+    LocalANNIndex,
+    build_snapshot,
+    get_added_log_length,
+    normalize,
+    score_to_distance,
+)
+
+
+def _generate_embeddings(count: int, seed: int = 0) -> np.ndarray:
+    """Generate clustered embeddings, closer to real logo embeddings than
+    uniformly distributed vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(50, EMBEDDING_DIM))
+    labels = rng.integers(0, len(centers), size=count)
+    return (centers[labels] + 0.5 * rng.normal(size=(count, EMBEDDING_DIM))).astype(
+        np.float32
+    )
+
+
+def _exact_knn(query: np.ndarray, embeddings: np.ndarray, k: int) -> list[int]:
+    scores = normalize(embeddings) @ normalize(query)
+    return np.argsort(-scores)[:k].tolist()
+
+
+def test_search_empty_index(tmp_path: Path):
+    index = LocalANNIndex(tmp_path / "index")
+    assert index.search(np.ones(EMBEDDING_DIM), k=5) == []
+
+
+@pytest.mark.parametrize("nlist", [1, 20])
+def test_search_recall(tmp_path: Path, nlist: int):
+    embeddings = _generate_embeddings(2000)
+    build_snapshot(tmp_path, enumerate(embeddings), nlist=nlist)
+    index = LocalANNIndex(tmp_path, nprobe=5)
+
+    k = 10
+    recalls = []
+    for query_id in range(0, 2000, 100):
+        results = index.search(embeddings[query_id], k=k)
+        assert len(results) == k
+        # The query logo itself is the closest neighbor
+        assert results[0][0] == query_id
+        distances = [distance for _, distance in results]
+        assert distances == sorted(distances)
+        expected = _exact_knn(embeddings[query_id], embeddings, k)
+        recalls.append(len(set(expected) & {logo_id for logo_id, _ in results}) / k)
+
+    assert np.mean(recalls) >= 0.9
+
+
+def test_add_and_delete(tmp_path: Path):
+    embeddings = _generate_embeddings(100)
+    build_snapshot(tmp_path, enumerate(embeddings[:50]))
+    index = LocalANNIndex(tmp_path)
+    # Another process (sharing the same index directory)
+    other_index = LocalANNIndex(tmp_path)
+
+    index.add(list(range(50, 100)), embeddings[50:])
+    assert other_index.get_ids() == set(range(100))
+    assert other_index.search(embeddings[75], k=1)[0][0] == 75
+
+    index.delete([75])
+    assert 75 not in other_index.get_ids()
+    assert other_index.search(embeddings[75], k=1)[0][0] != 75
+
+    # Deleted logos can be re-added
+    index.add([75], embeddings[75:76])
+    assert other_index.search(embeddings[75], k=1)[0][0] == 75
+
+
+def test_add_creates_index(tmp_path: Path):
+    embeddings = _generate_embeddings(10)
+    index = LocalANNIndex(tmp_path / "index")
+    index.add(list(range(10)), embeddings)
+    assert index.get_ids() == set(range(10))
+    logo_id, distance = index.search(embeddings[3], k=1)[0]
+    assert logo_id == 3
+    assert distance == pytest.approx(0.0, abs=1e-3)
+
+
+def test_rebuild_keeps_log_entries(tmp_path: Path):
+    embeddings = _generate_embeddings(30)
+    build_snapshot(tmp_path, enumerate(embeddings[:10]))
+    index = LocalANNIndex(tmp_path)
+    index.add(list(range(10, 20)), embeddings[10:20])
+
+    def items():
+        yield from enumerate(embeddings[:20])
+        # Logos added while the snapshot is being built
+        index.add(list(range(20, 30)), embeddings[20:30])
+
+    build_snapshot(tmp_path, items())
+    assert LocalANNIndex(tmp_path).get_ids() == set(range(30))
+    assert index.get_ids() == set(range(30))
+
+
+def test_add_many(tmp_path: Path):
+    embeddings = _generate_embeddings(3000)
+    index = LocalANNIndex(tmp_path)
+    # Added logos are replayed in several refreshes, the added buffers grow
+    for start in range(0, 3000, 500):
+        index.add(list(range(start, start + 500)), embeddings[start : start + 500])
+        assert index.search(embeddings[start], k=1)[0][0] == start
+    assert index.get_ids() == set(range(3000))
+    assert get_added_log_length(tmp_path) == 3000
+
+    build_snapshot(tmp_path, enumerate(embeddings))
+    assert get_added_log_length(tmp_path) == 0
+    assert index.search(embeddings[2999], k=1)[0][0] == 2999
+
+
+def test_score_to_distance():
+    assert score_to_distance(np.array([1.0, 0.0, -1.0])).tolist() == [0.0, 0.5, 1.0]
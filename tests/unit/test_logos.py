@@ -1,11 +1,28 @@
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 from elasticsearch import Elasticsearch
 from elasticsearch.helpers import BulkIndexError
 
-from robotoff.logos import compute_iou, delete_ann_logos, generate_prediction
-from robotoff.types import ElasticSearchIndex, Prediction, PredictionType, ServerType
+from robotoff.logos import (
+    UNKNOWN_LABEL,
+    compute_iou,
+    delete_ann_logos,
+    generate_prediction,
+    get_logos_to_refresh,
+    get_weights,
+    knn_search_batch,
+    predict_proba_many,
+)
+from robotoff.models import LogoAnnotation
+from robotoff.types import (
+    ElasticSearchIndex,
+    LogoLabelType,
+    Prediction,
+    PredictionType,
+    ServerType,
+)
 
 
 @pytest.mark.parametrize(
@@ -105,3 +122,140 @@ def test_delete_ann_logos(mock_bulk):
     call = mock_bulk.mock_calls[0]
     assert call.args[0] == es_client
     assert list(call.args[1]) == actions
+
+
+def test_knn_search_batch():
+    es_client = MagicMock(spec=Elasticsearch)
+
+    def msearch(searches):
+        responses = []
+        for header, body in zip(searches[::2], searches[1::2], strict=True):
+            assert header == {"index": ElasticSearchIndex.logo.name}
+            assert body["size"] == 3
+            assert body["knn"]["filter"] == {"term": {"server_type": "off"}}
+            # Use the first dimension of the query vector as logo ID
+            logo_id = int(body["knn"]["query_vector"][0] * 10)
+            if logo_id == 3:
+                responses.append({"error": {"type": "search_phase_execution"}})
+            else:
+                responses.append(
+                    {"hits": {"hits": [{"_id": str(logo_id), "_score": 0.75}]}}
+                )
+        return {"responses": responses}
+
+    es_client.msearch.side_effect = msearch
+    embeddings = [
+        np.array([logo_id / 10, np.sqrt(1 - (logo_id / 10) ** 2)])
+        for logo_id in range(1, 6)
+    ]
+    results = knn_search_batch(
+        es_client, embeddings, k=2, server_type=ServerType.off, batch_size=2
+    )
+    assert es_client.msearch.call_count == 3
+    # Results are returned in the same order as the embeddings, failed
+    # queries return no result
+    assert results == [[(1, 0.25)], [(2, 0.25)], [], [(4, 0.25)], [(5, 0.25)]]
+
+
+def _predict_proba_reference(
+    nn_labels: list[LogoLabelType], nn_distances: list[float], weights: str
+) -> dict[LogoLabelType, float]:
+    """Per-logo implementation of the label vote, used to check that
+    `predict_proba_many` returns the same results."""
+    nn_weights = get_weights(np.array(nn_distances), weights)
+    labels = [UNKNOWN_LABEL] + [x for x in set(nn_labels) if x != UNKNOWN_LABEL]
+    proba = np.zeros(len(labels))
+    for label, weight in zip(nn_labels, nn_weights, strict=True):
+        proba[labels.index(label)] += weight
+    proba /= proba.sum()
+    return {label: float(p) for label, p in zip(labels, proba, strict=True)}
+
+
+@pytest.mark.parametrize("weights", ["distance", "uniform"])
+def test_predict_proba_many(mocker, weights: str):
+    rng = np.random.default_rng(0)
+    annotations: dict[int, LogoLabelType] = {
+        1: ("brand", "carrefour"),
+        2: ("brand", "carrefour"),
+        3: ("label", "en:eu-organic"),
+        4: ("brand", "auchan"),
+        5: ("label", None),
+    }
+    get_logo_annotations_mock = mocker.patch(
+        "robotoff.logos.get_logo_annotations", return_value=annotations
+    )
+    logos = [LogoAnnotation(id=100, nearest_neighbors=None)]
+    for logo_id in range(101, 150):
+        # neighbor lists have different lengths, and include unannotated
+        # logos (ID >= 6)
+        k = int(rng.integers(1, 11))
+        logos.append(
+            LogoAnnotation(
+                id=logo_id,
+                nearest_neighbors={
+                    "logo_ids": rng.integers(1, 10, size=k).tolist(),
+                    "distances": rng.uniform(0.01, 0.5, size=k).tolist(),
+                },
+            )
+        )
+    # A neighbor with a zero distance gets all the weight
+    logos.append(
+        LogoAnnotation(
+            id=150,
+            nearest_neighbors={"logo_ids": [1, 3, 4], "distances": [0.2, 0.0, 0.1]},
+        )
+    )
+
+    results = predict_proba_many(logos, weights)
+
+    # A single SQL query is performed for all logos
+    get_logo_annotations_mock.assert_called_once()
+    assert len(results) == len(logos)
+    assert results[0] is None
+    for logo, result in zip(logos[1:], results[1:], strict=True):
+        nn_labels = [
+            annotations.get(logo_id, UNKNOWN_LABEL)
+            for logo_id in logo.nearest_neighbors["logo_ids"]
+        ]
+        expected = _predict_proba_reference(
+            nn_labels, logo.nearest_neighbors["distances"], weights
+        )
+        assert result == pytest.approx(expected)
+
+    if weights == "distance":
+        assert results[-1] == {
+            UNKNOWN_LABEL: 0.0,
+            ("brand", "carrefour"): 0.0,
+            ("label", "en:eu-organic"): 1.0,
+            ("brand", "auchan"): 0.0,
+        }
+
+
+def test_get_logos_to_refresh():
+    changed_logos = {
+        # newly indexed logo
+        1: {"logo_ids": [10, 11, 12, 13, 14], "distances": [0.1, 0.2, 0.3, 0.4, 0.5]},
+        # newly annotated logo
+        2: {"logo_ids": [15], "distances": [0.3]},
+    }
+    neighbor_logos = {
+        # logo 1 is closer than the current 2nd nearest neighbor
+        10: {"logo_ids": [20, 21], "distances": [0.05, 0.2]},
+        # logo 1 is farther than all current nearest neighbors
+        11: {"logo_ids": [20, 21], "distances": [0.05, 0.1]},
+        # less than k neighbors
+        12: {"logo_ids": [20], "distances": [0.05]},
+        # nearest neighbors not computed yet
+        13: None,
+        # logo 2 (whose annotation changed) is already a nearest neighbor
+        15: {"logo_ids": [2, 20], "distances": [0.01, 0.02]},
+        # logo 14 is completed (not a candidate), 16 is not a neighbor of a
+        # changed logo
+        16: None,
+    }
+    assert get_logos_to_refresh(changed_logos, neighbor_logos, k=2) == {
+        10,
+        12,
+        13,
+        15,
+    }
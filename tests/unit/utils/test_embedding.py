@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from robotoff.types import EmbeddingEncoding
+from robotoff.utils.embedding import decode_embedding, encode_embedding
+
+
+def _cosine_knn(query: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    query = query / np.linalg.norm(query, axis=1, keepdims=True)
+    return np.argsort(-(query @ corpus.T), axis=1)[:, :k]
+
+
+@pytest.mark.parametrize(
+    "encoding,expected_size",
+    [
+        (EmbeddingEncoding.float32, 2048),
+        (EmbeddingEncoding.float16, 1024),
+        (EmbeddingEncoding.int8, 516),
+    ],
+)
+def test_encode_embedding_size(encoding: EmbeddingEncoding, expected_size: int):
+    embedding = np.random.default_rng(0).normal(size=512).astype(np.float32)
+    assert len(encode_embedding(embedding, encoding)) == expected_size
+
+
+def test_float32_round_trip_is_exact():
+    embedding = np.random.default_rng(0).normal(size=512).astype(np.float32)
+    encoded = encode_embedding(embedding, EmbeddingEncoding.float32)
+    # float32 encoding is the legacy `numpy.tobytes()` format
+    assert encoded == embedding.tobytes()
+    decoded = decode_embedding(encoded, "float32")
+    assert decoded.dtype == np.float32
+    assert (decoded == embedding).all()
+
+
+@pytest.mark.parametrize(
+    "encoding,min_cosine",
+    [(EmbeddingEncoding.float16, 0.9999), (EmbeddingEncoding.int8, 0.999)],
+)
+def test_round_trip_cosine_similarity(encoding: EmbeddingEncoding, min_cosine: float):
+    embeddings = np.random.default_rng(1).normal(size=(100, 512)).astype(np.float32)
+    for embedding in embeddings:
+        decoded = decode_embedding(encode_embedding(embedding, encoding), encoding)
+        assert decoded.dtype == np.float32
+        assert decoded.shape == embedding.shape
+        cosine = np.dot(decoded, embedding) / (
+            np.linalg.norm(decoded) * np.linalg.norm(embedding)
+        )
+        assert cosine >= min_cosine
+
+
+@pytest.mark.parametrize(
+    "encoding,min_recall",
+    [(EmbeddingEncoding.float16, 0.99), (EmbeddingEncoding.int8, 0.95)],
+)
+def test_cosine_neighbors_preserved(encoding: EmbeddingEncoding, min_recall: float):
+    k = 10
+    corpus = np.random.default_rng(2).normal(size=(2000, 512)).astype(np.float32)
+    queries = corpus[:50]
+    decoded_corpus = np.stack(
+        [decode_embedding(encode_embedding(x, encoding), encoding) for x in corpus]
+    )
+    expected = _cosine_knn(queries, corpus, k)
+    actual = _cosine_knn(decoded_corpus[:50], decoded_corpus, k)
+    recall = np.mean(
+        [len(set(e) & set(a)) / k for e, a in zip(expected, actual, strict=True)]
+    )
+    assert recall >= min_recall
+
+
+def test_int8_zero_embedding():
+    embedding = np.zeros(512, dtype=np.float32)
+    encoded = encode_embedding(embedding, EmbeddingEncoding.int8)
+    assert (decode_embedding(encoded, EmbeddingEncoding.int8) == 0.0).all()
+
+
+def test_decode_embedding_unknown_encoding():
+    with pytest.raises(ValueError):
+        decode_embedding(b"", "bfloat16")
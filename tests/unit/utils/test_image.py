@@ -7,6 +7,7 @@ import pytest
 from robotoff.utils.download import AssetLoadingException
 from robotoff.utils.image import (
     convert_bounding_box_absolute_to_relative,
+    crop_image,
     get_image_from_url,
 )
 
@@ -35,6 +36,28 @@ def test_convert_bounding_box_absolute_to_relative(bbox, width, height, expected
     assert pytest.approx(result) == expected
 
 
+def _open_jpeg(width: int, height: int) -> PIL.Image.Image:
+    image_fp = io.BytesIO()
+    PIL.Image.new("RGB", (width, height), (255, 0, 0)).save(image_fp, format="JPEG")
+    image_fp.seek(0)
+    return PIL.Image.open(image_fp)
+
+
+def test_crop_image():
+    bounding_box = (0.1, 0.2, 0.5, 0.6)
+    assert crop_image(_open_jpeg(1000, 800), bounding_box).size == (400, 320)
+
+    # The image is decoded at a reduced resolution using JPEG draft mode
+    image = _open_jpeg(4000, 3000)
+    cropped_image = crop_image(image, bounding_box, max_size=200)
+    assert image.size == (1000, 750)
+    assert cropped_image.size == (200, 150)
+
+    # No resizing if the crop is smaller than max_size
+    cropped_image = crop_image(_open_jpeg(100, 100), bounding_box, max_size=200)
+    assert cropped_image.size == (40, 40)
+
+
 class TestGetImageFromURL:
     def test_no_cache_valid_image(self, mocker):
         image = PIL.Image.new("RGB", (100, 100))
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from diskcache import Cache
+from openfoodfacts.ocr import OCRResultGenerationException
+
+from robotoff.utils import ocr
+from robotoff.utils.ocr import clear_ocr_result_cache, get_ocr_result
+
+OCR_URL = "https://images.openfoodfacts.org/images/products/123/1.json"
+OCR_JSON = {
+    "responses": [
+        {
+            "textAnnotations": [
+                {
+                    "description": "hello world",
+                    "locale": "en",
+                    "boundingPoly": {"vertices": [{"x": 0, "y": 0}] * 4},
+                }
+            ]
+        }
+    ]
+}
+
+
+@pytest.fixture
+def disk_cache(mocker, tmp_path):
+    cache = Cache(tmp_path)
+    mocker.patch.object(ocr, "ocr_disk_cache", cache)
+    clear_ocr_result_cache()
+    yield cache
+    clear_ocr_result_cache()
+    cache.close()
+
+
+def test_get_ocr_result(mocker, disk_cache):
+    session = mocker.Mock()
+    session.get.return_value = mocker.Mock(
+        ok=True,
+        status_code=200,
+        content=json.dumps(OCR_JSON).encode(),
+        headers={"ETag": '"abc"'},
+    )
+
+    ocr_result = get_ocr_result(OCR_URL, session)
+    assert ocr_result is not None
+    assert ocr_result.text_annotations[0].text == "hello world"
+    session.get.assert_called_once_with(OCR_URL, headers={})
+
+    # Parsed OCR results are cached in memory
+    assert get_ocr_result(OCR_URL, session) is ocr_result
+    assert session.get.call_count == 1
+
+    # The raw OCR JSON is cached on disk, and revalidated
+    clear_ocr_result_cache()
+    session.get.return_value = mocker.Mock(ok=False, status_code=304)
+    other_ocr_result = get_ocr_result(OCR_URL, session)
+    assert other_ocr_result is not None
+    assert other_ocr_result is not ocr_result
+    assert other_ocr_result.text_annotations[0].text == "hello world"
+    assert session.get.call_args == mocker.call(
+        OCR_URL, headers={"If-None-Match": '"abc"'}
+    )
+
+
+def test_get_ocr_result_errors(mocker, disk_cache):
+    session = mocker.Mock()
+    session.get.return_value = mocker.Mock(ok=False, status_code=404)
+    assert get_ocr_result(OCR_URL, session, error_raise=False) is None
+    with pytest.raises(OCRResultGenerationException):
+        get_ocr_result(OCR_URL, session)
+
+    session.get.return_value = mocker.Mock(
+        ok=True, status_code=200, content=b"invalid", headers={}
+    )
+    assert get_ocr_result(OCR_URL, session, error_raise=False) is None
+    # Invalid JSONs are not kept in cache
+    assert ocr.get_ocr_cache_key(OCR_URL) not in disk_cache
@@ -1,8 +1,15 @@
 import math
+import random
+import string
+from fractions import Fraction
 
 import pytest
 
-from robotoff.utils.weight_unit import normalize_weight
+from robotoff.utils.weight_unit import (
+    UNIT_CONVERSION_TABLE,
+    _normalize_weight_pint,
+    normalize_weight,
+)
 
 
 @pytest.mark.parametrize(
@@ -28,3 +35,49 @@ def test_normalize_weight(value: str, unit: str, expected: tuple[float, str]):
 def test_normalize_weight_invalid_unit():
     with pytest.raises(ValueError, match="unknown unit: meter / second"):
         normalize_weight("100", "m/s")
+
+
+def normalize_weight_pint(value: str, unit: str) -> tuple[float, str]:
+    # Previous implementation, with pint only
+    value = value.replace(",", ".")
+    normalized_value, normalized_unit = _normalize_weight_pint(value, unit)
+    if math.isclose(math.floor(normalized_value), normalized_value):
+        normalized_value = math.floor(normalized_value)
+    return normalized_value, normalized_unit
+
+
+def test_normalize_weight_parity_with_pint():
+    rng = random.Random(0)
+    for _ in range(2000):
+        value = str(rng.choice([0, rng.randint(1, 9), rng.randint(1, 99999)]))
+        if rng.random() < 0.7:
+            value += rng.choice(".,") + "".join(
+                rng.choices(string.digits, k=rng.randint(0, 4))
+            )
+        unit = rng.choice(list(UNIT_CONVERSION_TABLE))
+        normalized_value, normalized_unit = normalize_weight(value, unit)
+        expected_value, expected_unit = normalize_weight_pint(value, unit)
+        assert normalized_unit == expected_unit
+        # Conversions with pint may be off by a few ULPs: conversions with
+        # exact factors return the closest float to the exact value
+        assert math.isclose(normalized_value, expected_value, rel_tol=1e-12)
+        factor = UNIT_CONVERSION_TABLE[unit][0]
+        exact_value = float(Fraction(value.replace(",", ".")) * factor)
+        if math.isclose(math.floor(exact_value), exact_value):
+            exact_value = math.floor(exact_value)
+        assert normalized_value == exact_value
+
+
+@pytest.mark.parametrize(
+    "value,unit",
+    [
+        # Values and units not handled by the conversion table
+        ("007", "g"),
+        ("100", "L"),
+        ("100", "ML"),
+        ("2", "t"),
+        ("1", "gallon"),
+    ],
+)
+def test_normalize_weight_pint_fallback(value: str, unit: str):
+    assert normalize_weight(value, unit) == normalize_weight_pint(value, unit)
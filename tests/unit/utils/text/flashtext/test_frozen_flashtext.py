@@ -0,0 +1,98 @@
+import json
+import random
+
+import pytest
+
+from robotoff import settings
+from robotoff.utils.text import KeywordProcessor
+from robotoff.utils.text.frozen_flashtext import FrozenKeywordProcessor
+
+with open(settings.TEST_DATA_DIR / "flashtext/keyword_extractor_test_cases.json") as f:
+    TEST_CASES = json.load(f)
+
+
+def assert_same_keywords(processor: KeywordProcessor, sentence: str):
+    frozen = FrozenKeywordProcessor(processor)
+    for max_cost in (0, 1, 2):
+        for span_info in (False, True):
+            assert frozen.extract_keywords(
+                sentence, span_info=span_info, max_cost=max_cost
+            ) == processor.extract_keywords(
+                sentence, span_info=span_info, max_cost=max_cost
+            )
+
+
+@pytest.mark.parametrize("case_sensitive", [False, True])
+@pytest.mark.parametrize("test_case", TEST_CASES)
+def test_extract_keywords_parity(test_case: dict, case_sensitive: bool):
+    processor = KeywordProcessor(case_sensitive=case_sensitive)
+    processor.add_keywords_from_dict(test_case["keyword_dict"])
+    assert_same_keywords(processor, test_case["sentence"])
+
+
+def test_extract_keywords_parity_random():
+    rng = random.Random(0)
+    alphabet = "abcdé İ.-"
+    processor = KeywordProcessor()
+    for i in range(300):
+        keyword = "".join(rng.choices(alphabet, k=rng.randint(1, 8))).strip()
+        processor.add_keyword(keyword, ("keyword", i % 50))
+    processor.remove_keyword(keyword)
+
+    for _ in range(100):
+        sentence = "".join(rng.choices(alphabet, k=rng.randint(0, 60)))
+        assert_same_keywords(processor, sentence)
+
+
+def test_frozen_keyword_processor():
+    processor = KeywordProcessor()
+    processor.add_keyword("Big Apple", ("en:new-york", "New York"))
+    processor.add_keyword("NYC", ("en:new-york", "New York"))
+    processor.add_keyword("Bay Area")
+    frozen = FrozenKeywordProcessor(processor)
+
+    assert len(frozen) == 3
+    assert "big apple" in frozen
+    assert "big" not in frozen
+    assert frozen["Bay area"] == "Bay Area"
+    assert frozen["bay"] is None
+    # Equal clean names are only stored once
+    assert frozen.clean_names == [("en:new-york", "New York"), "Bay Area"]
+    assert frozen.extract_keywords("I love NYC and the bay area.", span_info=True) == [
+        (("en:new-york", "New York"), 7, 10),
+        ("Bay Area", 19, 27),
+    ]
+
+
+def test_save_load(tmp_path):
+    processor = KeywordProcessor()
+    processor.add_keyword("Big Apple", ("en:new-york", "New York"))
+    processor.add_keyword("crème brûlée", [("en:creme-brulee", "fr")])
+    frozen = FrozenKeywordProcessor(processor)
+    path = tmp_path / "processor.bin"
+    frozen.save(path, source_key=b"1" * 32)
+    # The snapshot contains pickled data, only its owner can modify it
+    assert path.stat().st_mode & 0o777 == 0o644
+
+    assert FrozenKeywordProcessor.load(tmp_path / "missing.bin", b"1" * 32) is None
+    # Snapshots built from other data are not loaded
+    assert FrozenKeywordProcessor.load(path, b"2" * 32) is None
+
+    loaded = FrozenKeywordProcessor.load(path, b"1" * 32)
+    assert loaded is not None
+    assert len(loaded) == 2
+    assert loaded.clean_names == frozen.clean_names
+    sentence = "big apple, crème brûlée and big aple"
+    for max_cost in (0, 1):
+        assert loaded.extract_keywords(
+            sentence, span_info=True, max_cost=max_cost
+        ) == processor.extract_keywords(sentence, span_info=True, max_cost=max_cost)
+
+
+def test_load_truncated(tmp_path):
+    processor = KeywordProcessor()
+    processor.add_keyword("Big Apple")
+    path = tmp_path / "processor.bin"
+    FrozenKeywordProcessor(processor).save(path, source_key=b"1" * 32)
+    path.write_bytes(path.read_bytes()[:-1])
+    assert FrozenKeywordProcessor.load(path, b"1" * 32) is None
@@ -0,0 +1,73 @@
+import pytest
+
+from robotoff.utils.text import fold_to_ascii
+from robotoff.utils.text.fold_to_ascii import (
+    fold,
+    fold_without_deletion,
+    fold_without_insertion_deletion,
+    get_fold_translate_table,
+    translate_table,
+)
+
+MAPPING = dict(translate_table)
+CORPUS = [
+    "",
+    "Reflets de France",
+    "Crème brûlée, œufs de plein air et pâte à tartiner",
+    "Straße, Müsli, Käse und Ölsardinen",
+    "Jamón ibérico, piñones y caña de azúcar",
+    "Żółć gęślą jaźń, čokoláda, smetana a řepka",
+    "Ærøskøbing, Åland, ǅemal, ﬁlet",
+    "Молоко пастеризованное 3,2%",
+    "Γιαούρτι στραγγιστό",
+    "緑茶 ペットボトル 500ml",
+    "حليب كامل الدسم",
+    "Sữa tươi tiệt trùng 🥛",
+    # All characters of the Basic Multilingual Plane
+    "".join(chr(i) for i in range(0xD800)),
+    "".join(chr(i) for i in range(0xE000, 0x10000)),
+]
+
+
+def reference_fold(string: str, replacement: str = "", mode: str = "default"):
+    output = []
+    for char in string:
+        mapped = MAPPING.get(ord(char))
+        if mode == "without_insertion_deletion":
+            output.append(mapped if mapped is not None and len(mapped) == 1 else char)
+        elif mode == "without_deletion":
+            output.append(char if mapped is None else mapped)
+        else:
+            output.append(replacement if mapped is None else mapped)
+    return "".join(output)
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_fold(text: str):
+    assert fold(text) == reference_fold(text)
+    assert fold(text, replacement="?") == reference_fold(text, replacement="?")
+    # Characters added to the cached translate table on a previous call
+    # don't change the output
+    assert fold(text) == reference_fold(text)
+    assert fold_without_deletion(text) == reference_fold(text, mode="without_deletion")
+    assert fold_without_insertion_deletion(text) == reference_fold(
+        text, mode="without_insertion_deletion"
+    )
+
+
+def test_fold_none():
+    assert fold(None) == ""  # type: ignore
+    assert fold_without_deletion(None) == ""  # type: ignore
+    assert fold_without_insertion_deletion(None) == ""  # type: ignore
+
+
+def test_fold_translate_table_size(monkeypatch):
+    monkeypatch.setattr(fold_to_ascii, "MAX_FOLD_TABLE_SIZE", len(MAPPING) + 10)
+    monkeypatch.setattr(fold_to_ascii, "_fold_translate_tables", {})
+    text = "".join(chr(i) for i in range(0x4E00, 0x4E00 + 100))
+    assert fold(text, replacement="?") == "?" * 100
+    table = get_fold_translate_table("?")
+    # The table grew too large, it's replaced by a new one
+    assert len(table) == len(MAPPING)
+    assert fold(text, replacement="?") == "?" * 100
+    assert get_fold_translate_table("?") is not table
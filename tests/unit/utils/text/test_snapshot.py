@@ -0,0 +1,47 @@
+from robotoff.utils.text import KeywordProcessor
+from robotoff.utils.text.snapshot import get_source_key, load_keyword_processor
+
+
+def test_load_keyword_processor(tmp_path):
+    source_path = tmp_path / "keywords.txt"
+    source_path.write_text("apple\npear\n")
+    snapshot_dir = tmp_path / "snapshots"
+    build_count = 0
+
+    def build() -> KeywordProcessor:
+        nonlocal build_count
+        build_count += 1
+        processor = KeywordProcessor()
+        processor.add_keywords_from_list(source_path.read_text().split())
+        return processor
+
+    def load(version: str = "1"):
+        return load_keyword_processor(
+            "fruit", [source_path], build, version=version, snapshot_dir=snapshot_dir
+        )
+
+    assert load().extract_keywords("an apple and a pear") == ["apple", "pear"]
+    assert build_count == 1
+    assert (snapshot_dir / "fruit.bin").is_file()
+
+    # The snapshot is fresh, the processor is not rebuilt
+    assert load().extract_keywords("an apple and a pear") == ["apple", "pear"]
+    assert build_count == 1
+
+    # The snapshot is stale when the version or the source files change
+    load(version="2")
+    assert build_count == 2
+    source_path.write_text("apple\n")
+    assert load(version="2").extract_keywords("an apple and a pear") == ["apple"]
+    assert build_count == 3
+
+
+def test_get_source_key(tmp_path):
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "keywords.txt").write_text("apple\n")
+    key = get_source_key("fruit", "1", [tmp_path / "a" / "keywords.txt"])
+    # The key only depends on the name and content of the source files
+    assert get_source_key("fruit", "1", [tmp_path / "b" / "keywords.txt"]) == key
+    (tmp_path / "b" / "keywords.txt").write_text("pear\n")
+    assert get_source_key("fruit", "1", [tmp_path / "b" / "keywords.txt"]) != key